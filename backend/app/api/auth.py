@@ -1,12 +1,17 @@
 """
 认证相关API
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
+from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from typing import Optional
 import secrets
 from datetime import datetime, timedelta
+from app.db.database import get_db
+from app.models.user import User
+from app.services.passwords import hash_password_async, verify_password_async, needs_rehash
 
 router = APIRouter(prefix="", tags=["认证"])  # 不使用/api前缀，因为前端直接调用/login
 security = HTTPBearer()
@@ -34,15 +39,32 @@ class UserInfoResponse(BaseModel):
     permissions: list = []
 
 
+def _find_user(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(
+        User.username == username,
+        User.deleted_at.is_(None)
+    ).first()
+
+
+def _save_password_hash(db: Session, user: User, password_hash: str):
+    user.password_hash = password_hash
+    db.commit()
+
+
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest):
+async def login(request: LoginRequest, db: Session = Depends(get_db)):
     """
     用户登录
     注意：这是简化版本，内部系统不需要复杂认证
     任意用户名和密码都可以登录
     """
-    # 简化认证：任意用户名和密码都可以登录
-    # 生产环境应该验证用户名和密码
+    # bcrypt 成本因子调整后，用户管理中的用户用正确的密码登录时按新成本重新哈希
+    # 数据库操作在线程池中执行，bcrypt 在有界线程池中执行，等待时都不阻塞事件循环
+    user = await run_in_threadpool(_find_user, db, request.username)
+    if user and user.password_hash and needs_rehash(user.password_hash):
+        if await verify_password_async(request.password, user.password_hash):
+            password_hash = await hash_password_async(request.password)
+            await run_in_threadpool(_save_password_hash, db, user, password_hash)
     
     # 生成token
     token = secrets.token_urlsafe(32)
@@ -4,7 +4,8 @@
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from app.db.database import get_db, DATABASE_URL
+from app.db.database import Base, get_db, engine, async_engine, DATABASE_URL, create_missing_indexes
+from app.services.admission import admission_route
 from app.models.customer import Customer
 from app.models.customer_loan import CustomerLoan
 from app.models.customer_repayment import CustomerRepayment
@@ -23,14 +24,20 @@ from app.models.other_income import OtherIncome
 from app.models.system_config import SystemConfig
 from app.models.operation_log import OperationLog
 from app.models.user import User
+from app.models.session_snapshot import SessionSnapshot
+from app.services.session_totals import backfill_session_totals, refresh_session_totals
+from app.services.system_config import config_cache, bump_config_version, reload_after_restore
+from app.services.business_date import ensure_business_dates
+from app.services.metrics import BACKUP_DURATION
 from typing import Optional, List
 import os
 import shutil
+import anyio
 from datetime import datetime
 from pathlib import Path
 import sqlite3
 
-router = APIRouter(prefix="/api/backup", tags=["backup"])
+router = APIRouter(prefix="/api/backup", tags=["backup"], route_class=admission_route("export"))
 
 # 备份目录
 BACKUP_DIR = Path(__file__).parent.parent.parent / "backups"
@@ -74,6 +81,7 @@ def get_database_path():
 
 
 @router.post("/create")
+@BACKUP_DURATION.time(operation="create")
 def create_backup():
     """创建数据备份"""
     try:
@@ -123,6 +131,7 @@ def list_backups():
 
 
 @router.post("/restore")
+@BACKUP_DURATION.time(operation="restore")
 def restore_backup(request: RestoreRequest):
     """还原备份"""
     try:
@@ -138,9 +147,22 @@ def restore_backup(request: RestoreRequest):
         if db_path.exists():
             shutil.copy2(db_path, restore_backup_path)
         
+        # 关闭连接池中的连接，还原后重新连接，不再使用旧文件上的连接和表结构缓存
+        engine.dispose()
+        anyio.from_thread.run(async_engine.dispose)
+        
         # 复制备份文件到数据库位置
         shutil.copy2(backup_path, db_path)
         
+        # 还原的可能是旧版本的备份，按启动时的顺序补建新增的表、汇总、营业日列和索引
+        Base.metadata.create_all(bind=engine)
+        backfill_session_totals(engine)
+        # 还原后的配置可能与各进程缓存的不同，通知重新加载
+        reload_after_restore()
+        # 还原的可能是添加营业日之前的备份，或按其它规则计算的营业日
+        ensure_business_dates(engine)
+        create_missing_indexes(engine)
+        
         return {
             "message": "还原成功",
             "restored_file": request.filename,
@@ -166,6 +188,7 @@ def delete_backup(request: DeleteRequest):
 
 
 @router.post("/clean")
+@BACKUP_DURATION.time(operation="clean")
 def clean_data(request: CleanDataRequest, db: Session = Depends(get_db)):
     """清理数据（清理前自动备份，支持选择性清理）"""
     # 只清理用户明确选择的数据（默认值都是False，不会清理未选择的数据）
@@ -185,6 +208,9 @@ def clean_data(request: CleanDataRequest, db: Session = Depends(get_db)):
         # 2. 按照外键依赖关系的逆序删除
         # 注意：需要按照外键依赖关系的逆序删除
         
+        # 房间使用记录详情快照是派生数据，清理任何数据后都全部删除，打开详情时重新生成
+        db.query(SessionSnapshot).delete()
+        
         # 删除还款记录（如果清理借款还款数据）
         if request.clean_loans_repayments:
             count = db.query(CustomerRepayment).delete()
@@ -275,6 +301,7 @@ def clean_data(request: CleanDataRequest, db: Session = Depends(get_db)):
         if request.clean_system_config:
             count = db.query(SystemConfig).delete()
             if count > 0:
+                bump_config_version(db)
                 cleaned_items.append(f"系统配置({count}条)")
         
         # 删除操作日志（如果清理操作日志）
@@ -289,7 +316,12 @@ def clean_data(request: CleanDataRequest, db: Session = Depends(get_db)):
             if count > 0:
                 cleaned_items.append(f"用户({count}条)")
         
+        # 明细被批量删除，重新生成房间使用记录汇总
+        refresh_session_totals(db.connection())
+        
         db.commit()
+        if request.clean_system_config:
+            config_cache.invalidate()
         
         return {
             "message": "数据清理成功",
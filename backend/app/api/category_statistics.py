@@ -3,19 +3,21 @@
 """
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import func
 from typing import Optional
-from datetime import date, datetime
+from datetime import date
 from decimal import Decimal
 from app.db.database import get_db
+from app.services.report_executor import ReportRoute
+from app.services.admission import admission_route
 from app.models.room_session import RoomSession
-from app.models.product_consumption import ProductConsumption
-from app.models.meal_record import MealRecord
+from app.models.session_total import SessionTotal
 from app.models.other_expense import OtherExpense
 from app.models.other_income import OtherIncome
+from app.services.business_date import business_date_filter
 from pydantic import BaseModel, Field
 
-router = APIRouter(prefix="/api/category-statistics", tags=["分类统计"])
+router = APIRouter(prefix="/api/category-statistics", tags=["分类统计"], route_class=admission_route("report", base=ReportRoute))
 
 
 class CategoryStatisticsResponse(BaseModel):
@@ -33,119 +35,116 @@ class CategoryStatisticsResponse(BaseModel):
     room_expense_details: dict = Field(default_factory=dict, description="房间支出明细")
     other_income_list: list = Field(default_factory=list, description="其它收入列表")
     other_expense_list: list = Field(default_factory=list, description="其它支出列表")
+    other_income_categories: list = Field(default_factory=list, description="其它收入按名称汇总")
+    other_expense_categories: list = Field(default_factory=list, description="其它支出按名称汇总")
+
+
+def _money(value) -> Decimal:
+    """将SQL聚合结果转换为两位小数的Decimal"""
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
 
 
 @router.get("", response_model=CategoryStatisticsResponse)
 def get_category_statistics(
-    start_date: Optional[date] = Query(None, description="开始日期，格式：YYYY-MM-DD"),
-    end_date: Optional[date] = Query(None, description="结束日期，格式：YYYY-MM-DD"),
+    start_date: Optional[date] = Query(None, description="开始营业日，格式：YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="结束营业日，格式：YYYY-MM-DD"),
     db: Session = Depends(get_db)
 ):
     """
     获取分类统计
     支持按日期范围统计，如果不提供日期则统计所有数据
+    所有汇总均由分组聚合查询完成，查询次数与会话数量无关
     """
-    # 初始化统计
-    room_income = Decimal("0")
-    room_expense = Decimal("0")
-    other_income = Decimal("0")
-    other_expense = Decimal("0")
+    # 已结算会话的过滤条件，按营业日（使用记录汇总通过会话关联后使用同一条件）
+    session_filters = [
+        RoomSession.status == "settled",
+        *business_date_filter(RoomSession.business_date, start_date, end_date)
+    ]
+    
+    # 统计房间收入（台子费、商品、餐费）
+    table_fee_total = db.query(
+        func.sum(RoomSession.table_fee)
+    ).filter(*session_filters).scalar()
+    
+    # 商品和餐费取自使用记录汇总表
+    session_totals = db.query(
+        func.sum(SessionTotal.product_revenue).label("product_revenue"),
+        func.sum(SessionTotal.product_cost).label("product_cost"),
+        func.sum(SessionTotal.meal_revenue).label("meal_revenue"),
+        func.sum(SessionTotal.meal_cost).label("meal_cost")
+    ).join(
+        RoomSession, SessionTotal.session_id == RoomSession.id
+    ).filter(*session_filters).one()
     
     room_income_details = {
-        "table_fee": Decimal("0"),  # 台子费
-        "product_revenue": Decimal("0"),  # 商品收入
-        "meal_revenue": Decimal("0")  # 餐费收入
+        "table_fee": _money(table_fee_total),  # 台子费
+        "product_revenue": _money(session_totals.product_revenue),  # 商品收入
+        "meal_revenue": _money(session_totals.meal_revenue)  # 餐费收入
     }
     
     room_expense_details = {
-        "product_cost": Decimal("0"),  # 商品成本
-        "meal_cost": Decimal("0")  # 餐费成本
+        "product_cost": _money(session_totals.product_cost),  # 商品成本
+        "meal_cost": _money(session_totals.meal_cost)  # 餐费成本
     }
     
-    other_income_list = []
-    other_expense_list = []
+    room_income = sum(room_income_details.values())
+    room_expense = sum(room_expense_details.values())
     
-    # 构建日期过滤条件
-    start_datetime = None
-    end_datetime = None
-    if start_date:
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-    if end_date:
-        end_datetime = datetime.combine(end_date, datetime.max.time())
+    # 统计其它收入（按名称分组汇总 + 明细列表）
+    income_filters = business_date_filter(OtherIncome.business_date, start_date, end_date)
     
-    # 统计房间收入（台子费、商品、餐费）
-    sessions_query = db.query(RoomSession).filter(RoomSession.status == "settled")
-    if start_datetime:
-        sessions_query = sessions_query.filter(RoomSession.start_time >= start_datetime)
-    if end_datetime:
-        sessions_query = sessions_query.filter(RoomSession.start_time <= end_datetime)
-    sessions = sessions_query.all()
-    
-    for session in sessions:
-        # 台子费
-        table_fee = session.table_fee or Decimal("0")
-        room_income += table_fee
-        room_income_details["table_fee"] += table_fee
-        
-        # 商品消费
-        consumptions = db.query(ProductConsumption).filter(ProductConsumption.session_id == session.id).all()
-        for consumption in consumptions:
-            product_revenue = consumption.total_price or Decimal("0")
-            product_cost = consumption.total_cost or Decimal("0")
-            room_income += product_revenue
-            room_expense += product_cost
-            room_income_details["product_revenue"] += product_revenue
-            room_expense_details["product_cost"] += product_cost
-        
-        # 餐费
-        meals = db.query(MealRecord).filter(MealRecord.session_id == session.id).all()
-        for meal in meals:
-            meal_revenue = meal.amount or Decimal("0")
-            meal_cost = meal.cost_price or Decimal("0")
-            room_income += meal_revenue
-            room_expense += meal_cost
-            room_income_details["meal_revenue"] += meal_revenue
-            room_expense_details["meal_cost"] += meal_cost
+    other_income_categories = [
+        {"name": row.name, "amount": float(_money(row.amount)), "count": row.count}
+        for row in db.query(
+            OtherIncome.name,
+            func.sum(OtherIncome.amount).label("amount"),
+            func.count(OtherIncome.id).label("count")
+        ).filter(*income_filters).group_by(OtherIncome.name).order_by(func.sum(OtherIncome.amount).desc()).all()
+    ]
+    other_income = _money(sum(Decimal(str(item["amount"])) for item in other_income_categories))
     
-    # 统计其它收入
-    other_incomes_query = db.query(OtherIncome)
-    if start_datetime:
-        other_incomes_query = other_incomes_query.filter(OtherIncome.income_date >= start_datetime)
-    if end_datetime:
-        other_incomes_query = other_incomes_query.filter(OtherIncome.income_date <= end_datetime)
-    other_incomes = other_incomes_query.order_by(OtherIncome.income_date.desc()).all()
+    other_income_list = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "amount": float(row.amount or 0),
+            "payment_method": row.payment_method or "现金",
+            "description": row.description,
+            "income_date": row.income_date.strftime("%Y-%m-%d %H:%M:%S") if row.income_date else ""
+        }
+        for row in db.query(
+            OtherIncome.id, OtherIncome.name, OtherIncome.amount,
+            OtherIncome.payment_method, OtherIncome.description, OtherIncome.income_date
+        ).filter(*income_filters).order_by(OtherIncome.income_date.desc()).all()
+    ]
     
-    for income in other_incomes:
-        amount = income.amount or Decimal("0")
-        other_income += amount
-        other_income_list.append({
-            "id": income.id,
-            "name": income.name,
-            "amount": float(amount),
-            "payment_method": income.payment_method or "现金",
-            "description": income.description,
-            "income_date": income.income_date.strftime("%Y-%m-%d %H:%M:%S") if income.income_date else ""
-        })
+    # 统计其它支出（按名称分组汇总 + 明细列表）
+    expense_filters = business_date_filter(OtherExpense.business_date, start_date, end_date)
     
-    # 统计其它支出
-    other_expenses_query = db.query(OtherExpense)
-    if start_datetime:
-        other_expenses_query = other_expenses_query.filter(OtherExpense.expense_date >= start_datetime)
-    if end_datetime:
-        other_expenses_query = other_expenses_query.filter(OtherExpense.expense_date <= end_datetime)
-    other_expenses = other_expenses_query.order_by(OtherExpense.expense_date.desc()).all()
+    other_expense_categories = [
+        {"name": row.name, "amount": float(_money(row.amount)), "count": row.count}
+        for row in db.query(
+            OtherExpense.name,
+            func.sum(OtherExpense.amount).label("amount"),
+            func.count(OtherExpense.id).label("count")
+        ).filter(*expense_filters).group_by(OtherExpense.name).order_by(func.sum(OtherExpense.amount).desc()).all()
+    ]
+    other_expense = _money(sum(Decimal(str(item["amount"])) for item in other_expense_categories))
     
-    for expense in other_expenses:
-        amount = expense.amount or Decimal("0")
-        other_expense += amount
-        other_expense_list.append({
-            "id": expense.id,
-            "name": expense.name,
-            "amount": float(amount),
-            "payment_method": expense.payment_method or "现金",
-            "description": expense.description,
-            "expense_date": expense.expense_date.strftime("%Y-%m-%d %H:%M:%S") if expense.expense_date else ""
-        })
+    other_expense_list = [
+        {
+            "id": row.id,
+            "name": row.name,
+            "amount": float(row.amount or 0),
+            "payment_method": row.payment_method or "现金",
+            "description": row.description,
+            "expense_date": row.expense_date.strftime("%Y-%m-%d %H:%M:%S") if row.expense_date else ""
+        }
+        for row in db.query(
+            OtherExpense.id, OtherExpense.name, OtherExpense.amount,
+            OtherExpense.payment_method, OtherExpense.description, OtherExpense.expense_date
+        ).filter(*expense_filters).order_by(OtherExpense.expense_date.desc()).all()
+    ]
     
     # 计算利润
     room_profit = room_income - room_expense
@@ -180,16 +179,7 @@ def get_category_statistics(
         room_income_details=convert_details(room_income_details),
         room_expense_details=convert_details(room_expense_details),
         other_income_list=other_income_list,
-        other_expense_list=other_expense_list
+        other_expense_list=other_expense_list,
+        other_income_categories=other_income_categories,
+        other_expense_categories=other_expense_categories
     )
-
-
-
-
-
-
-
-
-
-
-
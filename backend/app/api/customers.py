@@ -2,11 +2,15 @@
 客户管理API
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import or_, func, select, union_all, literal, null, case, tuple_
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from app.db.database import get_db
+from app.db.pagination import encode_cursor, decode_cursor, CURSOR_DESCRIPTION
+from app.services.business_date import business_day_bounds
+from app.services.admission import admission_route
+from app.services.system_config import get_default_payment_method
 from app.models.customer import Customer
 from app.models.room_customer import RoomCustomer
 from app.models.customer_loan import CustomerLoan
@@ -14,12 +18,13 @@ from app.models.customer_repayment import CustomerRepayment
 from app.models.session_result import SessionResult
 from app.models.transfer import Transfer
 from app.schemas.customer import (
-    CustomerCreate, CustomerUpdate, CustomerResponse, CustomerTransfer, CustomerBatchDelete
+    CustomerCreate, CustomerUpdate, CustomerResponse, CustomerTransfer, CustomerBatchDelete,
+    CustomerStatementResponse
 )
 from app.schemas.loan import LoanResponse, RepaymentResponse, RepaymentCreate
 from decimal import Decimal
 
-router = APIRouter(prefix="/api/customers", tags=["客户管理"])
+router = APIRouter(prefix="/api/customers", tags=["客户管理"], route_class=admission_route("detail", write_lane="cashier"))
 
 
 @router.get("", response_model=List[CustomerResponse])
@@ -352,6 +357,160 @@ def get_customer_repayments(customer_id: int, db: Session = Depends(get_db)):
     return repayments
 
 
+def _sort_key(column):
+    """统一格式的时间文本（精确到毫秒），带/不带微秒的时间都能按文本正确比较"""
+    return func.strftime("%Y-%m-%d %H:%M:%f", column)
+
+
+def _statement_ledger(customer_id: int):
+    """
+    将客户的借款、还款、转出的欠款和输赢记录合并为一个 UNION ALL 子查询
+
+    每个来源输出相同的列：类型、来源序号、记录ID、排序键、时间、记录金额、对余额的影响、房间使用记录ID、对方客户名称、支付方式、说明。
+    余额负数=欠款，正数=预存：借款（包括转移欠款时为转入方新建的借款）减少余额，还款增加余额，
+    转出欠款增加转出方的余额，输赢记录不影响余额。
+    """
+    def source(type_column, source_order, id_column, datetime_column, amount, balance_change,
+               session_id, counterparty_name, payment_method, description):
+        return select(
+            type_column.label("type"),
+            literal(source_order).label("source_order"),
+            id_column.label("id"),
+            _sort_key(datetime_column).label("sort_key"),
+            datetime_column.label("created_at"),
+            amount.label("amount"),
+            balance_change.label("balance_change"),
+            session_id.label("session_id"),
+            counterparty_name.label("counterparty_name"),
+            payment_method.label("payment_method"),
+            description.label("description"),
+        )
+
+    transfer_from_customer = aliased(Customer)
+    transfer_to_customer = aliased(Customer)
+
+    loans = source(
+        case((CustomerLoan.transfer_from_id.isnot(None), "transfer_in"), else_="loan"), 1,
+        CustomerLoan.id, CustomerLoan.created_at, CustomerLoan.amount, -CustomerLoan.amount,
+        CustomerLoan.session_id, transfer_from_customer.name, CustomerLoan.payment_method, CustomerLoan.description
+    ).select_from(CustomerLoan).outerjoin(
+        Transfer, Transfer.id == CustomerLoan.transfer_from_id
+    ).outerjoin(
+        transfer_from_customer, transfer_from_customer.id == Transfer.from_customer_id
+    ).where(CustomerLoan.customer_id == customer_id)
+
+    repayments = source(
+        literal("repayment"), 2,
+        CustomerRepayment.id, CustomerRepayment.created_at, CustomerRepayment.amount, CustomerRepayment.amount,
+        CustomerRepayment.session_id, null(), CustomerRepayment.payment_method, CustomerRepayment.description
+    ).where(CustomerRepayment.customer_id == customer_id)
+
+    transfers_out = source(
+        literal("transfer_out"), 3,
+        Transfer.id, Transfer.created_at, Transfer.amount, Transfer.amount,
+        null(), transfer_to_customer.name, null(), null()
+    ).select_from(Transfer).outerjoin(
+        transfer_to_customer, transfer_to_customer.id == Transfer.to_customer_id
+    ).where(Transfer.from_customer_id == customer_id)
+
+    session_results = source(
+        literal("session_result"), 4,
+        SessionResult.id, SessionResult.created_at, SessionResult.net_win_loss, literal(0),
+        SessionResult.session_id, null(), null(), null()
+    ).where(SessionResult.customer_id == customer_id)
+
+    return union_all(loans, repayments, transfers_out, session_results).subquery("ledger")
+
+
+@router.get("/{customer_id}/statement", response_model=CustomerStatementResponse)
+def get_customer_statement(
+    customer_id: int,
+    start_date: Optional[date] = Query(None, description="开始营业日，格式：YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="结束营业日，格式：YYYY-MM-DD"),
+    skip: int = Query(0, ge=0, description="跳过记录数"),
+    limit: int = Query(100, ge=1, le=1000, description="返回记录数"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION.replace("响应头 X-Next-Cursor", "返回的 next_cursor")),
+    db: Session = Depends(get_db)
+):
+    """
+    获取客户对账单
+    借款、还款、欠款转移和输赢记录按时间合并为一个流水（最新的在前），每条记录附带该笔之后的客户余额
+
+    余额 = 初期帐单 + 截至该记录的余额变动合计，由窗口函数在数据库中按时间顺序累计；
+    累计覆盖客户的全部记录，按营业日范围过滤和分页不影响余额，只返回当前页的记录。
+    """
+    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    if not customer:
+        raise HTTPException(status_code=404, detail="客户不存在")
+    
+    ledger = _statement_ledger(customer_id)
+    order = (ledger.c.sort_key, ledger.c.id, ledger.c.source_order)
+    running = select(
+        ledger,
+        func.sum(ledger.c.balance_change).over(order_by=order, rows=(None, 0)).label("balance_total")
+    ).subquery("running")
+    
+    # 按营业日过滤（营业日对应的时间范围，与排序键按相同的文本格式比较）
+    start_datetime, end_datetime = business_day_bounds(start_date, end_date)
+    def in_range(sort_key_column):
+        conditions = []
+        if start_datetime:
+            conditions.append(sort_key_column >= start_datetime.strftime("%Y-%m-%d %H:%M:%S.000"))
+        if end_datetime:
+            conditions.append(sort_key_column < end_datetime.strftime("%Y-%m-%d %H:%M:%S.000"))
+        return conditions
+    
+    total = db.execute(
+        select(func.count()).select_from(ledger).where(*in_range(ledger.c.sort_key))
+    ).scalar() or 0
+    
+    page_query = select(running).where(*in_range(running.c.sort_key)).order_by(
+        running.c.sort_key.desc(), running.c.id.desc(), running.c.source_order.desc()
+    )
+    next_cursor = None
+    if cursor is not None:
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 3:
+                raise HTTPException(status_code=400, detail="无效的分页游标")
+            page_query = page_query.where(
+                tuple_(running.c.sort_key, running.c.id, running.c.source_order) < tuple_(*values)
+            )
+        rows = db.execute(page_query.limit(limit + 1)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].sort_key, rows[-1].id, rows[-1].source_order)
+    else:
+        rows = db.execute(page_query.offset(skip).limit(limit)).all()
+    
+    initial_balance = (customer.initial_balance or Decimal("0")).quantize(Decimal("0.01"))
+    items = [
+        {
+            "type": row.type,
+            "id": row.id,
+            "created_at": row.created_at,
+            "amount": row.amount,
+            "balance_change": row.balance_change,
+            # SQLite 的 SUM 结果是浮点数，转换为两位小数
+            "balance": initial_balance + Decimal(str(row.balance_total or 0)).quantize(Decimal("0.01")),
+            "session_id": row.session_id,
+            "counterparty_name": row.counterparty_name,
+            "payment_method": row.payment_method,
+            "description": row.description,
+        }
+        for row in rows
+    ]
+    
+    return CustomerStatementResponse(
+        customer_id=customer.id,
+        customer_name=customer.name,
+        initial_balance=initial_balance,
+        items=items,
+        total=total,
+        next_cursor=next_cursor
+    )
+
+
 @router.post("/{customer_id}/repayment")
 def create_customer_repayment(
     customer_id: int,
@@ -462,7 +621,7 @@ def create_customer_repayment(
             message = "还款成功"
     
     # 生成说明（在创建记录之前）
-    payment_method = repayment.payment_method or "现金"
+    payment_method = repayment.payment_method or get_default_payment_method()
     if is_refund:
         description = f"退款/支付给客户 ({payment_method})"
     else:
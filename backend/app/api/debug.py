@@ -0,0 +1,68 @@
+"""
+调试API
+"""
+from fastapi import APIRouter, Query
+from typing import List, Optional
+from pydantic import BaseModel
+from app.services.query_profiler import (
+    recent_slow_requests, clear_slow_requests,
+    SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_COUNT_THRESHOLD, SLOW_QUERY_BUFFER_SIZE
+)
+
+router = APIRouter(prefix="/api/debug", tags=["调试"])
+
+
+class SlowStatement(BaseModel):
+    """慢语句"""
+    duration_ms: float
+    statement: str
+
+
+class SlowRequest(BaseModel):
+    """含慢语句或SQL条数过多的请求"""
+    time: str
+    method: str
+    path: str
+    status_code: int
+    query_count: int
+    db_time_ms: float
+    total_time_ms: float
+    slowest: List[SlowStatement]
+
+
+class SlowQueriesResponse(BaseModel):
+    """慢查询记录"""
+    threshold_ms: float
+    count_threshold: int
+    buffer_size: int
+    requests: List[SlowRequest]
+
+
+@router.get("/slow-queries", response_model=SlowQueriesResponse)
+def get_slow_queries(
+    limit: Optional[int] = Query(None, ge=1, description="返回记录数，不填则返回全部"),
+    path: Optional[str] = Query(None, description="接口路径筛选（包含）")
+):
+    """
+    获取最近的慢查询记录（内存中，服务重启后清空）
+    记录含超过 SLOW_QUERY_THRESHOLD_MS 的语句，或SQL条数达到 SLOW_QUERY_COUNT_THRESHOLD 的请求，
+    每个请求附带耗时最长的几条语句，最新的在前
+    """
+    entries = recent_slow_requests()
+    if path:
+        entries = [entry for entry in entries if path in entry["path"]]
+    if limit:
+        entries = entries[:limit]
+    return {
+        "threshold_ms": SLOW_QUERY_THRESHOLD_MS,
+        "count_threshold": SLOW_QUERY_COUNT_THRESHOLD,
+        "buffer_size": SLOW_QUERY_BUFFER_SIZE,
+        "requests": entries,
+    }
+
+
+@router.delete("/slow-queries")
+def delete_slow_queries():
+    """清空慢查询记录"""
+    clear_slow_requests()
+    return {"message": "已清空慢查询记录"}
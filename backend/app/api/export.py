@@ -11,6 +11,9 @@ from decimal import Decimal
 import io
 import csv
 from app.db.database import get_db
+from app.services.report_executor import ReportRoute
+from app.services.admission import admission_route
+from app.services.business_date import business_date_filter
 from app.models.customer import Customer
 from app.models.product import Product
 from app.models.room import Room
@@ -20,7 +23,7 @@ from app.models.customer_repayment import CustomerRepayment
 from app.models.product_consumption import ProductConsumption
 from app.models.meal_record import MealRecord
 
-router = APIRouter(prefix="/api/export", tags=["数据导出"])
+router = APIRouter(prefix="/api/export", tags=["数据导出"], route_class=admission_route("export", base=ReportRoute))
 
 
 def generate_csv(data, headers):
@@ -71,20 +74,15 @@ def export_customers(db: Session = Depends(get_db)):
 
 @router.get("/sessions")
 def export_sessions(
-    start_date: Optional[date] = Query(None, description="开始日期"),
-    end_date: Optional[date] = Query(None, description="结束日期"),
+    start_date: Optional[date] = Query(None, description="开始营业日"),
+    end_date: Optional[date] = Query(None, description="结束营业日"),
     db: Session = Depends(get_db)
 ):
     """导出房间使用记录"""
-    query = db.query(RoomSession).filter(RoomSession.status == "settled")
-    
-    if start_date:
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        query = query.filter(RoomSession.start_time >= start_datetime)
-    
-    if end_date:
-        end_datetime = datetime.combine(end_date, datetime.max.time())
-        query = query.filter(RoomSession.start_time <= end_datetime)
+    query = db.query(RoomSession).filter(
+        RoomSession.status == "settled",
+        *business_date_filter(RoomSession.business_date, start_date, end_date)
+    )
     
     sessions = query.order_by(RoomSession.created_at.desc()).all()
     
@@ -139,13 +137,9 @@ def export_monthly_report(
     else:
         end_date = date(year, month + 1, 1) - timedelta(days=1)
     
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-    
-    # 查询房间使用记录
+    # 查询房间使用记录（按营业日）
     sessions = db.query(RoomSession).filter(
-        RoomSession.start_time >= start_datetime,
-        RoomSession.start_time <= end_datetime,
+        *business_date_filter(RoomSession.business_date, start_date, end_date),
         RoomSession.status == "settled"
     ).order_by(RoomSession.start_time).all()
     
@@ -0,0 +1,227 @@
+"""
+库存流水与库存报表API
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, case, or_
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from app.db.database import get_db
+from app.services.report_executor import ReportRoute
+from app.services.admission import admission_route
+from app.db.pagination import keyset_paginate, NEXT_CURSOR_HEADER, CURSOR_DESCRIPTION
+from app.models.inventory_movement import InventoryMovement
+from app.models.product import Product
+from app.services.business_date import business_day_bounds, business_day_start
+from app.services.inventory import (
+    stock_at, take_snapshot, SALES_MOVEMENT_TYPES, PURCHASE_MOVEMENT_TYPES
+)
+from app.schemas.inventory import (
+    InventoryMovementResponse, StockAtItem, StockAtResponse,
+    InventoryTurnoverItem, InventoryTurnoverResponse,
+    InventoryShrinkageItem, InventoryShrinkageResponse
+)
+
+router = APIRouter(prefix="/api/inventory", tags=["库存管理"], route_class=admission_route("report", write_lane="cashier", base=ReportRoute))
+
+
+def _normal_products(db: Session, product_id: Optional[int] = None) -> List[Product]:
+    """普通商品列表（餐费类商品没有库存）"""
+    query = db.query(Product).filter(
+        or_(Product.product_type != "meal", Product.product_type.is_(None))
+    )
+    if product_id:
+        query = query.filter(Product.id == product_id)
+    return query.order_by(Product.id).all()
+
+
+def _date_range(start_date: date, end_date: date):
+    """营业日范围转换为时间范围 [开始, 结束)"""
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    return business_day_bounds(start_date, end_date)
+
+
+def _movement_totals(db: Session, start_datetime: datetime, end_datetime: datetime) -> dict:
+    """时间范围 [开始, 结束) 内按商品汇总的库存变动（一次分组查询）"""
+    quantity = InventoryMovement.quantity
+    movement_type = InventoryMovement.movement_type
+    is_loss = (movement_type.in_(("adjustment", "snapshot"))) & (quantity < 0)
+    rows = db.query(
+        InventoryMovement.product_id,
+        func.sum(case((movement_type.in_(PURCHASE_MOVEMENT_TYPES), quantity), else_=0)).label("purchased"),
+        func.sum(case((movement_type.in_(SALES_MOVEMENT_TYPES), -quantity), else_=0)).label("sold"),
+        func.sum(case((movement_type.in_(("initial", "adjustment", "snapshot")), quantity), else_=0)).label("adjusted"),
+        func.sum(case((is_loss, -quantity), else_=0)).label("shrinkage"),
+    ).filter(
+        InventoryMovement.created_at >= start_datetime,
+        InventoryMovement.created_at < end_datetime
+    ).group_by(InventoryMovement.product_id).all()
+    return {row.product_id: row for row in rows}
+
+
+@router.get("/movements", response_model=List[InventoryMovementResponse])
+def get_movements(
+    response: Response,
+    skip: int = Query(0, ge=0, description="跳过记录数"),
+    limit: int = Query(100, ge=1, le=1000, description="返回记录数"),
+    product_id: Optional[int] = Query(None, description="商品ID"),
+    movement_type: Optional[str] = Query(None, description="流水类型"),
+    start_date: Optional[date] = Query(None, description="开始日期"),
+    end_date: Optional[date] = Query(None, description="结束日期"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """获取库存流水（按时间倒序）"""
+    query = db.query(InventoryMovement).options(joinedload(InventoryMovement.product))
+
+    if product_id:
+        query = query.filter(InventoryMovement.product_id == product_id)
+
+    if movement_type:
+        query = query.filter(InventoryMovement.movement_type == movement_type)
+
+    start_datetime, end_datetime = business_day_bounds(start_date, end_date)
+    if start_datetime:
+        query = query.filter(InventoryMovement.created_at >= start_datetime)
+
+    if end_datetime:
+        query = query.filter(InventoryMovement.created_at < end_datetime)
+
+    if cursor is not None:
+        movements, next_cursor = keyset_paginate(query, InventoryMovement.created_at, InventoryMovement.id, cursor, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    else:
+        movements = query.order_by(
+            InventoryMovement.created_at.desc(), InventoryMovement.id.desc()
+        ).offset(skip).limit(limit).all()
+
+    return [
+        InventoryMovementResponse(
+            id=movement.id,
+            product_id=movement.product_id,
+            product_name=movement.product.name if movement.product else None,
+            movement_type=movement.movement_type,
+            quantity=movement.quantity,
+            stock_after=movement.stock_after,
+            reference_type=movement.reference_type,
+            reference_id=movement.reference_id,
+            created_at=movement.created_at
+        )
+        for movement in movements
+    ]
+
+
+@router.get("/stock-at", response_model=StockAtResponse)
+def get_stock_at(
+    at_date: date = Query(..., description="营业日，返回该营业日结束时的库存"),
+    product_id: Optional[int] = Query(None, description="商品ID"),
+    db: Session = Depends(get_db)
+):
+    """查询某营业日结束时的商品库存（取下一营业日开始之前的最后一条库存流水）"""
+    products = _normal_products(db, product_id)
+    stocks = stock_at(
+        db,
+        business_day_start(at_date + timedelta(days=1)),
+        [product.id for product in products] if product_id else None,
+        inclusive=False
+    )
+    return StockAtResponse(
+        date=at_date,
+        items=[
+            StockAtItem(product_id=product.id, product_name=product.name, stock=stocks.get(product.id))
+            for product in products
+        ]
+    )
+
+
+@router.get("/turnover", response_model=InventoryTurnoverResponse)
+def get_turnover(
+    start_date: date = Query(..., description="开始日期"),
+    end_date: date = Query(..., description="结束日期"),
+    db: Session = Depends(get_db)
+):
+    """
+    库存周转报表
+    期初、期末库存取自范围两端之前的最后一条流水，进货、销售、调整、损耗为范围内流水的分组汇总
+    """
+    start_datetime, end_datetime = _date_range(start_date, end_date)
+
+    products = _normal_products(db)
+    opening = stock_at(db, start_datetime, inclusive=False)
+    closing = stock_at(db, end_datetime, inclusive=False)
+    totals = _movement_totals(db, start_datetime, end_datetime)
+
+    items = []
+    for product in products:
+        total = totals.get(product.id)
+        opening_stock = opening.get(product.id, 0)
+        closing_stock = closing.get(product.id, opening_stock)
+        sold = int(total.sold or 0) if total else 0
+
+        average_stock = Decimal(opening_stock + closing_stock) / 2
+        turnover_rate = None
+        if average_stock > 0:
+            turnover_rate = (Decimal(sold) / average_stock).quantize(Decimal("0.01"))
+
+        items.append(InventoryTurnoverItem(
+            product_id=product.id,
+            product_name=product.name,
+            opening_stock=opening_stock,
+            purchased=int(total.purchased or 0) if total else 0,
+            sold=sold,
+            adjusted=int(total.adjusted or 0) if total else 0,
+            shrinkage=int(total.shrinkage or 0) if total else 0,
+            closing_stock=closing_stock,
+            turnover_rate=turnover_rate
+        ))
+
+    return InventoryTurnoverResponse(start_date=start_date, end_date=end_date, items=items)
+
+
+@router.get("/shrinkage", response_model=InventoryShrinkageResponse)
+def get_shrinkage(
+    start_date: date = Query(..., description="开始日期"),
+    end_date: date = Query(..., description="结束日期"),
+    db: Session = Depends(get_db)
+):
+    """库存损耗报表（库存减少的手工调整，以及快照发现的实际库存少于流水结余的差异）"""
+    start_datetime, end_datetime = _date_range(start_date, end_date)
+    totals = _movement_totals(db, start_datetime, end_datetime)
+
+    items = []
+    for product in _normal_products(db):
+        total = totals.get(product.id)
+        shrinkage = int(total.shrinkage or 0) if total else 0
+        if shrinkage <= 0:
+            continue
+        cost_price = product.cost_price or Decimal("0")
+        items.append(InventoryShrinkageItem(
+            product_id=product.id,
+            product_name=product.name,
+            shrinkage=shrinkage,
+            cost_price=cost_price,
+            shrinkage_cost=(cost_price * shrinkage).quantize(Decimal("0.01"))
+        ))
+
+    items.sort(key=lambda item: item.shrinkage_cost, reverse=True)
+    return InventoryShrinkageResponse(
+        start_date=start_date,
+        end_date=end_date,
+        total_shrinkage_cost=sum((item.shrinkage_cost for item in items), Decimal("0.00")),
+        items=items
+    )
+
+
+@router.post("/snapshot")
+def create_snapshot(db: Session = Depends(get_db)):
+    """立即为所有商品生成库存快照"""
+    try:
+        count = take_snapshot(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"生成库存快照失败: {str(e)}")
+    return {"message": f"已生成 {count} 条库存快照"}
@@ -1,17 +1,21 @@
 """
 操作日志API
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, desc
 from typing import List, Optional
 from datetime import datetime, date
 from app.db.database import get_db
+from app.services.report_executor import ReportRoute
+from app.services.admission import admission_route
 from app.models.operation_log import OperationLog
+from app.db.pagination import keyset_paginate, NEXT_CURSOR_HEADER, CURSOR_DESCRIPTION
+from app.services.operation_log_retention import archive_operation_logs, RETENTION_DAYS
 from pydantic import BaseModel, Field
 from decimal import Decimal
 
-router = APIRouter(prefix="/api/operation-logs", tags=["操作日志"])
+router = APIRouter(prefix="/api/operation-logs", tags=["操作日志"], route_class=admission_route("report", write_lane="export", base=ReportRoute))
 
 
 class OperationLogResponse(BaseModel):
@@ -38,6 +42,7 @@ class OperationLogResponse(BaseModel):
 
 @router.get("", response_model=List[OperationLogResponse])
 def get_operation_logs(
+    response: Response,
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(50, ge=1, le=1000, description="返回记录数"),
     username: Optional[str] = Query(None, description="用户名筛选"),
@@ -45,6 +50,7 @@ def get_operation_logs(
     module: Optional[str] = Query(None, description="模块筛选"),
     start_date: Optional[date] = Query(None, description="开始日期"),
     end_date: Optional[date] = Query(None, description="结束日期"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """获取操作日志列表"""
@@ -71,11 +77,40 @@ def get_operation_logs(
         end_datetime = datetime.combine(end_date, datetime.max.time())
         query = query.filter(OperationLog.created_at <= end_datetime)
     
-    # 按创建时间倒序排列
-    logs = query.order_by(desc(OperationLog.created_at)).offset(skip).limit(limit).all()
+    # 游标分页
+    if cursor is not None:
+        logs, next_cursor = keyset_paginate(query, OperationLog.created_at, OperationLog.id, cursor, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return logs
+    
+    # 按创建时间倒序排列（同一时间按ID倒序，保证翻页顺序稳定）
+    logs = query.order_by(desc(OperationLog.created_at), desc(OperationLog.id)).offset(skip).limit(limit).all()
     return logs
 
 
+@router.post("/archive")
+def archive_logs(
+    days: Optional[int] = Query(
+        None, ge=1, le=3650,
+        description="保留最近N天的日志，更早的日志归档到压缩文件；不填时使用配置的保留天数（OPERATION_LOG_RETENTION_DAYS）"
+    ),
+    db: Session = Depends(get_db)
+):
+    """立即归档操作日志（按月份写入压缩归档文件后从日志表删除）"""
+    if days is None:
+        if RETENTION_DAYS <= 0:
+            # 保留天数配置为 0 表示不归档，未指定天数时不删除任何日志
+            raise HTTPException(status_code=400, detail="已关闭操作日志自动归档（保留天数为0），请通过 days 参数指定保留天数")
+        days = RETENTION_DAYS
+    try:
+        archived_count = archive_operation_logs(db, retention_days=days)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"归档操作日志失败: {str(e)}")
+    return {"message": f"已归档 {archived_count} 条操作日志"}
+
+
 @router.get("/{log_id}", response_model=OperationLogResponse)
 def get_operation_log(log_id: int, db: Session = Depends(get_db)):
     """获取操作日志详情"""
@@ -5,35 +5,30 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import date
 from decimal import Decimal
 from app.db.database import get_db
+from app.services.admission import admission_route
+from app.services.system_config import get_default_payment_method
+from app.services.business_date import business_date_filter
 from app.models.other_expense import OtherExpense
 from app.schemas.other_expense import (
     OtherExpenseCreate, OtherExpenseUpdate, OtherExpenseResponse
 )
 
-router = APIRouter(prefix="/api/other-expenses", tags=["其它支出管理"])
+router = APIRouter(prefix="/api/other-expenses", tags=["其它支出管理"], route_class=admission_route("detail", write_lane="cashier"))
 
 
 @router.get("", response_model=List[OtherExpenseResponse])
 def get_other_expenses(
     skip: int = 0,
     limit: int = 100,
-    start_date: Optional[date] = Query(None, description="开始日期"),
-    end_date: Optional[date] = Query(None, description="结束日期"),
+    start_date: Optional[date] = Query(None, description="开始营业日"),
+    end_date: Optional[date] = Query(None, description="结束营业日"),
     db: Session = Depends(get_db)
 ):
     """获取其它支出列表"""
-    query = db.query(OtherExpense)
-    
-    if start_date:
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        query = query.filter(OtherExpense.expense_date >= start_datetime)
-    
-    if end_date:
-        end_datetime = datetime.combine(end_date, datetime.max.time())
-        query = query.filter(OtherExpense.expense_date <= end_datetime)
+    query = db.query(OtherExpense).filter(*business_date_filter(OtherExpense.business_date, start_date, end_date))
     
     expenses = query.order_by(OtherExpense.expense_date.desc(), OtherExpense.created_at.desc()).offset(skip).limit(limit).all()
     return expenses
@@ -54,7 +49,7 @@ def create_other_expense(expense: OtherExpenseCreate, db: Session = Depends(get_
     db_expense = OtherExpense(
         name=expense.name,
         amount=expense.amount,
-        payment_method=expense.payment_method or "现金",
+        payment_method=expense.payment_method or get_default_payment_method(),
         description=expense.description,
         expense_date=expense.expense_date
     )
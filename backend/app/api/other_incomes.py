@@ -4,35 +4,30 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import date
 from decimal import Decimal
 from app.db.database import get_db
+from app.services.admission import admission_route
+from app.services.system_config import get_default_payment_method
+from app.services.business_date import business_date_filter
 from app.models.other_income import OtherIncome
 from app.schemas.other_income import (
     OtherIncomeCreate, OtherIncomeUpdate, OtherIncomeResponse
 )
 
-router = APIRouter(prefix="/api/other-incomes", tags=["其它收入管理"])
+router = APIRouter(prefix="/api/other-incomes", tags=["其它收入管理"], route_class=admission_route("detail", write_lane="cashier"))
 
 
 @router.get("", response_model=List[OtherIncomeResponse])
 def get_other_incomes(
     skip: int = 0,
     limit: int = 100,
-    start_date: Optional[date] = Query(None, description="开始日期"),
-    end_date: Optional[date] = Query(None, description="结束日期"),
+    start_date: Optional[date] = Query(None, description="开始营业日"),
+    end_date: Optional[date] = Query(None, description="结束营业日"),
     db: Session = Depends(get_db)
 ):
     """获取其它收入列表"""
-    query = db.query(OtherIncome)
-    
-    if start_date:
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        query = query.filter(OtherIncome.income_date >= start_datetime)
-    
-    if end_date:
-        end_datetime = datetime.combine(end_date, datetime.max.time())
-        query = query.filter(OtherIncome.income_date <= end_datetime)
+    query = db.query(OtherIncome).filter(*business_date_filter(OtherIncome.business_date, start_date, end_date))
     
     incomes = query.order_by(OtherIncome.income_date.desc(), OtherIncome.created_at.desc()).offset(skip).limit(limit).all()
     return incomes
@@ -53,7 +48,7 @@ def create_other_income(income: OtherIncomeCreate, db: Session = Depends(get_db)
     db_income = OtherIncome(
         name=income.name,
         amount=income.amount,
-        payment_method=income.payment_method or "现金",
+        payment_method=income.payment_method or get_default_payment_method(),
         description=income.description,
         income_date=income.income_date
     )
@@ -3,11 +3,14 @@
 """
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, select, union_all, literal, null, tuple_
 from typing import Optional, List
 from datetime import date, datetime
 from decimal import Decimal
 from app.db.database import get_db
+from app.services.report_executor import ReportRoute
+from app.services.admission import admission_route
+from app.db.pagination import encode_signed_cursor, decode_signed_cursor, CURSOR_DESCRIPTION
 from app.models.room_session import RoomSession
 from app.models.customer_loan import CustomerLoan
 from app.models.customer_repayment import CustomerRepayment
@@ -15,13 +18,14 @@ from app.models.product_consumption import ProductConsumption
 from app.models.meal_record import MealRecord
 from app.models.other_expense import OtherExpense
 from app.models.other_income import OtherIncome
-from app.models.system_config import SystemConfig
+from app.services.system_config import get_initial_cash
+from app.services.business_date import business_date_filter
 from app.models.customer import Customer
 from app.models.room import Room
 from app.models.cash_transfer import CashTransfer
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 
-router = APIRouter(prefix="/api/payment-statistics", tags=["支付方式统计"])
+router = APIRouter(prefix="/api/payment-statistics", tags=["支付方式统计"], route_class=admission_route("report", write_lane="cashier", base=ReportRoute))
 
 
 class PaymentMethodStatisticsResponse(BaseModel):
@@ -40,8 +44,8 @@ class PaymentMethodStatisticsResponse(BaseModel):
 
 @router.get("", response_model=PaymentMethodStatisticsResponse)
 def get_payment_statistics(
-    start_date: Optional[date] = Query(None, description="开始日期，格式：YYYY-MM-DD"),
-    end_date: Optional[date] = Query(None, description="结束日期，格式：YYYY-MM-DD"),
+    start_date: Optional[date] = Query(None, description="开始营业日，格式：YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="结束营业日，格式：YYYY-MM-DD"),
     db: Session = Depends(get_db)
 ):
     """
@@ -49,8 +53,7 @@ def get_payment_statistics(
     支持按日期范围统计，如果不提供日期则统计所有数据
     """
     # 获取初期现金
-    initial_cash_config = db.query(SystemConfig).filter(SystemConfig.key == "initial_cash").first()
-    initial_cash = Decimal(initial_cash_config.value) if initial_cash_config else Decimal("0")
+    initial_cash = get_initial_cash()
     
     # 初始化统计
     cash_total = initial_cash
@@ -90,29 +93,14 @@ def get_payment_statistics(
         "other_expense": Decimal("0")
     }
     
-    # 构建日期过滤条件
-    date_filter = None
-    if start_date and end_date:
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        end_datetime = datetime.combine(end_date, datetime.max.time())
-        date_filter = lambda dt: start_datetime <= dt <= end_datetime
-    elif start_date:
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        date_filter = lambda dt: dt >= start_datetime
-    elif end_date:
-        end_datetime = datetime.combine(end_date, datetime.max.time())
-        date_filter = lambda dt: dt <= end_datetime
+    # 按营业日过滤（不提供日期时统计所有数据）
+    def in_range(business_date_column):
+        return business_date_filter(business_date_column, start_date, end_date)
     
     # 统计借款（减少现金/微信/支付宝）
-    loans_query = db.query(CustomerLoan)
-    if date_filter:
-        loans_query = loans_query.filter(CustomerLoan.created_at >= start_datetime if start_date else True,
-                                        CustomerLoan.created_at <= end_datetime if end_date else True)
-    loans = loans_query.all()
+    loans = db.query(CustomerLoan).filter(*in_range(CustomerLoan.business_date)).all()
     
     for loan in loans:
-        if date_filter and not date_filter(loan.created_at):
-            continue
         method = loan.payment_method or "现金"
         amount = loan.amount or Decimal("0")
         if method == "现金":
@@ -129,19 +117,9 @@ def get_payment_statistics(
             transfer_breakdown["loans"] += amount
     
     # 统计还款（增加现金/微信/支付宝）
-    if date_filter:
-        repayments_query = db.query(CustomerRepayment)
-        if start_datetime:
-            repayments_query = repayments_query.filter(CustomerRepayment.created_at >= start_datetime)
-        if end_datetime:
-            repayments_query = repayments_query.filter(CustomerRepayment.created_at <= end_datetime)
-        repayments = repayments_query.all()
-    else:
-        repayments = db.query(CustomerRepayment).all()
+    repayments = db.query(CustomerRepayment).filter(*in_range(CustomerRepayment.business_date)).all()
     
     for repayment in repayments:
-        if date_filter and not date_filter(repayment.created_at):
-            continue
         method = repayment.payment_method or "现金"
         amount = repayment.amount or Decimal("0")
         if method == "现金":
@@ -158,18 +136,11 @@ def get_payment_statistics(
             transfer_breakdown["repayments"] += amount
     
     # 统计房间收入（只统计台子费，因为台子费已包含商品消费和餐费）
-    sessions_query = db.query(RoomSession).filter(RoomSession.status == "settled")
-    if date_filter:
-        if start_datetime:
-            sessions_query = sessions_query.filter(RoomSession.start_time >= start_datetime)
-        if end_datetime:
-            sessions_query = sessions_query.filter(RoomSession.start_time <= end_datetime)
-    sessions = sessions_query.all()
+    sessions = db.query(RoomSession).filter(
+        RoomSession.status == "settled", *in_range(RoomSession.business_date)
+    ).all()
     
     for session in sessions:
-        if date_filter and not date_filter(session.start_time):
-            continue
-        
         # 台子费（台子费已包含商品消费和餐费，所以只统计台子费）
         table_fee = session.table_fee or Decimal("0")
         method = session.table_fee_payment_method or "现金"
@@ -189,19 +160,9 @@ def get_payment_statistics(
         # 注意：商品消费和餐费不单独统计，因为它们已包含在台子费中
     
     # 统计其它收入
-    if date_filter:
-        other_incomes_query = db.query(OtherIncome)
-        if start_datetime:
-            other_incomes_query = other_incomes_query.filter(OtherIncome.income_date >= start_datetime)
-        if end_datetime:
-            other_incomes_query = other_incomes_query.filter(OtherIncome.income_date <= end_datetime)
-        other_incomes = other_incomes_query.all()
-    else:
-        other_incomes = db.query(OtherIncome).all()
+    other_incomes = db.query(OtherIncome).filter(*in_range(OtherIncome.business_date)).all()
     
     for income in other_incomes:
-        if date_filter and not date_filter(income.income_date):
-            continue
         method = income.payment_method or "现金"
         amount = income.amount or Decimal("0")
         if method == "现金":
@@ -218,19 +179,9 @@ def get_payment_statistics(
             transfer_breakdown["other_income"] += amount
     
     # 统计其它支出
-    if date_filter:
-        other_expenses_query = db.query(OtherExpense)
-        if start_datetime:
-            other_expenses_query = other_expenses_query.filter(OtherExpense.expense_date >= start_datetime)
-        if end_datetime:
-            other_expenses_query = other_expenses_query.filter(OtherExpense.expense_date <= end_datetime)
-        other_expenses = other_expenses_query.all()
-    else:
-        other_expenses = db.query(OtherExpense).all()
+    other_expenses = db.query(OtherExpense).filter(*in_range(OtherExpense.business_date)).all()
     
     for expense in other_expenses:
-        if date_filter and not date_filter(expense.expense_date):
-            continue
         method = expense.payment_method or "现金"
         amount = expense.amount or Decimal("0")
         if method == "现金":
@@ -247,36 +198,20 @@ def get_payment_statistics(
             transfer_breakdown["other_expense"] += amount
     
     # 统计从银行取现（增加现金，但不产生利润，所以不统计在breakdown中）
-    if date_filter:
-        transfers_query = db.query(CashTransfer).filter(CashTransfer.transfer_type == "bank_to_cash")
-        if start_datetime:
-            transfers_query = transfers_query.filter(CashTransfer.transfer_date >= start_datetime)
-        if end_datetime:
-            transfers_query = transfers_query.filter(CashTransfer.transfer_date <= end_datetime)
-        transfers = transfers_query.all()
-    else:
-        transfers = db.query(CashTransfer).filter(CashTransfer.transfer_type == "bank_to_cash").all()
+    transfers = db.query(CashTransfer).filter(
+        CashTransfer.transfer_type == "bank_to_cash", *in_range(CashTransfer.business_date)
+    ).all()
     
     for transfer in transfers:
-        if date_filter and not date_filter(transfer.transfer_date):
-            continue
         # 从银行取现增加现金余额，但不产生利润，所以不统计在breakdown中
         cash_total += transfer.amount
     
     # 统计存入银行/取现（减少现金，但不产生利润，所以不统计在breakdown中）
-    if date_filter:
-        cash_to_bank_query = db.query(CashTransfer).filter(CashTransfer.transfer_type == "cash_to_bank")
-        if start_datetime:
-            cash_to_bank_query = cash_to_bank_query.filter(CashTransfer.transfer_date >= start_datetime)
-        if end_datetime:
-            cash_to_bank_query = cash_to_bank_query.filter(CashTransfer.transfer_date <= end_datetime)
-        cash_to_bank_transfers = cash_to_bank_query.all()
-    else:
-        cash_to_bank_transfers = db.query(CashTransfer).filter(CashTransfer.transfer_type == "cash_to_bank").all()
+    cash_to_bank_transfers = db.query(CashTransfer).filter(
+        CashTransfer.transfer_type == "cash_to_bank", *in_range(CashTransfer.business_date)
+    ).all()
     
     for transfer in cash_to_bank_transfers:
-        if date_filter and not date_filter(transfer.transfer_date):
-            continue
         # 存入银行/取现减少现金余额，但不产生利润，所以不统计在breakdown中
         cash_total -= transfer.amount
     
@@ -327,281 +262,207 @@ class CashFlowItem(BaseModel):
 class CashFlowListResponse(BaseModel):
     """现金流水列表响应模型"""
     items: List[CashFlowItem] = Field(default_factory=list, description="流水列表")
-    total: int = Field(..., description="总记录数")
+    total: Optional[int] = Field(None, description="总记录数（游标分页时只在首页返回）")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（仅游标分页时返回，没有下一页时为空）")
+
+
+# 一页最多1000条流水，整页一次校验，比逐条创建 CashFlowItem 快
+_cash_flow_items = TypeAdapter(List[CashFlowItem])
+
+
+def _is_cash(column):
+    """现金支付（未填写支付方式的记录按现金处理）"""
+    return (column == "现金") | (column.is_(None))
+
+
+def _cash_flow_union(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    将所有现金流水来源合并为一个 UNION ALL 子查询
+
+    每个来源输出相同的列：类型、来源序号、记录ID、排序键、时间、带符号金额、客户名称、房间名称、支付方式、名称/备注。
+    排序键是统一格式的时间文本（精确到毫秒），与记录ID、来源序号一起构成稳定的全序，用于排序和游标分页。
+    """
+    def sort_key(column):
+        return func.strftime("%Y-%m-%d %H:%M:%f", column)
+
+    def in_range(business_date_column):
+        return business_date_filter(business_date_column, start_date, end_date)
+
+    def source(type_name, source_order, id_column, datetime_column, amount, customer_name, room_name, payment_method, label):
+        return select(
+            literal(type_name).label("type"),
+            literal(source_order).label("source_order"),
+            id_column.label("id"),
+            sort_key(datetime_column).label("sort_key"),
+            datetime_column.label("record_datetime"),
+            amount.label("amount"),
+            customer_name.label("customer_name"),
+            room_name.label("room_name"),
+            payment_method.label("payment_method"),
+            label.label("label"),
+        )
+
+    # 1. 借款记录（现金支付，减少现金）
+    loans = source(
+        "loan", 0, CustomerLoan.id, CustomerLoan.created_at, -CustomerLoan.amount,
+        Customer.name, null(), CustomerLoan.payment_method, null()
+    ).join(Customer, CustomerLoan.customer_id == Customer.id).where(
+        _is_cash(CustomerLoan.payment_method), *in_range(CustomerLoan.business_date)
+    )
+
+    # 2. 还款记录（现金支付，增加现金）
+    repayments = source(
+        "repayment", 1, CustomerRepayment.id, CustomerRepayment.created_at, CustomerRepayment.amount,
+        Customer.name, null(), CustomerRepayment.payment_method, null()
+    ).join(Customer, CustomerRepayment.customer_id == Customer.id).where(
+        _is_cash(CustomerRepayment.payment_method), *in_range(CustomerRepayment.business_date)
+    )
+
+    # 3. 房间收入（台子费，现金支付，增加现金）
+    room_incomes = source(
+        "room_income", 2, RoomSession.id, RoomSession.start_time, RoomSession.table_fee,
+        null(), Room.name, RoomSession.table_fee_payment_method, null()
+    ).outerjoin(Room, RoomSession.room_id == Room.id).where(
+        RoomSession.status == "settled",
+        RoomSession.table_fee > 0,
+        _is_cash(RoomSession.table_fee_payment_method),
+        *in_range(RoomSession.business_date)
+    )
+
+    # 4. 其它收入（现金支付，增加现金）
+    other_incomes = source(
+        "other_income", 3, OtherIncome.id, OtherIncome.income_date, OtherIncome.amount,
+        null(), null(), OtherIncome.payment_method, OtherIncome.name
+    ).where(_is_cash(OtherIncome.payment_method), *in_range(OtherIncome.business_date))
+
+    # 5. 其它支出（现金支付，减少现金）
+    other_expenses = source(
+        "other_expense", 4, OtherExpense.id, OtherExpense.expense_date, -OtherExpense.amount,
+        null(), null(), OtherExpense.payment_method, OtherExpense.name
+    ).where(_is_cash(OtherExpense.payment_method), *in_range(OtherExpense.business_date))
+
+    # 6. 从银行取现（增加现金）
+    bank_to_cash = source(
+        "bank_to_cash", 5, CashTransfer.id, CashTransfer.transfer_date, CashTransfer.amount,
+        null(), null(), literal("银行转账"), CashTransfer.description
+    ).where(CashTransfer.transfer_type == "bank_to_cash", *in_range(CashTransfer.business_date))
+
+    # 7. 存入银行/取现（减少现金）
+    cash_to_bank = source(
+        "cash_to_bank", 6, CashTransfer.id, CashTransfer.transfer_date, -CashTransfer.amount,
+        null(), null(), literal("银行转账"), CashTransfer.description
+    ).where(CashTransfer.transfer_type == "cash_to_bank", *in_range(CashTransfer.business_date))
+
+    return union_all(
+        loans, repayments, room_incomes, other_incomes, other_expenses, bank_to_cash, cash_to_bank
+    ).subquery("cash_flow")
+
+
+def _cash_flow_description(row) -> str:
+    """生成流水描述"""
+    if row.type == "loan":
+        return f"借款 - {row.customer_name or '未知客户'}"
+    if row.type == "repayment":
+        return f"还款 - {row.customer_name or '未知客户'}"
+    if row.type == "room_income":
+        return f"房间收入（台子费） - {row.room_name or '未知房间'}"
+    if row.type == "other_income":
+        return f"其它收入 - {row.label}"
+    if row.type == "other_expense":
+        return f"其它支出 - {row.label}"
+    # 转账记录直接返回原始描述，不拼接前缀
+    return row.label or ""
 
 
 @router.get("/cash-flow", response_model=CashFlowListResponse)
 def get_cash_flow(
-    start_date: Optional[date] = Query(None, description="开始日期，格式：YYYY-MM-DD"),
-    end_date: Optional[date] = Query(None, description="结束日期，格式：YYYY-MM-DD"),
+    start_date: Optional[date] = Query(None, description="开始营业日，格式：YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="结束营业日，格式：YYYY-MM-DD"),
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(100, ge=1, le=1000, description="返回记录数"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION.replace("响应头 X-Next-Cursor", "返回的 next_cursor")),
     db: Session = Depends(get_db)
 ):
     """
     获取现金流水明细列表
     支持按日期范围过滤，返回所有现金相关的记录
+
+    只查询当前页的记录，每条记录后的现金余额由“截至当前页第一条记录的现金累计”倒推得到，
+    不需要把全部流水加载到内存中排序。
+    游标分页时下一页第一条记录后的现金余额保存在带签名的游标中，后续页不再统计总数和累计金额，每页只查询当前页的记录。
     """
-    # 获取初期现金
-    initial_cash_config = db.query(SystemConfig).filter(SystemConfig.key == "initial_cash").first()
-    initial_cash = Decimal(initial_cash_config.value) if initial_cash_config else Decimal("0")
-    
-    items = []
-    
-    # 构建日期过滤条件
-    start_datetime = None
-    end_datetime = None
-    if start_date:
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-    if end_date:
-        end_datetime = datetime.combine(end_date, datetime.max.time())
-    
-    # 计算起始余额（日期范围之前的所有现金交易）
-    starting_balance = initial_cash
-    if start_datetime:
-        # 计算start_datetime之前的所有现金交易
-        # 借款（减少）
-        loans_before = db.query(CustomerLoan).filter(
-            CustomerLoan.created_at < start_datetime,
-            (CustomerLoan.payment_method == "现金") | (CustomerLoan.payment_method.is_(None))
-        ).all()
-        for loan in loans_before:
-            starting_balance -= loan.amount
-        
-        # 还款（增加）
-        repayments_before = db.query(CustomerRepayment).filter(
-            CustomerRepayment.created_at < start_datetime,
-            (CustomerRepayment.payment_method == "现金") | (CustomerRepayment.payment_method.is_(None))
-        ).all()
-        for repayment in repayments_before:
-            starting_balance += repayment.amount
-        
-        # 房间收入（增加）
-        sessions_before = db.query(RoomSession).filter(
-            RoomSession.status == "settled",
-            RoomSession.start_time < start_datetime,
-            (RoomSession.table_fee_payment_method == "现金") | (RoomSession.table_fee_payment_method.is_(None))
-        ).all()
-        for session in sessions_before:
-            if session.table_fee and session.table_fee > 0:
-                starting_balance += session.table_fee
-        
-        # 其它收入（增加）
-        incomes_before = db.query(OtherIncome).filter(
-            OtherIncome.income_date < start_datetime,
-            (OtherIncome.payment_method == "现金") | (OtherIncome.payment_method.is_(None))
-        ).all()
-        for income in incomes_before:
-            starting_balance += income.amount
-        
-        # 其它支出（减少）
-        expenses_before = db.query(OtherExpense).filter(
-            OtherExpense.expense_date < start_datetime,
-            (OtherExpense.payment_method == "现金") | (OtherExpense.payment_method.is_(None))
-        ).all()
-        for expense in expenses_before:
-            starting_balance -= expense.amount
-        
-        # 从银行取现（增加）
-        transfers_before = db.query(CashTransfer).filter(
-            CashTransfer.transfer_date < start_datetime,
-            CashTransfer.transfer_type == "bank_to_cash"
-        ).all()
-        for transfer in transfers_before:
-            starting_balance += transfer.amount
-        
-        # 存入银行/取现（减少）
-        cash_to_bank_before = db.query(CashTransfer).filter(
-            CashTransfer.transfer_date < start_datetime,
-            CashTransfer.transfer_type == "cash_to_bank"
-        ).all()
-        for transfer in cash_to_bank_before:
-            starting_balance -= transfer.amount
-    
-    # 1. 获取借款记录（现金支付）
-    loans_query = db.query(CustomerLoan).join(Customer, CustomerLoan.customer_id == Customer.id)
-    if start_datetime:
-        loans_query = loans_query.filter(CustomerLoan.created_at >= start_datetime)
-    if end_datetime:
-        loans_query = loans_query.filter(CustomerLoan.created_at <= end_datetime)
-    loans = loans_query.filter(
-        (CustomerLoan.payment_method == "现金") | (CustomerLoan.payment_method.is_(None))
-    ).all()
-    
-    for loan in loans:
-        items.append(CashFlowItem(
-            id=loan.id,
-            type="loan",
-            amount=-loan.amount,  # 借款为负数
-            record_datetime=loan.created_at,
-            description=f"借款 - {loan.customer.name if loan.customer else '未知客户'}",
-            customer_name=loan.customer.name if loan.customer else None,
-            room_name=None,
-            payment_method=loan.payment_method or "现金",
-            cash_balance=Decimal("0")  # 稍后计算
-        ))
-    
-    # 2. 获取还款记录（现金支付）
-    repayments_query = db.query(CustomerRepayment).join(Customer, CustomerRepayment.customer_id == Customer.id)
-    if start_datetime:
-        repayments_query = repayments_query.filter(CustomerRepayment.created_at >= start_datetime)
-    if end_datetime:
-        repayments_query = repayments_query.filter(CustomerRepayment.created_at <= end_datetime)
-    repayments = repayments_query.filter(
-        (CustomerRepayment.payment_method == "现金") | (CustomerRepayment.payment_method.is_(None))
-    ).all()
-    
-    for repayment in repayments:
-        items.append(CashFlowItem(
-            id=repayment.id,
-            type="repayment",
-            amount=repayment.amount,  # 还款为正数
-            record_datetime=repayment.created_at,
-            description=f"还款 - {repayment.customer.name if repayment.customer else '未知客户'}",
-            customer_name=repayment.customer.name if repayment.customer else None,
-            room_name=None,
-            payment_method=repayment.payment_method or "现金",
-            cash_balance=Decimal("0")  # 稍后计算
-        ))
-    
-    # 3. 获取房间收入（台子费，现金支付）
-    sessions_query = db.query(RoomSession).join(Room, RoomSession.room_id == Room.id)
-    sessions_query = sessions_query.filter(RoomSession.status == "settled")
-    if start_datetime:
-        sessions_query = sessions_query.filter(RoomSession.start_time >= start_datetime)
-    if end_datetime:
-        sessions_query = sessions_query.filter(RoomSession.start_time <= end_datetime)
-    sessions = sessions_query.filter(
-        (RoomSession.table_fee_payment_method == "现金") | (RoomSession.table_fee_payment_method.is_(None))
-    ).all()
-    
-    for session in sessions:
-        if session.table_fee and session.table_fee > 0:
-            items.append(CashFlowItem(
-                id=session.id,
-                type="room_income",
-                amount=session.table_fee,  # 房间收入为正数
-                record_datetime=session.start_time,
-                description=f"房间收入（台子费） - {session.room.name if session.room else '未知房间'}",
-                customer_name=None,
-                room_name=session.room.name if session.room else None,
-                payment_method=session.table_fee_payment_method or "现金",
-                cash_balance=Decimal("0")  # 稍后计算
-            ))
-    
-    # 4. 获取其它收入（现金支付）
-    other_incomes_query = db.query(OtherIncome)
-    if start_datetime:
-        other_incomes_query = other_incomes_query.filter(OtherIncome.income_date >= start_datetime)
-    if end_datetime:
-        other_incomes_query = other_incomes_query.filter(OtherIncome.income_date <= end_datetime)
-    other_incomes = other_incomes_query.filter(
-        (OtherIncome.payment_method == "现金") | (OtherIncome.payment_method.is_(None))
-    ).all()
-    
-    for income in other_incomes:
-        items.append(CashFlowItem(
-            id=income.id,
-            type="other_income",
-            amount=income.amount,  # 其它收入为正数
-            record_datetime=income.income_date,
-            description=f"其它收入 - {income.name}",
-            customer_name=None,
-            room_name=None,
-            payment_method=income.payment_method or "现金",
-            cash_balance=Decimal("0")  # 稍后计算
-        ))
-    
-    # 5. 获取其它支出（现金支付）
-    other_expenses_query = db.query(OtherExpense)
-    if start_datetime:
-        other_expenses_query = other_expenses_query.filter(OtherExpense.expense_date >= start_datetime)
-    if end_datetime:
-        other_expenses_query = other_expenses_query.filter(OtherExpense.expense_date <= end_datetime)
-    other_expenses = other_expenses_query.filter(
-        (OtherExpense.payment_method == "现金") | (OtherExpense.payment_method.is_(None))
-    ).all()
-    
-    for expense in other_expenses:
-        items.append(CashFlowItem(
-            id=expense.id,
-            type="other_expense",
-            amount=-expense.amount,  # 其它支出为负数
-            record_datetime=expense.expense_date,
-            description=f"其它支出 - {expense.name}",
-            customer_name=None,
-            room_name=None,
-            payment_method=expense.payment_method or "现金",
-            cash_balance=Decimal("0")  # 稍后计算
-        ))
-    
-    # 6. 获取从银行取现记录
-    transfers_query = db.query(CashTransfer).filter(
-        CashTransfer.transfer_type == "bank_to_cash"
-    )
-    if start_datetime:
-        transfers_query = transfers_query.filter(CashTransfer.transfer_date >= start_datetime)
-    if end_datetime:
-        transfers_query = transfers_query.filter(CashTransfer.transfer_date <= end_datetime)
-    transfers = transfers_query.all()
-    
-    for transfer in transfers:
-        items.append(CashFlowItem(
-            id=transfer.id,
-            type="bank_to_cash",
-            amount=transfer.amount,  # 从银行取现为正数（增加现金）
-            record_datetime=transfer.transfer_date,
-            description=transfer.description or "",  # 直接返回原始描述，不拼接前缀
-            customer_name=None,
-            room_name=None,
-            payment_method="银行转账",
-            cash_balance=Decimal("0"),  # 稍后计算
-            transfer_id=transfer.id  # 添加transfer_id用于更新
-        ))
-    
-    # 7. 获取存入银行/取现记录
-    cash_to_bank_query = db.query(CashTransfer).filter(
-        CashTransfer.transfer_type == "cash_to_bank"
+    # 按营业日过滤
+    flow = _cash_flow_union(start_date, end_date)
+    position = tuple_(flow.c.sort_key, flow.c.id, flow.c.source_order)
+    
+    # 游标分页的后续页不统计总数
+    total = None
+    if not cursor:
+        total = db.execute(select(func.count()).select_from(flow)).scalar() or 0
+    
+    # 按时间倒序（最新的在前），同一时间按ID倒序
+    page_query = select(flow).order_by(
+        flow.c.sort_key.desc(), flow.c.id.desc(), flow.c.source_order.desc()
     )
-    if start_datetime:
-        cash_to_bank_query = cash_to_bank_query.filter(CashTransfer.transfer_date >= start_datetime)
-    if end_datetime:
-        cash_to_bank_query = cash_to_bank_query.filter(CashTransfer.transfer_date <= end_datetime)
-    cash_to_bank_transfers = cash_to_bank_query.all()
+    has_more = False
+    current_balance = None
+    if cursor is not None:
+        if cursor:
+            values = decode_signed_cursor(cursor)
+            if len(values) != 4:
+                raise HTTPException(status_code=400, detail="无效的分页游标")
+            try:
+                current_balance = Decimal(values[3])
+            except (ArithmeticError, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="无效的分页游标")
+            page_query = page_query.where(position < tuple_(*values[:3]))
+        rows = db.execute(page_query.limit(limit + 1)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+    else:
+        rows = db.execute(page_query.offset(skip).limit(limit)).all()
+    
+    if not rows:
+        return CashFlowListResponse(items=[], total=total)
+    
+    if current_balance is None:
+        # 当前页第一条记录后的现金余额 = 初期现金 + 截至该记录（含）的全部现金流水
+        all_flow = _cash_flow_union()
+        first = rows[0]
+        flow_until_first = db.execute(
+            select(func.sum(all_flow.c.amount)).where(
+                tuple_(all_flow.c.sort_key, all_flow.c.id, all_flow.c.source_order)
+                <= tuple_(first.sort_key, first.id, first.source_order)
+            )
+        ).scalar()
+        current_balance = get_initial_cash() + Decimal(str(flow_until_first or 0)).quantize(Decimal("0.01"))
     
-    for transfer in cash_to_bank_transfers:
-        items.append(CashFlowItem(
-            id=transfer.id,
-            type="cash_to_bank",
-            amount=-transfer.amount,  # 存入银行/取现为负数（减少现金）
-            record_datetime=transfer.transfer_date,
-            description=transfer.description or "",  # 直接返回原始描述，不拼接前缀
-            customer_name=None,
-            room_name=None,
-            payment_method="银行转账",
-            cash_balance=Decimal("0"),  # 稍后计算
-            transfer_id=transfer.id  # 添加transfer_id用于更新
-        ))
-    
-    # 按时间正序排序（从早到晚），如果时间相同则按ID正序，用于计算余额
-    # 这样确保先发生的记录先计算余额
-    items.sort(key=lambda x: (x.record_datetime, x.id))
-    
-    # 计算每条记录后的现金余额
-    current_balance = starting_balance
-    for item in items:
-        current_balance += item.amount
-        item.cash_balance = current_balance
-    
-    # 按时间倒序排序（最新的在前），如果时间相同则按ID倒序，用于显示
-    # 这样确保最新的记录显示在最上面，同一时间的记录按ID倒序（ID大的在前，因为通常是后创建的）
-    items.sort(key=lambda x: (x.record_datetime, x.id), reverse=True)
-    
-    # 分页
-    total = len(items)
-    paginated_items = items[skip:skip + limit]
-    
-    return CashFlowListResponse(items=paginated_items, total=total)
+    items = []
+    for row in rows:
+        is_transfer = row.type in ("bank_to_cash", "cash_to_bank")
+        items.append({
+            "id": row.id,
+            "type": row.type,
+            "amount": row.amount,
+            "record_datetime": row.record_datetime,
+            "description": _cash_flow_description(row),
+            "customer_name": row.customer_name,
+            "room_name": row.room_name,
+            "payment_method": row.payment_method or "现金",
+            "cash_balance": current_balance,
+            "transfer_id": row.id if is_transfer else None  # 转账记录ID用于更新
+        })
+        # 往前一条记录的余额 = 本条余额 - 本条金额
+        current_balance -= row.amount
+    
+    # 游标中带上下一页第一条记录后的现金余额（游标带签名，客户端不能修改余额）
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_signed_cursor(last.sort_key, last.id, last.source_order, str(current_balance))
+    
+    return CashFlowListResponse(items=_cash_flow_items.validate_python(items), total=total, next_cursor=next_cursor)
 
 
 # 创建从银行取现记录的请求模型
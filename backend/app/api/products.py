@@ -9,6 +9,7 @@ from app.db.database import get_db
 from app.models.product import Product
 from app.models.product_consumption import ProductConsumption
 from app.models.meal_record import MealRecord
+from app.services.inventory import record_movement
 from app.schemas.product import (
     ProductCreate, ProductUpdate, ProductResponse, StockAdjust
 )
@@ -55,6 +56,8 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     """创建商品"""
     db_product = Product(**product.dict())
     db.add(db_product)
+    db.flush()  # 获取ID
+    record_movement(db, db_product, db_product.stock, "initial")
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -72,9 +75,14 @@ def update_product(
         raise HTTPException(status_code=404, detail="商品不存在")
     
     update_data = product_update.dict(exclude_unset=True)
+    old_stock = db_product.stock
     for field, value in update_data.items():
         setattr(db_product, field, value)
     
+    # 直接修改库存时记录为手工调整
+    if db_product.stock is not None and old_stock is not None:
+        record_movement(db, db_product, db_product.stock - old_stock, "adjustment")
+    
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -131,6 +139,7 @@ def adjust_stock(
         raise HTTPException(status_code=400, detail="库存不足，无法减少")
     
     db_product.stock = new_stock
+    record_movement(db, db_product, stock_adjust.adjustment, "adjustment")
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -1,112 +1,206 @@
 """
 进货管理API
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File, Form
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, update, case, bindparam, Integer, Numeric
+from pydantic import ValidationError
+from typing import Dict, List, Optional, Tuple
 from datetime import date
 from decimal import Decimal
+import csv
+import io
 from app.db.database import get_db
+from app.services.report_executor import ReportRoute
+from app.services.admission import admission_route
+from app.db.pagination import keyset_paginate, NEXT_CURSOR_HEADER
+from app.services.inventory import record_movement, record_movements_for_products
 from app.models.purchase import Purchase, PurchaseItem
 from app.models.supplier import Supplier
 from app.models.product import Product
 from app.schemas.purchase import (
-    PurchaseCreate, PurchaseUpdate, PurchaseResponse, PurchaseItemResponse
+    PurchaseCreate, PurchaseItemCreate, PurchaseUpdate, PurchaseResponse, PurchaseItemResponse,
+    PurchaseSupplierSummary, PurchaseSummaryResponse
 )
 
-router = APIRouter(prefix="/api/purchases", tags=["进货管理"])
+router = APIRouter(prefix="/api/purchases", tags=["进货管理"], route_class=admission_route("report", write_lane="cashier", base=ReportRoute))
 
 
-def update_product_stock_and_cost(product: Product, quantity: int, unit_price: Decimal):
-    """更新商品库存和成本价（加权平均）"""
-    # 增加库存
-    product.stock = product.stock + quantity
+# CSV 进货单导入支持的列名（中文表头与英文表头均可）
+IMPORT_COLUMNS = {
+    "product_id": ("商品ID", "product_id"),
+    "product_name": ("商品名称", "名称", "product_name"),
+    "quantity": ("数量", "进货数量", "quantity"),
+    "unit_price": ("单价", "进货单价", "unit_price"),
+}
+
+
+def apply_purchase_to_products(db: Session, totals: Dict[int, Tuple[int, Decimal]]):
+    """
+    批量更新商品库存和成本价（加权平均）
+    totals: 商品ID -> (进货数量, 进货金额)
+    
+    新成本价 = (原库存*原成本价 + 进货金额) / (原库存+进货数量)；
+    原库存为0（或负数）时直接使用本次进货的平均单价，进货后库存仍不大于0时成本价不变。
+    所有商品在一条 UPDATE 语句中按数据库中的当前值计算，不依赖之前读出的库存。
+    """
+    if not totals:
+        return
     
-    # 计算加权平均成本价
-    # 新成本价 = (原库存*原成本价 + 进货数量*进货单价) / (原库存+进货数量)
-    if product.stock > 0:
-        old_stock = product.stock - quantity
-        if old_stock > 0:
-            # 加权平均
-            new_cost_price = (old_stock * product.cost_price + quantity * unit_price) / product.stock
-        else:
-            # 如果原库存为0，直接使用进货单价
-            new_cost_price = unit_price
-        product.cost_price = new_cost_price
+    quantity = bindparam("purchase_quantity", type_=Integer)
+    amount = bindparam("purchase_amount", type_=Numeric(12, 2))
+    stmt = update(Product.__table__).where(Product.id == bindparam("product_id")).values(
+        stock=Product.stock + quantity,
+        cost_price=case(
+            (Product.stock + quantity <= 0, Product.cost_price),
+            (Product.stock > 0, (Product.stock * Product.cost_price + amount) / (Product.stock + quantity)),
+            else_=amount / quantity
+        )
+    )
+    db.execute(stmt, [
+        {"product_id": product_id, "purchase_quantity": item_quantity, "purchase_amount": item_amount}
+        for product_id, (item_quantity, item_amount) in totals.items()
+    ])
+
+
+def _purchase_load_options():
+    """进货单列表/详情的预加载：供货商随主查询 JOIN，明细及其商品用 IN 查询一次性加载"""
+    return (
+        joinedload(Purchase.supplier),
+        selectinload(Purchase.items).joinedload(PurchaseItem.product),
+    )
+
+
+def _filter_purchases(query, supplier_id: Optional[int], start_date: Optional[date], end_date: Optional[date]):
+    """按供货商和进货日期范围筛选进货单"""
+    if supplier_id:
+        query = query.filter(Purchase.supplier_id == supplier_id)
+    
+    if start_date:
+        query = query.filter(Purchase.purchase_date >= start_date)
+    
+    if end_date:
+        query = query.filter(Purchase.purchase_date <= end_date)
+    
+    return query
+
+
+def _to_purchase_response(purchase: Purchase) -> PurchaseResponse:
+    """将进货单（已预加载供货商、明细和商品）转换为响应模型"""
+    return PurchaseResponse(
+        id=purchase.id,
+        supplier_id=purchase.supplier_id,
+        purchase_date=purchase.purchase_date,
+        notes=purchase.notes,
+        total_amount=purchase.total_amount,
+        created_at=purchase.created_at,
+        updated_at=purchase.updated_at,
+        supplier_name=purchase.supplier.name if purchase.supplier else None,
+        items=[
+            PurchaseItemResponse(
+                id=item.id,
+                purchase_id=item.purchase_id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                total_price=item.total_price,
+                created_at=item.created_at,
+                product_name=item.product.name if item.product else None
+            )
+            for item in purchase.items
+        ]
+    )
 
 
 @router.get("", response_model=List[PurchaseResponse])
 def get_purchases(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     supplier_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """获取进货单列表"""
-    query = db.query(Purchase)
-    
-    if supplier_id:
-        query = query.filter(Purchase.supplier_id == supplier_id)
+    """
+    获取进货单列表
     
-    if start_date:
-        query = query.filter(Purchase.purchase_date >= start_date)
+    传入 cursor 时使用游标分页（首页传空字符串），下一页游标在响应头 X-Next-Cursor 中返回
+    """
+    query = _filter_purchases(
+        db.query(Purchase).options(*_purchase_load_options()),
+        supplier_id, start_date, end_date
+    )
     
-    if end_date:
-        query = query.filter(Purchase.purchase_date <= end_date)
+    if cursor is not None:
+        purchases, next_cursor = keyset_paginate(query, Purchase.purchase_date, Purchase.id, cursor, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    else:
+        purchases = query.order_by(Purchase.purchase_date.desc(), Purchase.id.desc()).offset(skip).limit(limit).all()
     
-    purchases = query.order_by(Purchase.purchase_date.desc()).offset(skip).limit(limit).all()
+    return [_to_purchase_response(purchase) for purchase in purchases]
+
+
+@router.get("/summary", response_model=PurchaseSummaryResponse)
+def get_purchase_summary(
+    supplier_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """获取进货汇总（总金额、进货单数，以及按供货商分组的汇总）"""
+    rows = _filter_purchases(
+        db.query(
+            Purchase.supplier_id,
+            Supplier.name.label("supplier_name"),
+            func.count(Purchase.id).label("purchase_count"),
+            func.coalesce(func.sum(Purchase.total_amount), 0).label("total_amount"),
+        ).outerjoin(Supplier, Purchase.supplier_id == Supplier.id),
+        supplier_id, start_date, end_date
+    ).group_by(Purchase.supplier_id, Supplier.name).order_by(
+        func.sum(Purchase.total_amount).desc(), Purchase.supplier_id
+    ).all()
     
-    # 添加供货商名称
-    result = []
-    for purchase in purchases:
-        purchase_dict = {
-            **purchase.__dict__,
-            "supplier_name": purchase.supplier.name if purchase.supplier else None,
-            "items": []
-        }
-        # 添加明细
-        for item in purchase.items:
-            item_dict = {
-                **item.__dict__,
-                "product_name": item.product.name if item.product else None
-            }
-            purchase_dict["items"].append(item_dict)
-        result.append(purchase_dict)
+    suppliers = [
+        PurchaseSupplierSummary(
+            supplier_id=row.supplier_id,
+            supplier_name=row.supplier_name,
+            purchase_count=row.purchase_count,
+            total_amount=Decimal(str(row.total_amount)).quantize(Decimal("0.01"))
+        )
+        for row in rows
+    ]
     
-    return result
+    return PurchaseSummaryResponse(
+        start_date=start_date,
+        end_date=end_date,
+        purchase_count=sum(item.purchase_count for item in suppliers),
+        total_amount=sum((item.total_amount for item in suppliers), Decimal("0.00")),
+        suppliers=suppliers
+    )
 
 
 @router.get("/{purchase_id}", response_model=PurchaseResponse)
 def get_purchase(purchase_id: int, db: Session = Depends(get_db)):
     """获取进货单详情"""
-    purchase = db.query(Purchase).filter(Purchase.id == purchase_id).first()
+    purchase = db.query(Purchase).options(*_purchase_load_options()).filter(
+        Purchase.id == purchase_id
+    ).first()
     if not purchase:
         raise HTTPException(status_code=404, detail="进货单不存在")
     
-    # 构建响应数据
-    purchase_dict = {
-        **purchase.__dict__,
-        "supplier_name": purchase.supplier.name if purchase.supplier else None,
-        "items": []
-    }
-    
-    # 添加明细
-    for item in purchase.items:
-        item_dict = {
-            **item.__dict__,
-            "product_name": item.product.name if item.product else None
-        }
-        purchase_dict["items"].append(item_dict)
-    
-    return purchase_dict
+    return _to_purchase_response(purchase)
 
 
-@router.post("", response_model=PurchaseResponse)
-def create_purchase(purchase: PurchaseCreate, db: Session = Depends(get_db)):
-    """创建进货单"""
+def save_purchase(purchase: PurchaseCreate, db: Session) -> Purchase:
+    """
+    保存进货单并更新商品库存和成本价（不提交事务）
+    
+    商品一次性按ID查询；同一商品同一单价的多行合并为一条明细，
+    同一商品的所有行合并后统一计算加权平均成本价，并批量更新库存。
+    """
     # 验证供货商是否存在
     supplier = db.query(Supplier).filter(Supplier.id == purchase.supplier_id).first()
     if not supplier:
@@ -115,29 +209,35 @@ def create_purchase(purchase: PurchaseCreate, db: Session = Depends(get_db)):
     if not supplier.is_active:
         raise HTTPException(status_code=400, detail="供货商已禁用")
     
-    # 验证商品并计算总金额
-    total_amount = Decimal(0)
-    items_to_create = []
+    # 一次性查询所有商品
+    product_ids = [item.product_id for item in purchase.items]
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(Product.id.in_(set(product_ids))).all()
+    }
     
+    # 验证商品，合并重复的明细行
+    lines: Dict[Tuple[int, Decimal], int] = {}
     for item in purchase.items:
-        # 验证商品是否存在
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        product = products.get(item.product_id)
         if not product:
             raise HTTPException(status_code=404, detail=f"商品ID {item.product_id} 不存在")
         
         if not product.is_active:
             raise HTTPException(status_code=400, detail=f"商品 {product.name} 已禁用")
         
-        # 计算小计
-        item_total = item.quantity * item.unit_price
+        key = (item.product_id, item.unit_price)
+        lines[key] = lines.get(key, 0) + item.quantity
+    
+    # 计算总金额和每个商品的进货数量、金额
+    total_amount = Decimal(0)
+    product_totals: Dict[int, Tuple[int, Decimal]] = {}
+    for (product_id, unit_price), quantity in lines.items():
+        item_total = quantity * unit_price
         total_amount += item_total
         
-        items_to_create.append({
-            "product": product,
-            "quantity": item.quantity,
-            "unit_price": item.unit_price,
-            "total_price": item_total
-        })
+        old_quantity, old_amount = product_totals.get(product_id, (0, Decimal(0)))
+        product_totals[product_id] = (old_quantity + quantity, old_amount + item_total)
     
     # 创建进货单
     db_purchase = Purchase(
@@ -149,32 +249,129 @@ def create_purchase(purchase: PurchaseCreate, db: Session = Depends(get_db)):
     db.add(db_purchase)
     db.flush()  # 获取ID
     
-    # 创建进货明细并更新商品库存
-    for item_data in items_to_create:
-        # 创建明细
-        purchase_item = PurchaseItem(
+    # 创建进货明细
+    db.add_all([
+        PurchaseItem(
             purchase_id=db_purchase.id,
-            product_id=item_data["product"].id,
-            quantity=item_data["quantity"],
-            unit_price=item_data["unit_price"],
-            total_price=item_data["total_price"]
-        )
-        db.add(purchase_item)
-        
-        # 更新商品库存和成本价
-        update_product_stock_and_cost(
-            item_data["product"],
-            item_data["quantity"],
-            item_data["unit_price"]
+            product_id=product_id,
+            quantity=quantity,
+            unit_price=unit_price,
+            total_price=quantity * unit_price
         )
+        for (product_id, unit_price), quantity in lines.items()
+    ])
     
+    # 批量更新商品库存和成本价，并记录库存流水
+    apply_purchase_to_products(db, product_totals)
+    record_movements_for_products(
+        db,
+        {product_id: quantity for product_id, (quantity, _) in product_totals.items()},
+        "purchase", "purchase", db_purchase.id
+    )
+    
+    return db_purchase
+
+
+@router.post("", response_model=PurchaseResponse)
+def create_purchase(purchase: PurchaseCreate, db: Session = Depends(get_db)):
+    """创建进货单"""
+    db_purchase = save_purchase(purchase, db)
     db.commit()
-    db.refresh(db_purchase)
     
     # 返回完整数据
     return get_purchase(db_purchase.id, db)
 
 
+def _read_import_csv(content: bytes) -> List[Dict[str, str]]:
+    """读取供货商进货单CSV，返回按标准列名整理的行"""
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # Excel 在中文系统下默认保存为 GBK
+        try:
+            text = content.decode("gbk")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="无法识别文件编码，请使用UTF-8或GBK编码的CSV文件")
+    
+    reader = csv.DictReader(io.StringIO(text))
+    headers = [header.strip() for header in (reader.fieldnames or [])]
+    column_map = {}
+    for field, aliases in IMPORT_COLUMNS.items():
+        for header in headers:
+            if header in aliases or header.lower() in aliases:
+                column_map[field] = header
+                break
+    
+    if "quantity" not in column_map or "unit_price" not in column_map:
+        raise HTTPException(status_code=400, detail="CSV文件缺少数量或单价列")
+    if "product_id" not in column_map and "product_name" not in column_map:
+        raise HTTPException(status_code=400, detail="CSV文件缺少商品ID或商品名称列")
+    
+    rows = []
+    for raw_row in reader:
+        row = {key.strip(): (value or "").strip() for key, value in raw_row.items() if key}
+        # 跳过空行
+        if not any(row.values()):
+            continue
+        rows.append({field: row.get(header, "") for field, header in column_map.items()})
+    return rows
+
+
+@router.post("/import", response_model=PurchaseResponse)
+def import_purchase(
+    supplier_id: int = Form(..., description="供货商ID"),
+    purchase_date: date = Form(..., description="进货日期"),
+    notes: Optional[str] = Form(None, description="备注"),
+    file: UploadFile = File(..., description="供货商进货单CSV文件，列：商品ID或商品名称、数量、单价"),
+    db: Session = Depends(get_db)
+):
+    """
+    导入供货商进货单（CSV），与创建进货单使用相同的保存流程
+    同步接口（在线程池中执行），读取上传文件和数据库操作都不占用事件循环
+    """
+    rows = _read_import_csv(file.file.read())
+    if not rows:
+        raise HTTPException(status_code=400, detail="CSV文件中没有进货明细")
+    
+    # 按名称填写商品的行，一次性查询商品ID
+    names = {row["product_name"] for row in rows if not row.get("product_id") and row.get("product_name")}
+    products_by_name: Dict[str, List[int]] = {}
+    if names:
+        for product_id, name in db.query(Product.id, Product.name).filter(Product.name.in_(names)).all():
+            products_by_name.setdefault(name, []).append(product_id)
+    
+    items = []
+    for line_number, row in enumerate(rows, start=2):
+        product_id = row.get("product_id")
+        if not product_id:
+            name = row.get("product_name")
+            matched = products_by_name.get(name, [])
+            if not matched:
+                raise HTTPException(status_code=404, detail=f"第{line_number}行：商品 {name or '（空）'} 不存在")
+            if len(matched) > 1:
+                raise HTTPException(status_code=400, detail=f"第{line_number}行：存在多个名为 {name} 的商品，请填写商品ID")
+            product_id = matched[0]
+        try:
+            items.append(PurchaseItemCreate(
+                product_id=product_id,
+                quantity=row["quantity"],
+                unit_price=row["unit_price"]
+            ))
+        except ValidationError:
+            raise HTTPException(status_code=400, detail=f"第{line_number}行：商品ID、数量或单价格式不正确")
+    
+    purchase = PurchaseCreate(
+        supplier_id=supplier_id,
+        purchase_date=purchase_date,
+        notes=notes,
+        items=items
+    )
+    db_purchase = save_purchase(purchase, db)
+    db.commit()
+    
+    return get_purchase(db_purchase.id, db)
+
+
 @router.delete("/{purchase_id}")
 def delete_purchase(purchase_id: int, db: Session = Depends(get_db)):
     """删除进货单（需要回退库存和成本价，通常不建议删除）"""
@@ -187,7 +384,9 @@ def delete_purchase(purchase_id: int, db: Session = Depends(get_db)):
         product = item.product
         if product:
             # 减少库存
+            old_stock = product.stock
             product.stock = max(0, product.stock - item.quantity)
+            record_movement(db, product, product.stock - old_stock, "purchase_delete", "purchase", purchase.id)
     
     db.delete(purchase)
     db.commit()
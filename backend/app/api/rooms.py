@@ -1,13 +1,22 @@
 """
 房间管理API
 """
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 from typing import List, Optional
 from datetime import datetime, timezone
 from decimal import Decimal
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db
+from app.services.admission import admission_route
+from app.db.pagination import keyset_paginate, NEXT_CURSOR_HEADER
+from app.services.inventory import record_movement
+from app.services.system_config import get_default_payment_method_async
+from app.services.session_snapshot import (
+    load_session_snapshot, save_session_snapshot, begin_snapshot_rebuild
+)
 from app.models.room import Room
 from app.models.room_session import RoomSession
 from app.models.room_customer import RoomCustomer
@@ -29,7 +38,9 @@ from app.schemas.room import (
 )
 from app.schemas.room_detail import RoomSessionDetailResponse
 
-router = APIRouter(prefix="/api/rooms", tags=["房间管理"])
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/rooms", tags=["房间管理"], route_class=admission_route("detail", write_lane="cashier"))
 
 
 @router.get("", response_model=List[RoomResponse])
@@ -104,12 +115,12 @@ def delete_room(
 
 
 @router.post("/{room_id}/start-session", response_model=RoomSessionResponse)
-def start_session(
+async def start_session(
     room_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """开始使用房间"""
-    room = db.query(Room).filter(Room.id == room_id).first()
+    room = await db.get(Room, room_id)
     if not room:
         raise HTTPException(status_code=404, detail="房间不存在")
     
@@ -127,35 +138,35 @@ def start_session(
     # 更新房间状态
     room.status = "in_use"
     
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     return session
 
 
 @router.post("/sessions/{session_id}/add-customer")
-def add_customer_to_session(
+async def add_customer_to_session(
     session_id: int,
     request: AddCustomerRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """添加客户到房间"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
     if session.status != "in_progress":
         raise HTTPException(status_code=400, detail="房间使用已结束，无法添加客户")
     
-    customer = db.query(Customer).filter(Customer.id == request.customer_id).first()
+    customer = await db.get(Customer, request.customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="客户不存在")
     
     # 检查客户是否已在房间中
-    existing = db.query(RoomCustomer).filter(
+    existing = await db.scalar(select(RoomCustomer).where(
         RoomCustomer.session_id == session_id,
         RoomCustomer.customer_id == request.customer_id,
         RoomCustomer.left_at.is_(None)
-    ).first()
+    ).limit(1))
     
     if existing:
         raise HTTPException(status_code=400, detail="客户已在房间中")
@@ -167,45 +178,45 @@ def add_customer_to_session(
         joined_at=datetime.now(timezone.utc)
     )
     db.add(room_customer)
-    db.commit()
+    await db.commit()
     
     return {"message": "客户已添加到房间"}
 
 
 @router.post("/sessions/{session_id}/remove-customer")
-def remove_customer_from_session(
+async def remove_customer_from_session(
     session_id: int,
     customer_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """移除房间客户（中途离开）"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
-    room_customer = db.query(RoomCustomer).filter(
+    room_customer = await db.scalar(select(RoomCustomer).where(
         RoomCustomer.session_id == session_id,
         RoomCustomer.customer_id == customer_id,
         RoomCustomer.left_at.is_(None)
-    ).first()
+    ).limit(1))
     
     if not room_customer:
         raise HTTPException(status_code=404, detail="客户不在房间中")
     
     room_customer.left_at = datetime.now(timezone.utc)
-    db.commit()
+    await db.commit()
     
     return {"message": "客户已从房间移除"}
 
 
 @router.post("/sessions/{session_id}/loan")
-def record_loan(
+async def record_loan(
     session_id: int,
     request: RecordLoanRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """记录借款"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
@@ -213,7 +224,7 @@ def record_loan(
     # if session.status != "in_progress":
     #     raise HTTPException(status_code=400, detail="房间使用已结束，无法记录借款")
     
-    customer = db.query(Customer).filter(Customer.id == request.customer_id).first()
+    customer = await db.get(Customer, request.customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="客户不存在")
     
@@ -227,7 +238,7 @@ def record_loan(
         loan_type="from_shop",
         status="active",
         remaining_amount=request.amount,
-        payment_method=request.payment_method or "现金",  # 默认现金
+        payment_method=request.payment_method or await get_default_payment_method_async(),  # 未指定时使用默认支付方式
         description=description,
         session_id=session_id
     )
@@ -237,31 +248,32 @@ def record_loan(
     # balance负数=欠款，正数=预存，借款应该减少balance
     customer.balance = customer.balance - request.amount
     
-    db.commit()
-    db.refresh(loan)
+    await db.run_sync(_refresh_session_snapshot, session)
+    await db.commit()
+    await db.refresh(loan)
     return {"message": "借款记录已创建", "loan_id": loan.id}
 
 
 @router.put("/sessions/{session_id}/loan/{loan_id}")
-def update_loan_record(
+async def update_loan_record(
     session_id: int,
     loan_id: int,
     request: UpdateLoanRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新借款记录"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
-    loan = db.query(CustomerLoan).filter(
+    loan = await db.scalar(select(CustomerLoan).where(
         CustomerLoan.id == loan_id,
         CustomerLoan.session_id == session_id
-    ).first()
+    ).limit(1))
     if not loan:
         raise HTTPException(status_code=404, detail="借款记录不存在")
 
-    customer = db.query(Customer).filter(Customer.id == loan.customer_id).first()
+    customer = await db.get(Customer, loan.customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="客户不存在")
 
@@ -280,9 +292,9 @@ def update_loan_record(
         # 3. 重新计算剩余金额
         # 获取所有关联的还款总额
         from sqlalchemy import func
-        repaid_sum = db.query(func.sum(CustomerRepayment.amount)).filter(
+        repaid_sum = await db.scalar(select(func.sum(CustomerRepayment.amount)).where(
             CustomerRepayment.loan_id == loan.id
-        ).scalar() or 0
+        )) or 0
         repaid_sum = Decimal(str(repaid_sum))
         
         # 剩余金额 = 总借款 - 已还款
@@ -303,31 +315,32 @@ def update_loan_record(
         else:
             loan.status = "active"
 
-        db.commit()
-        db.refresh(loan)
+        await db.run_sync(_refresh_session_snapshot, session)
+        await db.commit()
+        await db.refresh(loan)
         return {"message": "借款记录已更新", "loan_id": loan.id}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"更新失败: {str(e)}")
 
 
 @router.post("/sessions/{session_id}/repayment")
-def record_repayment(
+async def record_repayment(
     session_id: int,
     request: RecordRepaymentRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     记录还款
     - 如果提供了 loan_id，还款金额可以超过借款金额，超出部分将冲抵客户的总欠款余额
     - 如果没有提供 loan_id，直接冲抵客户的总欠款余额
     """
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
     # 获取客户
-    customer = db.query(Customer).filter(Customer.id == request.customer_id).first()
+    customer = await db.get(Customer, request.customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="客户不存在")
     
@@ -347,7 +360,7 @@ def record_repayment(
             customer.deposit = Decimal('0')
         
         # 生成说明（负数表示退款）
-        payment_method = request.payment_method or "现金"
+        payment_method = request.payment_method or await get_default_payment_method_async()
         description = f"退款/支付给客户 ({payment_method})"
         
         # 创建还款记录（负数）
@@ -360,7 +373,8 @@ def record_repayment(
             session_id=session_id
         )
         db.add(repayment)
-        db.commit()
+        await db.run_sync(_refresh_session_snapshot, session)
+        await db.commit()
         
         return {
             "message": f"退款成功，已向客户支付 ¥{abs_amount:.2f}",
@@ -374,7 +388,7 @@ def record_repayment(
     # 如果有借款记录，处理借款还款
     if request.loan_id:
         # 获取借款记录
-        loan = db.query(CustomerLoan).filter(CustomerLoan.id == request.loan_id).first()
+        loan = await db.get(CustomerLoan, request.loan_id)
         if not loan:
             raise HTTPException(status_code=404, detail="借款记录不存在")
         
@@ -394,7 +408,7 @@ def record_repayment(
             extra_repay = repay_amount - remaining_amount
         
         # 生成说明
-        payment_method = request.payment_method or "现金"
+        payment_method = request.payment_method or await get_default_payment_method_async()
         description = f"还款 - 关联借款ID: {loan.id} ({payment_method})"
         
         # 创建还款记录
@@ -417,7 +431,8 @@ def record_repayment(
         # balance负数=欠款，正数=预存，还款应该增加balance
         customer.balance = customer.balance + repay_amount
         
-        db.commit()
+        await db.run_sync(_refresh_session_snapshot, session)
+        await db.commit()
         
         result = {
             "message": "还款成功",
@@ -433,11 +448,11 @@ def record_repayment(
         return result
     else:
         # 没有指定借款记录，先查找客户是否有未还清的借款记录（按时间排序，优先还最早的）
-        active_loan = db.query(CustomerLoan).filter(
+        active_loan = await db.scalar(select(CustomerLoan).where(
             CustomerLoan.customer_id == request.customer_id,
             CustomerLoan.status == "active",
             CustomerLoan.remaining_amount > 0
-        ).order_by(CustomerLoan.created_at.asc()).first()
+        ).order_by(CustomerLoan.created_at.asc()).limit(1))
         
         if active_loan:
             # 有未还清的借款记录，先还借款
@@ -455,7 +470,7 @@ def record_repayment(
                 extra_repay = repay_amount - remaining_amount
             
             # 生成说明
-            payment_method = request.payment_method or "现金"
+            payment_method = request.payment_method or await get_default_payment_method_async()
             description = f"还款 - 关联借款ID: {active_loan.id} ({payment_method})"
             
             # 创建还款记录
@@ -478,7 +493,8 @@ def record_repayment(
             # balance负数=欠款，正数=预存，还款应该增加balance
             customer.balance = customer.balance + repay_amount
             
-            db.commit()
+            await db.run_sync(_refresh_session_snapshot, session)
+            await db.commit()
             
             result = {
                 "message": "还款成功",
@@ -494,7 +510,7 @@ def record_repayment(
             return result
         else:
             # 生成说明
-            payment_method = request.payment_method or "现金"
+            payment_method = request.payment_method or await get_default_payment_method_async()
             description = f"还款 - 还总欠款 ({payment_method})"
             
             # 没有借款记录，直接更新总帐
@@ -512,7 +528,8 @@ def record_repayment(
             # balance负数=欠款，正数=预存，还款应该增加balance
             customer.balance = customer.balance + repay_amount
             
-            db.commit()
+            await db.run_sync(_refresh_session_snapshot, session)
+            await db.commit()
             
             return {
                 "message": f"还款成功，¥{repay_amount:.2f} 已冲抵总欠款",
@@ -524,25 +541,25 @@ def record_repayment(
 
 
 @router.put("/sessions/{session_id}/repayment/{repayment_id}")
-def update_repayment_record(
+async def update_repayment_record(
     session_id: int,
     repayment_id: int,
     request: UpdateRepaymentRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新还款记录"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
-    repayment = db.query(CustomerRepayment).filter(
+    repayment = await db.scalar(select(CustomerRepayment).where(
         CustomerRepayment.id == repayment_id,
         CustomerRepayment.session_id == session_id
-    ).first()
+    ).limit(1))
     if not repayment:
         raise HTTPException(status_code=404, detail="还款记录不存在")
 
-    customer = db.query(Customer).filter(Customer.id == repayment.customer_id).first()
+    customer = await db.get(Customer, repayment.customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="客户不存在")
 
@@ -566,7 +583,7 @@ def update_repayment_record(
 
         # 3. 如果关联了借款，需要更新借款状态
         if repayment.loan_id:
-            loan = db.query(CustomerLoan).filter(CustomerLoan.id == repayment.loan_id).first()
+            loan = await db.get(CustomerLoan, repayment.loan_id)
             if loan:
                 # 重新计算剩余金额
                 from sqlalchemy import func
@@ -575,11 +592,11 @@ def update_repayment_record(
                 # 这里为了保险，手动计算：sum(others) + new_amount
                 
                 # option 1: flush first
-                db.flush()
+                await db.flush()
                 
-                repaid_sum = db.query(func.sum(CustomerRepayment.amount)).filter(
+                repaid_sum = await db.scalar(select(func.sum(CustomerRepayment.amount)).where(
                     CustomerRepayment.loan_id == loan.id
-                ).scalar() or 0
+                )) or 0
                 repaid_sum = Decimal(str(repaid_sum))
                 
                 loan.remaining_amount = max(Decimal('0'), loan.amount - repaid_sum)
@@ -590,22 +607,23 @@ def update_repayment_record(
                 else:
                     loan.status = "active"
 
-        db.commit()
-        db.refresh(repayment)
+        await db.run_sync(_refresh_session_snapshot, session)
+        await db.commit()
+        await db.refresh(repayment)
         return {"message": "还款记录已更新", "repayment_id": repayment.id}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"更新失败: {str(e)}")
 
 
 @router.post("/sessions/{session_id}/product")
-def record_product(
+async def record_product(
     session_id: int,
     request: RecordProductRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """记录商品消费"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
@@ -613,7 +631,7 @@ def record_product(
     # if session.status != "in_progress":
     #     raise HTTPException(status_code=400, detail="房间使用已结束，无法记录消费")
     
-    product = db.query(Product).filter(Product.id == request.product_id).first()
+    product = await db.get(Product, request.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="商品不存在")
     
@@ -639,29 +657,32 @@ def record_product(
         total_price=total_price,
         cost_price=product.cost_price,
         total_cost=total_cost,
-        payment_method=request.payment_method or "现金"  # 默认现金
+        payment_method=request.payment_method or await get_default_payment_method_async()  # 未指定时使用默认支付方式
     )
     db.add(consumption)
+    await db.flush()  # 获取ID
     
     # 更新库存
     product.stock = product.stock - request.quantity
+    record_movement(db.sync_session, product, -request.quantity, "consumption", "consumption", consumption.id)
     
     # 更新房间使用记录的成本（收入即台子费，不再单独加商品收入）
     session.total_cost = session.total_cost + total_cost
     
-    db.commit()
-    db.refresh(consumption)
+    await db.run_sync(_refresh_session_snapshot, session)
+    await db.commit()
+    await db.refresh(consumption)
     return {"message": "商品消费已记录", "consumption_id": consumption.id}
 
 
 @router.post("/sessions/{session_id}/meal")
-def record_meal(
+async def record_meal(
     session_id: int,
     request: RecordMealRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """记录餐费"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
@@ -669,7 +690,7 @@ def record_meal(
     # if session.status != "in_progress":
     #     raise HTTPException(status_code=400, detail="房间使用已结束，无法记录餐费")
     
-    product = db.query(Product).filter(Product.id == request.product_id).first()
+    product = await db.get(Product, request.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="餐费商品不存在")
     
@@ -685,7 +706,7 @@ def record_meal(
         product_id=request.product_id,
         amount=request.amount,
         cost_price=request.amount,  # 餐费成本 = 餐费金额（餐费本身就是成本）
-        payment_method=request.payment_method or "现金",  # 默认现金
+        payment_method=request.payment_method or await get_default_payment_method_async(),  # 未指定时使用默认支付方式
         description=request.description
     )
     db.add(meal_record)
@@ -693,33 +714,34 @@ def record_meal(
     # 更新房间使用记录的成本（收入即台子费，不再单独加餐费收入）
     session.total_cost = session.total_cost + request.amount  # 餐费成本 = 餐费金额
     
-    db.commit()
-    db.refresh(meal_record)
+    await db.run_sync(_refresh_session_snapshot, session)
+    await db.commit()
+    await db.refresh(meal_record)
     return {"message": "餐费已记录", "meal_record_id": meal_record.id}
 
 
 @router.put("/sessions/{session_id}/product/{consumption_id}")
-def update_product_consumption(
+async def update_product_consumption(
     session_id: int,
     consumption_id: int,
     request: UpdateProductConsumptionRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新商品消费数量"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
-    consumption = db.query(ProductConsumption).filter(
+    consumption = await db.scalar(select(ProductConsumption).where(
         ProductConsumption.id == consumption_id,
         ProductConsumption.session_id == session_id
-    ).first()
+    ).limit(1))
     if not consumption:
         raise HTTPException(status_code=404, detail="商品消费记录不存在")
     
     try:
         # 获取商品信息
-        product = db.query(Product).filter(Product.id == consumption.product_id).first()
+        product = await db.get(Product, consumption.product_id)
         if not product:
             raise HTTPException(status_code=404, detail="商品不存在")
         
@@ -728,6 +750,7 @@ def update_product_consumption(
         
         # 更新库存（如果数量增加，减少库存；如果数量减少，增加库存）
         product.stock = product.stock - quantity_diff
+        record_movement(db.sync_session, product, -quantity_diff, "consumption_update", "consumption", consumption.id)
         
         # 更新成本
         session.total_cost = session.total_cost - consumption.total_cost
@@ -744,68 +767,71 @@ def update_product_consumption(
         # 更新成本
         session.total_cost = session.total_cost + new_total_cost
         
-        db.commit()
-        db.refresh(consumption)
+        await db.run_sync(_refresh_session_snapshot, session)
+        await db.commit()
+        await db.refresh(consumption)
         return {"message": "商品消费记录已更新", "consumption_id": consumption.id}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"更新失败: {str(e)}")
 
 
 @router.delete("/sessions/{session_id}/product/{consumption_id}")
-def delete_product_consumption(
+async def delete_product_consumption(
     session_id: int,
     consumption_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除商品消费记录"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
-    consumption = db.query(ProductConsumption).filter(
+    consumption = await db.scalar(select(ProductConsumption).where(
         ProductConsumption.id == consumption_id,
         ProductConsumption.session_id == session_id
-    ).first()
+    ).limit(1))
     if not consumption:
         raise HTTPException(status_code=404, detail="商品消费记录不存在")
     
     try:
         # 获取商品信息
-        product = db.query(Product).filter(Product.id == consumption.product_id).first()
+        product = await db.get(Product, consumption.product_id)
         if product:
             # 恢复库存
             product.stock = product.stock + consumption.quantity
+            record_movement(db.sync_session, product, consumption.quantity, "consumption_delete", "consumption", consumption.id)
         
         # 回滚房间使用记录的成本
         session.total_cost = session.total_cost - consumption.total_cost
         
         # 删除消费记录
-        db.delete(consumption)
+        await db.delete(consumption)
         
-        db.commit()
+        await db.run_sync(_refresh_session_snapshot, session)
+        await db.commit()
         return {"message": "商品消费记录已删除"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 
 @router.put("/sessions/{session_id}/meal/{meal_record_id}")
-def update_meal_record(
+async def update_meal_record(
     session_id: int,
     meal_record_id: int,
     request: UpdateMealRecordRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新餐费金额"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
-    meal_record = db.query(MealRecord).filter(
+    meal_record = await db.scalar(select(MealRecord).where(
         MealRecord.id == meal_record_id,
         MealRecord.session_id == session_id
-    ).first()
+    ).limit(1))
     if not meal_record:
         raise HTTPException(status_code=404, detail="餐费记录不存在")
     
@@ -820,29 +846,30 @@ def update_meal_record(
         # 更新房间使用记录的成本
         session.total_cost = session.total_cost + request.amount
         
-        db.commit()
-        db.refresh(meal_record)
+        await db.run_sync(_refresh_session_snapshot, session)
+        await db.commit()
+        await db.refresh(meal_record)
         return {"message": "餐费记录已更新", "meal_record_id": meal_record.id}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"更新失败: {str(e)}")
 
 
 @router.delete("/sessions/{session_id}/meal/{meal_record_id}")
-def delete_meal_record(
+async def delete_meal_record(
     session_id: int,
     meal_record_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除餐费记录"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
-    meal_record = db.query(MealRecord).filter(
+    meal_record = await db.scalar(select(MealRecord).where(
         MealRecord.id == meal_record_id,
         MealRecord.session_id == session_id
-    ).first()
+    ).limit(1))
     if not meal_record:
         raise HTTPException(status_code=404, detail="餐费记录不存在")
     
@@ -852,37 +879,38 @@ def delete_meal_record(
         session.total_cost = session.total_cost - meal_record.amount
         
         # 删除餐费记录
-        db.delete(meal_record)
+        await db.delete(meal_record)
         
-        db.commit()
+        await db.run_sync(_refresh_session_snapshot, session)
+        await db.commit()
         return {"message": "餐费记录已删除"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 
 @router.post("/sessions/{session_id}/transfer-room")
-def transfer_room(
+async def transfer_room(
     session_id: int,
     request: TransferRoomRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """房间转移"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
     if session.status != "in_progress":
         raise HTTPException(status_code=400, detail="房间使用已结束，无法转移")
     
-    to_room = db.query(Room).filter(Room.id == request.to_room_id).first()
+    to_room = await db.get(Room, request.to_room_id)
     if not to_room:
         raise HTTPException(status_code=404, detail="目标房间不存在")
     
     if to_room.status != "idle":
         raise HTTPException(status_code=400, detail="目标房间正在使用中")
     
-    from_room = db.query(Room).filter(Room.id == session.room_id).first()
+    from_room = await db.get(Room, session.room_id)
     
     # 创建转移记录
     transfer = RoomTransfer(
@@ -900,18 +928,18 @@ def transfer_room(
     from_room.status = "idle"
     to_room.status = "in_use"
     
-    db.commit()
+    await db.commit()
     return {"message": "房间转移成功"}
 
 
 @router.put("/sessions/{session_id}/table-fee")
-def set_table_fee(
+async def set_table_fee(
     session_id: int,
     request: SetTableFeeRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """设置台子费"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
@@ -920,22 +948,22 @@ def set_table_fee(
     
     # 更新台子费，并强制同步总收入（台子费 = 总收入）
     session.table_fee = request.table_fee
-    session.table_fee_payment_method = request.payment_method or "现金"  # 默认现金
+    session.table_fee_payment_method = request.payment_method or await get_default_payment_method_async()  # 未指定时使用默认支付方式
     session.total_revenue = request.table_fee
     
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     return {"message": "台子费已设置"}
 
 
 @router.post("/sessions/{session_id}/settle")
-def settle_session(
+async def settle_session(
     session_id: int,
     request: SettleSessionRequest = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """结算房间"""
-    session = db.query(RoomSession).filter(RoomSession.id == session_id).first()
+    session = await db.get(RoomSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
@@ -950,7 +978,7 @@ def settle_session(
     session.end_time = datetime.now(timezone.utc)
     
     # 更新房间状态
-    room = db.query(Room).filter(Room.id == session.room_id).first()
+    room = await db.get(Room, session.room_id)
     if room:
         room.status = "idle"
     
@@ -964,8 +992,10 @@ def settle_session(
             )
             db.add(session_result)
 
-    db.commit()
-    db.refresh(session)
+    # 生成详情快照，之后打开已结算记录的详情只需读取一行
+    await db.run_sync(_refresh_session_snapshot, session)
+    await db.commit()
+    await db.refresh(session)
     return {
         "message": "房间结算成功",
         "total_profit": float(session.total_profit),
@@ -975,14 +1005,20 @@ def settle_session(
 
 @router.get("/sessions", response_model=List[RoomSessionResponse])
 def get_sessions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     room_id: Optional[int] = None,
     status: Optional[str] = None,
     include_deleted: bool = False,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """获取房间使用记录"""
+    """
+    获取房间使用记录
+    
+    传入 cursor 时使用游标分页（首页传空字符串），下一页游标在响应头 X-Next-Cursor 中返回
+    """
     query = db.query(RoomSession)
     
     # 默认不显示已删除的记录
@@ -995,13 +1031,18 @@ def get_sessions(
     if status:
         query = query.filter(RoomSession.status == status)
     
-    sessions = query.order_by(RoomSession.created_at.desc()).offset(skip).limit(limit).all()
+    if cursor is not None:
+        sessions, next_cursor = keyset_paginate(query, RoomSession.created_at, RoomSession.id, cursor, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return sessions
+    
+    sessions = query.order_by(RoomSession.created_at.desc(), RoomSession.id.desc()).offset(skip).limit(limit).all()
     return sessions
 
 
-@router.get("/sessions/{session_id}", response_model=RoomSessionDetailResponse)
-def get_session(session_id: int, include_deleted: bool = False, db: Session = Depends(get_db)):
-    """获取房间使用记录详情（包含关联数据）"""
+def _build_session_detail(db: Session, session: RoomSession) -> RoomSessionDetailResponse:
+    """从明细表生成房间使用记录详情"""
     from app.schemas.room_detail import (
         RoomCustomerDetail,
         LoanDetail,
@@ -1010,13 +1051,7 @@ def get_session(session_id: int, include_deleted: bool = False, db: Session = De
         MealRecordDetail,
     )
     
-    query = db.query(RoomSession).filter(RoomSession.id == session_id)
-    if not include_deleted:
-        query = query.filter(RoomSession.deleted_at.is_(None))
-    session = query.first()
-    if not session:
-        raise HTTPException(status_code=404, detail="房间使用记录不存在")
-    
+    session_id = session.id
     room = db.query(Room).filter(Room.id == session.room_id).first()
     
     # 获取客户列表
@@ -1145,10 +1180,53 @@ def get_session(session_id: int, include_deleted: bool = False, db: Session = De
         meal_records=meal_details
     )
     
-    # 调试：打印响应数据
-    print(f"[DEBUG] Session {session_id} - repayments count: {len(repayment_details)}")
-    print(f"[DEBUG] Response repayments: {len(response.repayments)}")
+    logger.debug("生成房间使用记录详情", extra={"session_id": session_id, "repayment_count": len(repayment_details)})
+    
+    return response
+
+
+def _refresh_session_snapshot(db: Session, session: RoomSession):
+    """已结算的记录重新生成详情快照（在提交前调用，与本次修改在同一事务中提交）"""
+    if session.status != "settled" or session.deleted_at is not None:
+        return
+    db.flush()
+    save_session_snapshot(db, session.id, _build_session_detail(db, session))
+
+
+@router.get("/sessions/{session_id}", response_model=RoomSessionDetailResponse)
+async def get_session(session_id: int, include_deleted: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """
+    获取房间使用记录详情（包含关联数据）
+    
+    已结算的记录直接返回结算时生成的详情快照；没有快照时从明细表生成并保存快照
+    """
+    snapshot = await db.run_sync(load_session_snapshot, session_id)
+    if snapshot is not None:
+        return Response(content=snapshot, media_type="application/json")
+    
+    query = select(RoomSession).where(RoomSession.id == session_id)
+    if not include_deleted:
+        query = query.where(RoomSession.deleted_at.is_(None))
+    session = await db.scalar(query.limit(1))
+    if not session:
+        raise HTTPException(status_code=404, detail="房间使用记录不存在")
     
+    if session.status != "settled" or session.deleted_at is not None:
+        return await db.run_sync(_build_session_detail, session)
+    
+    try:
+        # 先取得写锁再重新读取，避免生成快照期间明细被修改
+        await db.run_sync(begin_snapshot_rebuild, session_id)
+        await db.refresh(session)
+        response = await db.run_sync(_build_session_detail, session)
+        if session.status == "settled" and session.deleted_at is None:
+            await db.run_sync(save_session_snapshot, session_id, response)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.exception("生成房间使用记录详情快照失败", extra={"session_id": session_id})
+        await db.refresh(session)
+        response = await db.run_sync(_build_session_detail, session)
     return response
 
 
@@ -1225,6 +1303,7 @@ def delete_session(
             if product:
                 # 恢复库存
                 product.stock = product.stock + consumption.quantity
+                record_movement(db, product, consumption.quantity, "session_delete", "session", session_id)
         
         # 3. 删除所有关联记录
         # 删除房间客户关联
@@ -1341,6 +1420,7 @@ def restore_session(
             if product:
                 # 减少库存
                 product.stock = product.stock - consumption.quantity
+                record_movement(db, product, -consumption.quantity, "session_restore", "session", session_id)
         
         # 3. 恢复房间使用记录（清除 deleted_at）
         session.deleted_at = None
@@ -1438,6 +1518,7 @@ def delete_last_session(
             if product:
                 # 恢复库存
                 product.stock = product.stock + consumption.quantity
+                record_movement(db, product, consumption.quantity, "session_delete", "session", session_id)
         
         # 3. 删除所有关联记录
         # 删除房间客户关联
@@ -1557,6 +1638,7 @@ def reset_room(
             if product:
                 # 恢复库存
                 product.stock = product.stock + consumption.quantity
+                record_movement(db, product, consumption.quantity, "session_delete", "session", session_id)
         
         # 3. 删除所有关联记录
         # 删除房间客户关联
@@ -1,14 +1,16 @@
 """
 统计报表API
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_, or_
+from sqlalchemy import func, extract, and_, or_, select, case, literal, union_all, Integer
 from sqlalchemy.sql import func as sql_func
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from app.db.database import get_db
+from app.services.report_executor import ReportRoute
+from app.services.admission import admission_route
 from app.models.room_session import RoomSession
 from app.models.customer import Customer
 from app.models.customer_loan import CustomerLoan
@@ -20,34 +22,44 @@ from app.models.product import Product
 from app.models.other_expense import OtherExpense
 from app.models.other_income import OtherIncome
 from app.models.session_result import SessionResult
+from app.services.session_totals import session_totals_by_session
+from app.services.period_statistics import build_period_statistics, period_range, PERIOD_TYPES
+from app.services.business_date import (
+    business_date_filter, business_day_bounds, business_day_start, business_date_of, business_date_sql,
+    current_business_date, local_time_sql
+)
 from app.schemas.statistics import (
-    DailyStatisticsResponse, MonthlyStatisticsResponse,
+    DailyStatisticsResponse, MonthlyStatisticsResponse, PeriodStatisticsResponse,
     CustomerRankingItem, RoomUsageItem, ProductSalesItem,
+    RoomOccupancyItem, RoomOccupancyResponse,
     RoomDetailItem, CostDetailItem, CustomerFinancialItem,
     TableFeeDetailItem, OtherIncomeDetailItem, OtherExpenseDetailItem,
-    WinLossRankingResponse, WinLossItem, WinLossSummary
+    WinLossRankingResponse, WinLossItem, WinLossSummary,
+    DebtAgingBuckets, DebtAgingItem, DebtAgingResponse,
+    ProductSalesTotals, ProductRoomSalesItem, ProductAnalyticsItem, ProductAnalyticsResponse
 )
 
-router = APIRouter(prefix="/api/statistics", tags=["统计报表"])
+router = APIRouter(prefix="/api/statistics", tags=["统计报表"], route_class=admission_route("report", base=ReportRoute))
+
+
+def _to_money(value) -> Decimal:
+    """将SQL聚合结果（SQLite下可能是浮点数）转换为两位小数的Decimal"""
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
 
 
 @router.get("/daily", response_model=DailyStatisticsResponse)
 def get_daily_statistics(
-    target_date: Optional[date] = Query(None, alias="date", description="日期，格式：YYYY-MM-DD，不填则使用今天"),
+    target_date: Optional[date] = Query(None, alias="date", description="营业日，格式：YYYY-MM-DD，不填则使用当前营业日"),
     db: Session = Depends(get_db)
 ):
-    """获取每日统计"""
+    """获取每日统计（按营业日）"""
     if target_date is None:
-        target_date = date.today()
+        target_date = current_business_date()
     
     # 查询当天的房间使用记录
-    start_datetime = datetime.combine(target_date, datetime.min.time())
-    end_datetime = datetime.combine(target_date, datetime.max.time())
-    
     sessions = db.query(RoomSession).filter(
         and_(
-            RoomSession.start_time >= start_datetime,
-            RoomSession.start_time <= end_datetime,
+            RoomSession.business_date == target_date,
             RoomSession.status == "settled"
         )
     ).all()
@@ -65,6 +77,9 @@ def get_daily_statistics(
     # 房间详情字典 {room_id: {name, table_fee, session_count}}
     room_details_dict = {}
     
+    # 各使用记录的商品、餐费汇总（一次查询）
+    session_totals = session_totals_by_session(db, [session.id for session in sessions])
+    
     for session in sessions:
         # 注意：total_revenue 只计算台子费总额，因为台子费已包含商品消费和餐费
         # 不重复计算商品收入和餐费收入
@@ -87,35 +102,20 @@ def get_daily_statistics(
         room_details_dict[session.room_id]["table_fee"] += table_fee
         room_details_dict[session.room_id]["session_count"] += 1
         
-        # 查询商品消费
-        consumptions = db.query(ProductConsumption).filter(
-            ProductConsumption.session_id == session.id
-        ).all()
-        for consumption in consumptions:
-            product_revenue += consumption.total_price or Decimal("0")
-            product_cost += consumption.total_cost or Decimal("0")
-        
-        # 查询餐费
-        meals = db.query(MealRecord).filter(
-            MealRecord.session_id == session.id
-        ).all()
-        for meal in meals:
-            meal_revenue += meal.amount or Decimal("0")
-            meal_cost += meal.cost_price or Decimal("0")
+        # 商品消费和餐费取自使用记录汇总
+        totals = session_totals[session.id]
+        product_revenue += totals["product_revenue"]
+        product_cost += totals["product_cost"]
+        meal_revenue += totals["meal_revenue"]
+        meal_cost += totals["meal_cost"]
     
     # 查询当天的其它支出和收入
     other_expenses = db.query(OtherExpense).filter(
-        and_(
-            OtherExpense.expense_date >= start_datetime,
-            OtherExpense.expense_date <= end_datetime
-        )
+        OtherExpense.business_date == target_date
     ).all()
     
     other_incomes = db.query(OtherIncome).filter(
-        and_(
-            OtherIncome.income_date >= start_datetime,
-            OtherIncome.income_date <= end_datetime
-        )
+        OtherIncome.business_date == target_date
     ).all()
     
     other_expense_total = sum(exp.amount for exp in other_expenses)
@@ -130,21 +130,9 @@ def get_daily_statistics(
     # 构建台子费明细清单
     table_fee_details = []
     for session in sessions:
-        # 计算该会话的商品成本和餐费成本
-        session_product_cost = Decimal("0")
-        session_meal_cost = Decimal("0")
-        
-        consumptions = db.query(ProductConsumption).filter(
-            ProductConsumption.session_id == session.id
-        ).all()
-        for consumption in consumptions:
-            session_product_cost += consumption.total_cost or Decimal("0")
-        
-        meals = db.query(MealRecord).filter(
-            MealRecord.session_id == session.id
-        ).all()
-        for meal in meals:
-            session_meal_cost += meal.cost_price or Decimal("0")
+        # 该会话的商品成本和餐费成本
+        session_product_cost = session_totals[session.id]["product_cost"]
+        session_meal_cost = session_totals[session.id]["meal_cost"]
         
         table_fee = session.table_fee or Decimal("0")
         session_profit = table_fee - session_product_cost - session_meal_cost
@@ -218,10 +206,7 @@ def get_daily_statistics(
     
     # 查询当天的借款记录
     loans = db.query(CustomerLoan).filter(
-        and_(
-            CustomerLoan.created_at >= start_datetime,
-            CustomerLoan.created_at <= end_datetime
-        )
+        CustomerLoan.business_date == target_date
     ).all()
     
     for loan in loans:
@@ -239,10 +224,7 @@ def get_daily_statistics(
     
     # 查询当天的还款记录
     repayments = db.query(CustomerRepayment).filter(
-        and_(
-            CustomerRepayment.created_at >= start_datetime,
-            CustomerRepayment.created_at <= end_datetime
-        )
+        CustomerRepayment.business_date == target_date
     ).all()
     
     for repayment in repayments:
@@ -301,297 +283,40 @@ def get_monthly_statistics(
     db: Session = Depends(get_db)
 ):
     """获取每月统计"""
-    # 计算月份的开始和结束日期
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = date(year, month + 1, 1) - timedelta(days=1)
-    
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-    
-    # 查询当月的房间使用记录
-    sessions = db.query(RoomSession).filter(
-        and_(
-            RoomSession.start_time >= start_datetime,
-            RoomSession.start_time <= end_datetime,
-            RoomSession.status == "settled"
-        )
-    ).all()
-    
-    # 计算统计数据
-    total_revenue = Decimal("0")
-    total_cost = Decimal("0")
-    table_fee_total = Decimal("0")
-    product_revenue = Decimal("0")
-    product_cost = Decimal("0")
-    meal_revenue = Decimal("0")
-    meal_cost = Decimal("0")
-    room_ids = set()
-    
-    # 按日期分组统计
-    daily_stats_dict = {}
-    
-    for session in sessions:
-        session_date = session.start_time.date()
-        if session_date not in daily_stats_dict:
-            daily_stats_dict[session_date] = {
-                "revenue": Decimal("0"),
-                "cost": Decimal("0"),
-                "table_fee": Decimal("0"),
-                "product_revenue": Decimal("0"),
-                "product_cost": Decimal("0"),
-                "meal_revenue": Decimal("0"),
-                "meal_cost": Decimal("0"),
-                "session_count": 0,
-                "room_ids": set()
-            }
-        
-        # 注意：revenue 只计算台子费，因为台子费已包含商品消费和餐费
-        table_fee = session.table_fee or Decimal("0")
-        daily_stats_dict[session_date]["revenue"] += table_fee
-        daily_stats_dict[session_date]["cost"] += session.total_cost or Decimal("0")
-        daily_stats_dict[session_date]["table_fee"] += table_fee
-        daily_stats_dict[session_date]["session_count"] += 1
-        daily_stats_dict[session_date]["room_ids"].add(session.room_id)
-        
-        # 今日收入 = 台子费总额（台子费已包含商品消费和餐费）
-        total_revenue += table_fee
-        total_cost += session.total_cost or Decimal("0")
-        table_fee_total += table_fee
-        room_ids.add(session.room_id)
-        
-        # 查询商品消费
-        consumptions = db.query(ProductConsumption).filter(
-            ProductConsumption.session_id == session.id
-        ).all()
-        for consumption in consumptions:
-            daily_stats_dict[session_date]["product_revenue"] += consumption.total_price or Decimal("0")
-            daily_stats_dict[session_date]["product_cost"] += consumption.total_cost or Decimal("0")
-            product_revenue += consumption.total_price or Decimal("0")
-            product_cost += consumption.total_cost or Decimal("0")
-        
-        # 查询餐费
-        meals = db.query(MealRecord).filter(
-            MealRecord.session_id == session.id
-        ).all()
-        for meal in meals:
-            daily_stats_dict[session_date]["meal_revenue"] += meal.amount or Decimal("0")
-            daily_stats_dict[session_date]["meal_cost"] += meal.cost_price or Decimal("0")
-            meal_revenue += meal.amount or Decimal("0")
-            meal_cost += meal.cost_price or Decimal("0")
-    
-    # 查询当月的其它支出和收入
-    other_expenses = db.query(OtherExpense).filter(
-        and_(
-            OtherExpense.expense_date >= start_datetime,
-            OtherExpense.expense_date <= end_datetime
-        )
-    ).all()
-    
-    other_incomes = db.query(OtherIncome).filter(
-        and_(
-            OtherIncome.income_date >= start_datetime,
-            OtherIncome.income_date <= end_datetime
-        )
-    ).all()
-    
-    other_expense_total = sum(exp.amount for exp in other_expenses)
-    other_income_total = sum(inc.amount for inc in other_incomes)
-    
-    # 按日期分组统计其它支出和收入
-    daily_other_expense_dict = {}
-    daily_other_income_dict = {}
-    
-    for exp in other_expenses:
-        exp_date = exp.expense_date.date()
-        if exp_date not in daily_other_expense_dict:
-            daily_other_expense_dict[exp_date] = Decimal("0")
-        daily_other_expense_dict[exp_date] += exp.amount
-    
-    for inc in other_incomes:
-        inc_date = inc.income_date.date()
-        if inc_date not in daily_other_income_dict:
-            daily_other_income_dict[inc_date] = Decimal("0")
-        daily_other_income_dict[inc_date] += inc.amount
-    
-    # 台子费利润 = 台子费 - 商品成本 - 餐费成本
-    table_fee_profit = table_fee_total - product_cost - meal_cost
-    
-    # 总利润 = 台子费利润 + 其它收入 - 其它支出
-    total_profit = table_fee_profit + other_income_total - other_expense_total
-    
-    # 构建每日统计列表
-    daily_statistics = []
-    for stat_date, stats in sorted(daily_stats_dict.items()):
-        daily_other_income = daily_other_income_dict.get(stat_date, Decimal("0"))
-        daily_other_expense = daily_other_expense_dict.get(stat_date, Decimal("0"))
-        daily_table_fee_profit = stats["table_fee"] - stats["product_cost"] - stats["meal_cost"]
-        daily_profit = daily_table_fee_profit + daily_other_income - daily_other_expense
-        
-        # 获取当天的会话列表
-        daily_sessions = [s for s in sessions if s.start_time.date() == stat_date]
-        
-        # 构建当天的台子费明细
-        daily_table_fee_details = []
-        for session in daily_sessions:
-            session_product_cost = Decimal("0")
-            session_meal_cost = Decimal("0")
-            
-            consumptions = db.query(ProductConsumption).filter(
-                ProductConsumption.session_id == session.id
-            ).all()
-            for consumption in consumptions:
-                session_product_cost += consumption.total_cost or Decimal("0")
-            
-            meals = db.query(MealRecord).filter(
-                MealRecord.session_id == session.id
-            ).all()
-            for meal in meals:
-                session_meal_cost += meal.cost_price or Decimal("0")
-            
-            table_fee = session.table_fee or Decimal("0")
-            session_profit = table_fee - session_product_cost - session_meal_cost
-            
-            room = db.query(Room).filter(Room.id == session.room_id).first()
-            daily_table_fee_details.append(TableFeeDetailItem(
-                session_id=session.id,
-                room_id=session.room_id,
-                room_name=room.name if room else f"房间{session.room_id}",
-                table_fee=table_fee,
-                product_cost=session_product_cost,
-                meal_cost=session_meal_cost,
-                profit=session_profit,
-                start_time=session.start_time
-            ))
-        
-        # 构建当天的其它收入和支出明细
-        daily_other_income_details = [
-            OtherIncomeDetailItem(
-                id=income.id,
-                name=income.name,
-                amount=income.amount,
-                payment_method=income.payment_method or "现金",
-                income_date=income.income_date,
-                description=income.description
-            )
-            for income in other_incomes if income.income_date.date() == stat_date
-        ]
-        
-        daily_other_expense_details = [
-            OtherExpenseDetailItem(
-                id=expense.id,
-                name=expense.name,
-                amount=expense.amount,
-                payment_method=expense.payment_method or "现金",
-                expense_date=expense.expense_date,
-                description=expense.description
-            )
-            for expense in other_expenses if expense.expense_date.date() == stat_date
-        ]
-        
-        # 注意：total_revenue 只计算台子费总额，因为台子费已包含商品消费和餐费
-        daily_statistics.append(DailyStatisticsResponse(
-            date=stat_date,
-            total_revenue=stats["table_fee"],  # 使用台子费作为收入，因为台子费已包含商品消费和餐费
-            total_cost=stats["cost"],
-            total_profit=daily_profit,
-            other_income=daily_other_income,
-            other_expense=daily_other_expense,
-            table_fee_total=stats["table_fee"],
-            table_fee_profit=daily_table_fee_profit,
-            product_revenue=stats["product_revenue"],
-            product_cost=stats["product_cost"],
-            meal_revenue=stats["meal_revenue"],
-            meal_cost=stats["meal_cost"],
-            session_count=stats["session_count"],
-            room_count=len(stats["room_ids"]),
-            table_fee_details=daily_table_fee_details,
-            other_income_details=daily_other_income_details,
-            other_expense_details=daily_other_expense_details
-        ))
-    
-    # 构建全月台子费明细清单
-    table_fee_details = []
-    for session in sessions:
-        # 计算该会话的商品成本和餐费成本
-        session_product_cost = Decimal("0")
-        session_meal_cost = Decimal("0")
-        
-        consumptions = db.query(ProductConsumption).filter(
-            ProductConsumption.session_id == session.id
-        ).all()
-        for consumption in consumptions:
-            session_product_cost += consumption.total_cost or Decimal("0")
-        
-        meals = db.query(MealRecord).filter(
-            MealRecord.session_id == session.id
-        ).all()
-        for meal in meals:
-            session_meal_cost += meal.cost_price or Decimal("0")
-        
-        table_fee = session.table_fee or Decimal("0")
-        session_profit = table_fee - session_product_cost - session_meal_cost
-        
-        room = db.query(Room).filter(Room.id == session.room_id).first()
-        table_fee_details.append(TableFeeDetailItem(
-            session_id=session.id,
-            room_id=session.room_id,
-            room_name=room.name if room else f"房间{session.room_id}",
-            table_fee=table_fee,
-            product_cost=session_product_cost,
-            meal_cost=session_meal_cost,
-            profit=session_profit,
-            start_time=session.start_time
-        ))
-    
-    # 构建全月其它收入明细清单
-    other_income_details = [
-        OtherIncomeDetailItem(
-            id=income.id,
-            name=income.name,
-            amount=income.amount,
-            payment_method=income.payment_method or "现金",
-            income_date=income.income_date,
-            description=income.description
-        )
-        for income in other_incomes
-    ]
-    
-    # 构建全月其它支出明细清单
-    other_expense_details = [
-        OtherExpenseDetailItem(
-            id=expense.id,
-            name=expense.name,
-            amount=expense.amount,
-            payment_method=expense.payment_method or "现金",
-            expense_date=expense.expense_date,
-            description=expense.description
-        )
-        for expense in other_expenses
-    ]
-    
+    start_date, end_date = period_range("month", date(year, month, 1))
     return MonthlyStatisticsResponse(
         year=year,
         month=month,
-        total_revenue=total_revenue,
-        total_cost=total_cost,
-        total_profit=total_profit,
-        other_income=other_income_total,
-        other_expense=other_expense_total,
-        table_fee_total=table_fee_total,
-        table_fee_profit=table_fee_profit,
-        product_revenue=product_revenue,
-        product_cost=product_cost,
-        meal_revenue=meal_revenue,
-        meal_cost=meal_cost,
-        session_count=len(sessions),
-        room_count=len(room_ids),
-        daily_statistics=daily_statistics,
-        table_fee_details=table_fee_details,
-        other_income_details=other_income_details,
-        other_expense_details=other_expense_details
+        **build_period_statistics(db, start_date, end_date)
+    )
+
+
+@router.get("/period", response_model=PeriodStatisticsResponse)
+def get_period_statistics(
+    period: str = Query("month", description="统计周期：week=周（周一至周日）, month=月, quarter=季度, year=年"),
+    target_date: Optional[date] = Query(None, alias="date", description="统计周期内的任意一天，不填则使用当前营业日"),
+    start_date: Optional[date] = Query(None, description="自定义开始日期（与结束日期同时填写时忽略统计周期）"),
+    end_date: Optional[date] = Query(None, description="自定义结束日期"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取时间段统计（与每月统计的结构相同，含每日明细）
+    按统计周期取包含指定日期的周、月、季度或年，也可以直接指定日期范围
+    """
+    if start_date and end_date:
+        if start_date > end_date:
+            raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+        period = "custom"
+    else:
+        if period not in PERIOD_TYPES:
+            raise HTTPException(status_code=400, detail=f"统计周期只能是: {', '.join(PERIOD_TYPES)}")
+        start_date, end_date = period_range(period, target_date or current_business_date())
+
+    return PeriodStatisticsResponse(
+        period=period,
+        start_date=start_date,
+        end_date=end_date,
+        **build_period_statistics(db, start_date, end_date)
     )
 
 
@@ -599,119 +324,319 @@ def get_monthly_statistics(
 def get_customer_ranking(
     rank_type: str = Query("consumption", description="排行类型：consumption=消费排行, balance=欠款排行"),
     limit: int = Query(10, ge=1, le=100, description="返回数量"),
+    start_date: Optional[date] = Query(None, description="开始营业日（按消费/借款记录时间），不填则不限"),
+    end_date: Optional[date] = Query(None, description="结束营业日（按消费/借款记录时间），不填则不限"),
     db: Session = Depends(get_db)
 ):
     """获取客户消费排行"""
-    # 获取所有客户
-    customers = db.query(Customer).all()
-    
-    ranking_items = []
-    
-    for customer in customers:
-        # 计算商品消费
-        product_consumption = db.query(
-            func.sum(ProductConsumption.total_price)
-        ).filter(
-            ProductConsumption.customer_id == customer.id
-        ).scalar() or Decimal("0")
-        
-        # 计算餐费消费
-        meal_consumption = db.query(
-            func.sum(MealRecord.amount)
-        ).filter(
-            MealRecord.customer_id == customer.id
-        ).scalar() or Decimal("0")
-        
-        total_consumption = product_consumption + meal_consumption
-        
-        # 计算总借款
-        total_loans = db.query(
-            func.sum(CustomerLoan.amount)
-        ).filter(
-            CustomerLoan.customer_id == customer.id
-        ).scalar() or Decimal("0")
-        
-        # 计算参与房间使用次数
-        session_count = db.query(
-            func.count(func.distinct(ProductConsumption.session_id))
-        ).filter(
-            ProductConsumption.customer_id == customer.id
-        ).scalar() or 0
-        
-        meal_session_count = db.query(
-            func.count(func.distinct(MealRecord.session_id))
-        ).filter(
-            MealRecord.customer_id == customer.id
-        ).scalar() or 0
-        
-        session_count = max(session_count, meal_session_count)
-        
-        ranking_items.append(CustomerRankingItem(
-            customer_id=customer.id,
-            customer_name=customer.name,
-            total_consumption=total_consumption,
-            total_loans=total_loans,
-            current_balance=customer.balance or Decimal("0"),
-            session_count=session_count
-        ))
-    
+    start_datetime, end_datetime = business_day_bounds(start_date, end_date)
+
+    def in_window(column):
+        """按记录时间过滤的条件列表（营业日范围对应的时间范围）"""
+        conditions = []
+        if start_datetime:
+            conditions.append(column >= start_datetime)
+        if end_datetime:
+            conditions.append(column < end_datetime)
+        return conditions
+
+    # 商品消费：金额和参与的会话数
+    consumption_totals = select(
+        ProductConsumption.customer_id.label("customer_id"),
+        func.sum(ProductConsumption.total_price).label("amount"),
+        func.count(func.distinct(ProductConsumption.session_id)).label("session_count")
+    ).where(
+        ProductConsumption.customer_id.isnot(None),
+        *in_window(ProductConsumption.created_at)
+    ).group_by(ProductConsumption.customer_id).cte("consumption_totals")
+
+    # 餐费消费：金额和参与的会话数
+    meal_totals = select(
+        MealRecord.customer_id.label("customer_id"),
+        func.sum(MealRecord.amount).label("amount"),
+        func.count(func.distinct(MealRecord.session_id)).label("session_count")
+    ).where(
+        MealRecord.customer_id.isnot(None),
+        *in_window(MealRecord.created_at)
+    ).group_by(MealRecord.customer_id).cte("meal_totals")
+
+    # 借款总额
+    loan_totals = select(
+        CustomerLoan.customer_id.label("customer_id"),
+        func.sum(CustomerLoan.amount).label("amount")
+    ).where(
+        *business_date_filter(CustomerLoan.business_date, start_date, end_date)
+    ).group_by(CustomerLoan.customer_id).cte("loan_totals")
+
+    total_consumption = (
+        func.coalesce(consumption_totals.c.amount, 0) + func.coalesce(meal_totals.c.amount, 0)
+    ).label("total_consumption")
+    product_sessions = func.coalesce(consumption_totals.c.session_count, 0)
+    meal_sessions = func.coalesce(meal_totals.c.session_count, 0)
+    # 参与房间使用次数取商品消费和餐费两者中的较大值
+    session_count = case(
+        (product_sessions >= meal_sessions, product_sessions), else_=meal_sessions
+    ).label("session_count")
+    current_balance = func.coalesce(Customer.balance, 0).label("current_balance")
+
+    query = db.query(
+        Customer.id,
+        Customer.name,
+        total_consumption,
+        func.coalesce(loan_totals.c.amount, 0).label("total_loans"),
+        current_balance,
+        session_count
+    ).outerjoin(
+        consumption_totals, consumption_totals.c.customer_id == Customer.id
+    ).outerjoin(
+        meal_totals, meal_totals.c.customer_id == Customer.id
+    ).outerjoin(
+        loan_totals, loan_totals.c.customer_id == Customer.id
+    )
+
     # 排序
     if rank_type == "consumption":
-        ranking_items.sort(key=lambda x: x.total_consumption, reverse=True)
+        query = query.order_by(total_consumption.desc(), Customer.id)
     else:
-        ranking_items.sort(key=lambda x: x.current_balance, reverse=True)
-    
-    return ranking_items[:limit]
+        query = query.order_by(current_balance.desc(), Customer.id)
+
+    return [
+        CustomerRankingItem(
+            customer_id=row.id,
+            customer_name=row.name,
+            total_consumption=_to_money(row.total_consumption),
+            total_loans=_to_money(row.total_loans),
+            current_balance=_to_money(row.current_balance),
+            session_count=row.session_count
+        )
+        for row in query.limit(limit).all()
+    ]
+
+
+# 欠款账龄分段：(字段名, 该段最大天数)，最后一段没有上限
+DEBT_AGING_BUCKETS = (("days_0_30", 30), ("days_31_60", 60), ("days_61_90", 90), ("days_over_90", None))
+
+
+@router.get("/debt-aging", response_model=DebtAgingResponse)
+def get_debt_aging(db: Session = Depends(get_db)):
+    """
+    获取欠款账龄
+    未还清（status=active）的借款按营业日距今天数分段汇总剩余未还金额，每个客户一行。
+    各分段的起始时间在查询前算好，一次分组查询按创建时间比较完成分段（只读 idx_customer_loans_status_customer_created 索引）。
+    """
+    as_of = current_business_date()
+
+    # 每一段的时间范围：[该段最大天数对应营业日的开始时间, 上一段的开始时间)
+    remaining = CustomerLoan.remaining_amount
+    bucket_columns = []
+    until = None
+    for name, max_days in DEBT_AGING_BUCKETS:
+        since = business_day_start(as_of - timedelta(days=max_days)) if max_days is not None else None
+        conditions = []
+        if since is not None:
+            conditions.append(CustomerLoan.created_at >= since)
+        if until is not None:
+            conditions.append(CustomerLoan.created_at < until)
+        bucket_columns.append(func.sum(case((and_(*conditions), remaining), else_=0)).label(name))
+        until = since
+
+    aging = select(
+        CustomerLoan.customer_id.label("customer_id"),
+        *bucket_columns,
+        func.sum(remaining).label("total"),
+        func.count().label("loan_count"),
+        func.min(CustomerLoan.created_at).label("oldest_created_at")
+    ).where(
+        CustomerLoan.status == "active",
+        remaining > 0
+    ).group_by(CustomerLoan.customer_id).subquery("aging")
+
+    rows = db.query(aging, Customer.name).join(
+        Customer, Customer.id == aging.c.customer_id
+    ).order_by(aging.c.total.desc(), aging.c.customer_id).all()
+
+    customers = []
+    totals = {name: Decimal("0.00") for name, _ in DEBT_AGING_BUCKETS}
+    totals["total"] = Decimal("0.00")
+    loan_count = 0
+    for row in rows:
+        amounts = {name: _to_money(getattr(row, name)) for name in totals}
+        for name, amount in amounts.items():
+            totals[name] += amount
+        loan_count += row.loan_count
+        customers.append(DebtAgingItem(
+            customer_id=row.customer_id,
+            customer_name=row.name,
+            loan_count=row.loan_count,
+            oldest_loan_date=business_date_of(row.oldest_created_at),
+            **amounts
+        ))
+
+    return DebtAgingResponse(
+        as_of=as_of,
+        totals=DebtAgingBuckets(loan_count=loan_count, **totals),
+        customers=customers
+    )
+
+
+def _usage_hours(start_column, end_column):
+    """SQL表达式：两个时间列之间的小时数"""
+    return (func.julianday(end_column) - func.julianday(start_column)) * 24
+
+
+def _round_hours(hours) -> Decimal:
+    """将SQL返回的浮点小时数转换为两位小数的Decimal"""
+    return Decimal(str(round(float(hours or 0), 2)))
+
+
+def _room_occupancy_buckets(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    """
+    在SQL中把已结算会话按本地时间切分为整点时间片，并按 房间 × 星期 × 小时 汇总占用时长
+    返回 [(room_id, weekday, hour, hours)]，weekday 为SQLite的 %w（0=周日）
+    有日期（营业日）范围时，跨越边界的会话只统计范围内的部分
+    """
+    start_datetime, end_datetime = business_day_bounds(start_date, end_date)
+    range_start = start_datetime.strftime("%Y-%m-%d %H:%M:%S") if start_datetime else None
+    range_end = end_datetime.strftime("%Y-%m-%d %H:%M:%S") if end_datetime else None
+    # 先按UTC截取到范围内，再换算为本地时间
+    slice_start = func.datetime(RoomSession.start_time)
+    slice_end = func.datetime(RoomSession.end_time)
+    if range_start:
+        slice_start = func.max(slice_start, range_start)
+    if range_end:
+        slice_end = func.min(slice_end, range_end)
+    # 数据库中的时间以UTC保存，热力图按营业时区的本地时间分桶
+    local_start = local_time_sql(slice_start, end_date)
+    local_end = local_time_sql(slice_end, end_date)
+
+    sessions = select(
+        RoomSession.room_id.label("room_id"),
+        local_start.label("slice_start"),
+        local_end.label("slice_end")
+    ).where(
+        RoomSession.status == "settled",
+        RoomSession.start_time.isnot(None),
+        RoomSession.end_time.isnot(None)
+    )
+    if range_start:
+        sessions = sessions.where(func.datetime(RoomSession.end_time) > range_start)
+    if range_end:
+        sessions = sessions.where(func.datetime(RoomSession.start_time) < range_end)
+
+    # 递归CTE：每一行是一个整点时间片的开始时间
+    slices = sessions.cte("occupancy_slices", recursive=True)
+    next_hour = func.datetime(func.strftime("%Y-%m-%d %H:00:00", slices.c.slice_start), "+1 hour")
+    slices = slices.union_all(
+        select(slices.c.room_id, next_hour, slices.c.slice_end).where(next_hour < slices.c.slice_end)
+    )
+
+    slice_next_hour = func.datetime(func.strftime("%Y-%m-%d %H:00:00", slices.c.slice_start), "+1 hour")
+    weekday = func.cast(func.strftime("%w", slices.c.slice_start), Integer).label("weekday")
+    hour = func.cast(func.strftime("%H", slices.c.slice_start), Integer).label("hour")
+    hours = func.sum(
+        _usage_hours(slices.c.slice_start, func.min(slice_next_hour, slices.c.slice_end))
+    ).label("hours")
+
+    return db.execute(
+        select(slices.c.room_id, weekday, hour, hours)
+        .where(slices.c.slice_start < slices.c.slice_end)
+        .group_by(slices.c.room_id, weekday, hour)
+    ).all()
 
 
 @router.get("/room-usage", response_model=List[RoomUsageItem])
 def get_room_usage(
+    start_date: Optional[date] = Query(None, description="开始营业日，格式：YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="结束营业日，格式：YYYY-MM-DD"),
     db: Session = Depends(get_db)
 ):
     """获取房间使用率统计"""
-    # 获取所有房间
-    rooms = db.query(Room).all()
-    
-    usage_items = []
-    
-    for room in rooms:
-        # 查询该房间的所有已结算记录
-        sessions = db.query(RoomSession).filter(
-            RoomSession.room_id == room.id,
-            RoomSession.status == "settled"
-        ).all()
-        
-        session_count = len(sessions)
-        total_hours = Decimal("0")
-        total_revenue = Decimal("0")
-        total_profit = Decimal("0")
-        
-        for session in sessions:
-            if session.end_time and session.start_time:
-                # 计算使用时长（小时）
-                duration = session.end_time - session.start_time
-                hours = Decimal(str(duration.total_seconds() / 3600))
-                total_hours += hours
-            
-            # 注意：total_revenue 只计算台子费，因为台子费已包含商品消费和餐费
-            table_fee = session.table_fee or Decimal("0")
-            total_revenue += table_fee
-            total_profit += session.total_profit or Decimal("0")
-        
-        if session_count > 0:
-            usage_items.append(RoomUsageItem(
-                room_id=room.id,
-                room_name=room.name,
-                session_count=session_count,
-                total_hours=total_hours,
-                total_revenue=total_revenue,
-                total_profit=total_profit
-            ))
-    
+    # 单次分组查询：使用次数、使用时长、台子费、利润
+    # 注意：total_revenue 只计算台子费，因为台子费已包含商品消费和餐费
+    session_count = func.count(RoomSession.id)
+    query = db.query(
+        Room.id,
+        Room.name,
+        session_count.label("session_count"),
+        func.sum(_usage_hours(RoomSession.start_time, RoomSession.end_time)).label("total_hours"),
+        func.sum(func.coalesce(RoomSession.table_fee, 0)).label("total_revenue"),
+        func.sum(func.coalesce(RoomSession.total_profit, 0)).label("total_profit")
+    ).join(
+        RoomSession, RoomSession.room_id == Room.id
+    ).filter(
+        RoomSession.status == "settled"
+    )
+    query = query.filter(*business_date_filter(RoomSession.business_date, start_date, end_date))
+
     # 按使用次数排序
-    usage_items.sort(key=lambda x: x.session_count, reverse=True)
-    
-    return usage_items
+    results = query.group_by(Room.id, Room.name).order_by(session_count.desc()).all()
+
+    return [
+        RoomUsageItem(
+            room_id=result.id,
+            room_name=result.name,
+            session_count=result.session_count,
+            total_hours=_round_hours(result.total_hours),
+            total_revenue=result.total_revenue or Decimal("0"),
+            total_profit=result.total_profit or Decimal("0")
+        )
+        for result in results
+    ]
+
+
+@router.get("/room-occupancy", response_model=RoomOccupancyResponse)
+def get_room_occupancy(
+    start_date: Optional[date] = Query(None, description="开始营业日，格式：YYYY-MM-DD，不填则不限"),
+    end_date: Optional[date] = Query(None, description="结束营业日，格式：YYYY-MM-DD，不填则不限"),
+    db: Session = Depends(get_db)
+):
+    """获取房间占用热力图（房间 × 星期 × 小时，按本地时间统计）"""
+    buckets = _room_occupancy_buckets(db, start_date, end_date)
+
+    def empty_matrix():
+        return [[Decimal("0")] * 24 for _ in range(7)]
+
+    room_matrices = {}
+    totals = empty_matrix()
+    for room_id, weekday, hour, hours in buckets:
+        # SQLite %w: 0=周日，转换为 0=周一…6=周日
+        row = (weekday + 6) % 7
+        value = _round_hours(hours)
+        matrix = room_matrices.setdefault(room_id, empty_matrix())
+        matrix[row][hour] += value
+        totals[row][hour] += value
+
+    room_names = dict(db.query(Room.id, Room.name).all())
+    rooms = [
+        RoomOccupancyItem(
+            room_id=room_id,
+            room_name=room_names.get(room_id, f"房间{room_id}"),
+            total_hours=sum((sum(row) for row in matrix), Decimal("0")),
+            heatmap=matrix
+        )
+        for room_id, matrix in sorted(room_matrices.items())
+    ]
+
+    peak_weekday = peak_hour = None
+    peak_value = Decimal("0")
+    for row_index, row in enumerate(totals):
+        for hour_index, value in enumerate(row):
+            if value > peak_value:
+                peak_value = value
+                peak_weekday, peak_hour = row_index, hour_index
+
+    return RoomOccupancyResponse(
+        start_date=start_date,
+        end_date=end_date,
+        rooms=rooms,
+        totals=totals,
+        peak_weekday=peak_weekday,
+        peak_hour=peak_hour
+    )
 
 
 @router.get("/product-sales", response_model=List[ProductSalesItem])
@@ -752,6 +677,184 @@ def get_product_sales(
     return sales_items
 
 
+# 商品销售分析的统计周期，以及按天统计时允许的最大天数
+PRODUCT_ANALYTICS_BUCKETS = ("day", "week", "month")
+PRODUCT_ANALYTICS_MAX_DAYS = 366
+
+
+def _sales_totals(quantity, revenue, cost) -> dict:
+    """SQL汇总的数量、销售额、成本转换为 ProductSalesTotals 的字段"""
+    revenue, cost = _to_money(revenue), _to_money(cost)
+    return {"quantity": int(quantity or 0), "revenue": revenue, "cost": cost, "profit": revenue - cost}
+
+
+@router.get("/product-analytics", response_model=ProductAnalyticsResponse)
+def get_product_analytics(
+    start_date: Optional[date] = Query(None, description="开始营业日，不填时为结束营业日前29天"),
+    end_date: Optional[date] = Query(None, description="结束营业日，不填时为当前营业日"),
+    bucket: str = Query("day", description="统计周期：day=按天, week=按周, month=按月"),
+    top: int = Query(10, ge=1, le=100, description="返回排名前N的商品"),
+    sort_by: str = Query("revenue", description="排名依据：revenue=销售额, quantity=数量, profit=利润"),
+    product_id: Optional[int] = Query(None, description="只统计指定商品"),
+    include_meals: bool = Query(True, description="是否包含餐费"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取商品销售分析
+    商品消费和餐费（每条记录计数量1）合并后按 商品 × 统计周期 分组汇总，返回排名前N的商品及其各周期的数量和销售额
+    （可直接用于看板图表），以及按房间的销售汇总。统计周期按营业日计算。
+    """
+    if bucket not in PRODUCT_ANALYTICS_BUCKETS:
+        raise HTTPException(status_code=400, detail="统计周期必须是 day、week 或 month")
+    if sort_by not in ("revenue", "quantity", "profit"):
+        raise HTTPException(status_code=400, detail="排名依据必须是 revenue、quantity 或 profit")
+    end_date = end_date or current_business_date()
+    start_date = start_date or end_date - timedelta(days=29)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    if bucket == "day" and (end_date - start_date).days >= PRODUCT_ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"按天统计的时间范围不能超过{PRODUCT_ANALYTICS_MAX_DAYS}天")
+
+    # 各统计周期的开始营业日
+    periods = []
+    day = start_date
+    while day <= end_date:
+        period_start = day if bucket == "day" else period_range(bucket, day)[0]
+        if not periods or periods[-1] != period_start:
+            periods.append(period_start)
+        day += timedelta(days=1)
+    period_index = {period.isoformat(): index for index, period in enumerate(periods)}
+
+    # 销售明细：商品消费和餐费，各自按时间范围过滤（走 created_at 索引，指定商品时走 product_id, created_at 索引）
+    start_datetime, end_datetime = business_day_bounds(start_date, end_date)
+
+    def line_filters(model):
+        conditions = [model.created_at >= start_datetime, model.created_at < end_datetime]
+        if product_id is not None:
+            conditions.append(model.product_id == product_id)
+        return conditions
+
+    sources = [
+        select(
+            ProductConsumption.product_id.label("product_id"),
+            ProductConsumption.session_id.label("session_id"),
+            ProductConsumption.quantity.label("quantity"),
+            ProductConsumption.total_price.label("revenue"),
+            ProductConsumption.total_cost.label("cost"),
+            ProductConsumption.created_at.label("created_at")
+        ).where(*line_filters(ProductConsumption))
+    ]
+    if include_meals:
+        sources.append(select(
+            MealRecord.product_id,
+            MealRecord.session_id,
+            literal(1),
+            MealRecord.amount,
+            MealRecord.cost_price,
+            MealRecord.created_at
+        ).where(*line_filters(MealRecord)))
+    lines = union_all(*sources).subquery("sales_lines")
+
+    business_day = business_date_sql(lines.c.created_at, end_date)
+    if bucket == "week":
+        period = func.date(business_day, "weekday 0", "-6 days")
+    elif bucket == "month":
+        period = func.strftime("%Y-%m-01", business_day)
+    else:
+        period = business_day
+    sums = (
+        func.sum(lines.c.quantity).label("quantity"),
+        func.sum(lines.c.revenue).label("revenue"),
+        func.sum(lines.c.cost).label("cost")
+    )
+
+    # 商品 × 统计周期
+    products = {}
+    period_revenues = [Decimal("0.00")] * len(periods)
+    grand_totals = {"quantity": 0, "revenue": Decimal("0.00"), "cost": Decimal("0.00")}
+    for row in db.execute(
+        select(lines.c.product_id, period.label("period"), *sums).group_by(lines.c.product_id, period)
+    ):
+        index = period_index.get(row.period)
+        if index is None:
+            continue
+        totals = _sales_totals(row.quantity, row.revenue, row.cost)
+        item = products.setdefault(row.product_id, {
+            "quantity": 0, "revenue": Decimal("0.00"), "cost": Decimal("0.00"),
+            "quantities": [0] * len(periods), "revenues": [Decimal("0.00")] * len(periods)
+        })
+        item["quantities"][index] = totals["quantity"]
+        item["revenues"][index] = totals["revenue"]
+        period_revenues[index] += totals["revenue"]
+        for key in grand_totals:
+            item[key] += totals[key]
+            grand_totals[key] += totals[key]
+
+    for item in products.values():
+        item["profit"] = item["revenue"] - item["cost"]
+    top_ids = sorted(products, key=lambda key: (-products[key][sort_by], key))[:top]
+
+    # 商品 × 房间
+    room_sales = db.execute(
+        select(lines.c.product_id, RoomSession.room_id, *sums).join(
+            RoomSession, RoomSession.id == lines.c.session_id
+        ).group_by(lines.c.product_id, RoomSession.room_id)
+    ).all()
+    room_ids = {row.room_id for row in room_sales}
+    room_names = dict(db.query(Room.id, Room.name).filter(Room.id.in_(room_ids)).all()) if room_ids else {}
+    product_rooms = {}
+    room_totals = {}
+    for row in room_sales:
+        totals = _sales_totals(row.quantity, row.revenue, row.cost)
+        room_name = room_names.get(row.room_id, "")
+        product_rooms.setdefault(row.product_id, []).append(
+            ProductRoomSalesItem(room_id=row.room_id, room_name=room_name, **totals)
+        )
+        room_total = room_totals.setdefault(
+            row.room_id, {"quantity": 0, "revenue": Decimal("0.00"), "cost": Decimal("0.00")}
+        )
+        for key in room_total:
+            room_total[key] += totals[key]
+
+    product_info = {
+        row.id: row for row in db.query(Product.id, Product.name, Product.product_type).filter(Product.id.in_(top_ids))
+    } if top_ids else {}
+
+    def by_revenue(item):
+        return -item.revenue, item.room_id
+
+    top_products = []
+    for key in top_ids:
+        info = product_info.get(key)
+        top_products.append(ProductAnalyticsItem(
+            product_id=key,
+            product_name=info.name if info else "",
+            product_type=(info.product_type if info else None) or "normal",
+            rooms=sorted(product_rooms.get(key, []), key=by_revenue),
+            **products[key]
+        ))
+
+    return ProductAnalyticsResponse(
+        start_date=start_date,
+        end_date=end_date,
+        bucket=bucket,
+        periods=periods,
+        totals=ProductSalesTotals(profit=grand_totals["revenue"] - grand_totals["cost"], **grand_totals),
+        revenues=period_revenues,
+        products=top_products,
+        rooms=sorted(
+            (
+                ProductRoomSalesItem(
+                    room_id=room_id, room_name=room_names.get(room_id, ""),
+                    profit=values["revenue"] - values["cost"], **values
+                )
+                for room_id, values in room_totals.items()
+            ),
+            key=by_revenue
+        )
+    )
+
+
 @router.get("/win-loss-ranking", response_model=WinLossRankingResponse)
 def get_win_loss_ranking(
     start_date: date = Query(..., description="开始日期"),
@@ -759,17 +862,10 @@ def get_win_loss_ranking(
     db: Session = Depends(get_db)
 ):
     """获取客户输赢榜"""
-    # 转换日期为datetime
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-    
-    # 1. 获取时间段内所有的已结算的session
+    # 1. 获取时间段内（按营业日）所有的已结算的session
     sessions = db.query(RoomSession).filter(
-        and_(
-            RoomSession.start_time >= start_datetime,
-            RoomSession.start_time <= end_datetime,
-            RoomSession.status == "settled"
-        )
+        *business_date_filter(RoomSession.business_date, start_date, end_date),
+        RoomSession.status == "settled"
     ).all()
     
     session_ids = [s.id for s in sessions]
@@ -7,6 +7,7 @@ from typing import List
 from datetime import datetime
 from app.db.database import get_db
 from app.models.system_config import SystemConfig
+from app.services.system_config import config_cache, bump_config_version, DEFAULT_VALUES
 from app.schemas.system_config import (
     SystemConfigCreate, SystemConfigUpdate, SystemConfigResponse
 )
@@ -27,11 +28,7 @@ def get_system_config(config_key: str, db: Session = Depends(get_db)):
     config = db.query(SystemConfig).filter(SystemConfig.key == config_key).first()
     if not config:
         # 如果配置不存在，返回默认值而不是404
-        # 对于initial_cash，返回默认值0
-        default_values = {
-            "initial_cash": "0"
-        }
-        default_value = default_values.get(config_key, "")
+        default_value = DEFAULT_VALUES.get(config_key, "")
         now = datetime.now()
         return SystemConfigResponse(
             id=0,  # 临时ID，表示这是默认值
@@ -58,7 +55,9 @@ def create_system_config(config: SystemConfigCreate, db: Session = Depends(get_d
         description=config.description
     )
     db.add(db_config)
+    bump_config_version(db)
     db.commit()
+    config_cache.invalidate()
     db.refresh(db_config)
     return db_config
 
@@ -86,7 +85,9 @@ def update_system_config(
         if config.description is not None:
             db_config.description = config.description
     
+    bump_config_version(db)
     db.commit()
+    config_cache.invalidate()
     db.refresh(db_config)
     return db_config
 
@@ -99,7 +100,9 @@ def delete_system_config(config_key: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="配置不存在")
     
     db.delete(config)
+    bump_config_version(db)
     db.commit()
+    config_cache.invalidate()
     return {"message": "配置已删除"}
 
 
@@ -5,9 +5,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import List, Optional
-import bcrypt
 from app.db.database import get_db
 from app.models.user import User
+from app.services.passwords import get_password_hash
 from app.schemas.user import (
     UserCreate, UserUpdate, UserResponse, UserBatchDelete
 )
@@ -15,25 +15,6 @@ from app.schemas.user import (
 router = APIRouter(prefix="/api/users", tags=["用户管理"])
 
 
-def get_password_hash(password: str) -> str:
-    """生成密码哈希"""
-    # bcrypt限制密码长度不能超过72字节，需要截断
-    if len(password.encode('utf-8')) > 72:
-        password = password[:72]
-    # 使用bcrypt直接加密
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
-    # bcrypt限制密码长度不能超过72字节，需要截断
-    if len(plain_password.encode('utf-8')) > 72:
-        plain_password = plain_password[:72]
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-
-
 @router.get("", response_model=List[UserResponse])
 def get_users(
     skip: int = 0,
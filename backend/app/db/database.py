@@ -2,6 +2,8 @@
 数据库配置和连接
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -9,6 +11,25 @@ import os
 # SQLite数据库路径
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
 
+# 同步驱动对应的异步驱动
+# 目前只支持 SQLite：同步引擎使用 SQLite 专用的连接参数，异步写接口保存详情快照时使用 SQLite 的 upsert 语法
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_database_url(url: str) -> str:
+    """由同步的数据库地址得到异步驱动的地址（同一个数据库）"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"不支持的数据库: {parsed.drivername}，目前只支持 SQLite")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+# 异步访问使用的数据库地址，默认与 DATABASE_URL 指向同一个数据库
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+
 # 创建数据库引擎
 engine = create_engine(
     DATABASE_URL,
@@ -23,6 +44,13 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def create_missing_indexes(bind):
+    """为已存在的表补建模型中新增的索引（create_all 只创建不存在的表，不会为已存在的表添加索引）"""
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
 def get_db():
     """获取数据库会话"""
     db = SessionLocal()
@@ -32,26 +60,16 @@ def get_db():
         db.close()
 
 
+# 异步数据库引擎（收银相关的高频接口使用，等待数据库时不占用线程池）
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
 
+# 异步会话工厂：提交后不过期已加载的属性（异步会话中不能隐式加载属性）
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
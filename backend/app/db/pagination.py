@@ -0,0 +1,100 @@
+"""
+游标分页（keyset pagination）
+按 (排序列, id) 倒序翻页，下一页只需要按上一页最后一条记录的位置继续查询，
+不再依赖 OFFSET，翻到第 N 页与第 1 页的开销相同。
+
+游标中除位置外还保存了服务端计算的数据（如现金流水的余额）时，使用 encode_signed_cursor 生成带签名的游标，
+解析时校验签名，客户端修改过的游标返回400。
+
+配置（环境变量）：
+- CURSOR_SECRET：游标签名密钥，不设置时每次启动随机生成（重启后旧的签名游标失效，需从首页重新翻页）
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import String, and_, cast, literal, or_
+
+# 下一页游标通过该响应头返回
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+CURSOR_DESCRIPTION = "游标分页：首页传空字符串，之后传响应头 X-Next-Cursor 的值；不传则按 skip/limit 分页"
+
+_CURSOR_SECRET = os.getenv("CURSOR_SECRET", "").encode("utf-8") or secrets.token_bytes(32)
+
+
+def encode_cursor(*values: Any) -> str:
+    """将分页位置编码为不透明的游标字符串"""
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """解析游标字符串，格式不正确时返回400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return values
+
+
+def _cursor_signature(payload: str) -> str:
+    digest = hmac.new(_CURSOR_SECRET, payload.encode("utf-8"), hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def encode_signed_cursor(*values: Any) -> str:
+    """将分页位置编码为带签名的游标字符串（游标内容：编码后的位置 + "." + HMAC签名）"""
+    payload = encode_cursor(*values)
+    return f"{payload}.{_cursor_signature(payload)}"
+
+
+def decode_signed_cursor(cursor: str) -> list:
+    """校验签名并解析游标，签名不正确（被修改或由其它密钥生成）时返回400"""
+    payload, _, signature = cursor.partition(".")
+    expected = _cursor_signature(payload).encode("ascii")
+    if not signature or not hmac.compare_digest(signature.encode("utf-8"), expected):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return decode_cursor(payload)
+
+
+def keyset_paginate(query, sort_column, id_column, cursor: str, limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    对ORM查询按 (sort_column, id_column) 倒序做游标分页
+
+    游标中保存排序列在数据库中的原始文本，比较时也按文本比较，
+    避免 SQLite 中带/不带微秒的时间格式不一致导致漏行或重复。
+
+    返回 (当前页记录, 下一页游标)，没有下一页时游标为 None
+    """
+    sort_key = cast(sort_column, String)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int):
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+        last_key = literal(values[0], String)
+        query = query.filter(or_(
+            sort_column < last_key,
+            and_(sort_column == last_key, id_column < values[1])
+        ))
+
+    rows = query.add_columns(sort_key).order_by(
+        sort_column.desc(), id_column.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_item, last_sort_key = rows[-1][0], rows[-1][-1]
+        next_cursor = encode_cursor(last_sort_key, getattr(last_item, id_column.key))
+
+    return [row[0] for row in rows], next_cursor
@@ -1,25 +1,51 @@
 """
 FastAPI主应用入口
 """
+from app.services.structured_logging import setup_logging
+
+# 最先配置日志，启动过程中的日志也按结构化格式输出
+setup_logging()
+
+import logging
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
-from app.db.database import engine, Base
+from app.db.database import engine, async_engine, Base
 import traceback
 import json
 
+logger = logging.getLogger(__name__)
+
 # 导入所有模型以确保表被创建
 from app.models import (
     Customer, Product, Room, RoomSession, RoomCustomer,
     CustomerLoan, CustomerRepayment, Transfer,
     ProductConsumption, MealRecord, RoomTransfer, User,
-    Supplier, Purchase, PurchaseItem, OtherExpense, OtherIncome, SystemConfig, OperationLog, CashTransfer
+    Supplier, Purchase, PurchaseItem, OtherExpense, OtherIncome, SystemConfig, OperationLog, CashTransfer,
+    InventoryMovement, SessionSnapshot, SessionTotal, BusinessDateSetting
 )
 
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
 
+# 清理操作日志表上已不再使用的索引
+from app.services.operation_log_retention import drop_redundant_indexes, start_pruner
+from app.services.inventory import start_snapshotter
+drop_redundant_indexes(engine)
+
+# 升级后首次启动时生成房间使用记录汇总（同时注册汇总表的更新钩子）
+from app.services.session_totals import backfill_session_totals
+backfill_session_totals(engine)
+
+# 旧数据库添加营业日列并补算；营业日规则改变时重新计算（同时注册写入时计算营业日的钩子）
+from app.services.business_date import ensure_business_dates
+ensure_business_dates(engine)
+
+# 旧数据库补建新增的索引（在添加营业日列之后，营业日列上也有索引）
+from app.db.database import create_missing_indexes
+create_missing_indexes(engine)
+
 # 创建FastAPI应用
 app = FastAPI(
     title="麻将馆记账系统API",
@@ -34,25 +60,47 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Query-Count", "Server-Timing", "Retry-After"],  # 游标分页的下一页游标、SQL查询统计、繁忙时的重试等待秒数
 )
 
+# 统计每个请求的SQL条数和耗时（在操作日志中间件之内，不统计写操作日志的SQL）
+from app.services.query_profiler import install as install_query_profiler
+from app.middleware.query_profiler import QueryProfilerMiddleware
+install_query_profiler(engine)
+install_query_profiler(async_engine.sync_engine)
+app.add_middleware(QueryProfilerMiddleware)
+
 # 添加操作日志中间件
 from app.middleware.operation_log import OperationLogMiddleware
 app.add_middleware(OperationLogMiddleware)
 
+# 响应压缩（在请求指标中间件之内，压缩耗时计入请求耗时）
+from app.middleware.compression import CompressionMiddleware
+app.add_middleware(CompressionMiddleware)
+
+# 请求指标（最外层，统计完整的请求耗时）
+from app.services import metrics
+from app.middleware.metrics import MetricsMiddleware
+metrics.install(engine)
+metrics.install(async_engine.sync_engine)
+app.add_middleware(MetricsMiddleware)
+
 
 # 全局异常处理
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    """处理 422 验证错误，打印详细信息"""
-    print(f"请求验证错误: {request.method} {request.url}")
-    print(f"错误详情: {exc.errors()}")
+    """处理 422 验证错误，记录详细信息"""
+    body = None
     try:
-        body = await request.body()
-        if body:
-            print(f"请求体内容: {body.decode('utf-8')}")
+        body = (await request.body()).decode("utf-8")[:2000] or None  # 限制长度
     except:
         pass
+    logger.warning("请求验证错误", extra={
+        "method": request.method,
+        "url": str(request.url),
+        "errors": exc.errors(),
+        "body": body,
+    })
         
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -67,8 +115,7 @@ async def global_exception_handler(request: Request, exc: Exception):
     import traceback
     error_detail = str(exc)
     traceback_str = traceback.format_exc()
-    print(f"未处理的异常: {error_detail}")
-    print(traceback_str)
+    logger.error("未处理的异常", exc_info=exc, extra={"method": request.method, "path": request.url.path})
     return JSONResponse(
         status_code=500,
         content={
@@ -83,6 +130,22 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
+@app.on_event("startup")
+async def start_background_tasks():
+    """启动后台任务：操作日志归档、库存快照"""
+    app.state.operation_log_pruner = start_pruner()
+    app.state.inventory_snapshotter = start_snapshotter()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    """停止后台任务"""
+    for name in ("operation_log_pruner", "inventory_snapshotter"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -95,8 +158,14 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """运行指标（Prometheus 文本格式）"""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # 注册API路由
-from app.api import customers, products, rooms, statistics, export, auth, backup, users, suppliers, purchases, other_expenses, other_incomes, system_configs, payment_statistics, category_statistics, operation_logs
+from app.api import customers, products, rooms, statistics, export, auth, backup, users, suppliers, purchases, other_expenses, other_incomes, system_configs, payment_statistics, category_statistics, operation_logs, inventory, debug
 app.include_router(auth.router)
 app.include_router(customers.router)
 app.include_router(products.router)
@@ -113,4 +182,6 @@ app.include_router(system_configs.router)
 app.include_router(payment_statistics.router)
 app.include_router(category_statistics.router)
 app.include_router(operation_logs.router)
+app.include_router(inventory.router)
+app.include_router(debug.router)
 
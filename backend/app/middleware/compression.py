@@ -0,0 +1,213 @@
+"""
+响应压缩中间件
+按请求头 Accept-Encoding 协商压缩方式：客户端支持 br 且安装了 brotli 时使用 br，否则使用 gzip。
+- 只压缩文本类响应（JSON、CSV、纯文本等）；已设置 Content-Encoding 的响应和备份接口不压缩
+- 响应体小于 COMPRESSION_MIN_SIZE 时不压缩
+- 流式响应（CSV导出）边生成边压缩，压缩器有输出就发送，每累计 64KB 未输出的内容强制输出一次，
+  不会等全部内容生成后才开始发送
+- 较大的响应体在线程中压缩，不阻塞事件循环
+直接实现为 ASGI 中间件（不经过 BaseHTTPMiddleware）。
+
+配置（环境变量）：
+- COMPRESSION_MIN_SIZE：压缩的最小响应大小（字节），默认 1024
+- COMPRESSION_GZIP_LEVEL：gzip 压缩级别（1-9），默认 6
+- COMPRESSION_BROTLI_QUALITY：brotli 压缩质量（0-11），默认 4
+- COMPRESSION_EXCLUDE_PATHS：不压缩的路径前缀（逗号分隔），默认 /api/backup
+"""
+import os
+import zlib
+from typing import Dict, Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只使用 gzip
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+EXCLUDE_PATHS = tuple(
+    path.strip() for path in os.getenv("COMPRESSION_EXCLUDE_PATHS", "/api/backup").split(",") if path.strip()
+)
+
+# 超过该大小的响应体在线程中压缩
+THREAD_MIN_SIZE = 128 * 1024
+
+# 流式响应累计这么多内容还没有压缩输出时，强制输出一次
+STREAM_FLUSH_SIZE = 64 * 1024
+
+# 需要压缩的内容类型
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+
+class _GzipCompressor:
+    def __init__(self):
+        # wbits 加 16 输出 gzip 格式（带文件头和校验）
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush() if final else output
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + self._compressor.finish() if final else output
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+COMPRESSORS = {"gzip": _GzipCompressor}
+if brotli is not None:
+    COMPRESSORS = {"br": _BrotliCompressor, **COMPRESSORS}
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """解析 Accept-Encoding：编码 -> q 值"""
+    encodings = {}
+    for part in value.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, number = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """选择客户端接受的压缩方式（q 值最高的，相同时优先 br），都不接受时返回 None"""
+    accepted = parse_accept_encoding(accept_encoding)
+    best, best_quality = None, 0.0
+    for name in COMPRESSORS:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def _is_compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "").lower()
+    return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class _CompressedResponse:
+    """
+    一个响应的压缩过程
+    先暂存响应头和开头的内容，确定需要压缩（内容类型可压缩且大小达到阈值）后再修改响应头，之后逐块压缩发送
+    """
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.pending = []
+        self.pending_size = 0
+        self.compressor = None
+        self.unflushed_size = 0
+        self.passthrough = False
+
+    async def _start_passthrough(self):
+        """不压缩：发送暂存的响应头，之后的消息原样发送"""
+        self.passthrough = True
+        if self.start_message is not None:
+            await self._send(self.start_message)
+
+    async def _compress(self, data: bytes, final: bool) -> bytes:
+        if len(data) >= THREAD_MIN_SIZE:
+            return await anyio.to_thread.run_sync(self.compressor.compress, data, final)
+        return self.compressor.compress(data, final)
+
+    async def send(self, message):
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            if message["status"] in (204, 304) or not _is_compressible(Headers(raw=message["headers"])):
+                await self._start_passthrough()
+            return
+
+        if message["type"] != "http.response.body":
+            # 其它扩展消息（如 http.response.pathsend）不压缩
+            await self._start_passthrough()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            self.pending.append(body)
+            self.pending_size += len(body)
+            if more_body and self.pending_size < self.minimum_size:
+                return
+            body = b"".join(self.pending)
+            self.pending = []
+            if not more_body and len(body) < self.minimum_size:
+                await self._start_passthrough()
+                await self._send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+            self.compressor = COMPRESSORS[self.encoding]()
+            compressed = await self._compress(body, final=not more_body)
+            headers = MutableHeaders(scope=self.start_message)
+            del headers["content-length"]
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                headers["content-length"] = str(len(compressed))
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        compressed = await self._compress(body, final=not more_body)
+        self.unflushed_size = 0 if compressed else self.unflushed_size + len(body)
+        if more_body and self.unflushed_size >= STREAM_FLUSH_SIZE:
+            compressed = self.compressor.flush()
+            self.unflushed_size = 0
+        # 压缩器暂未输出内容时不发送空消息，结束时必须发送
+        if compressed or not more_body:
+            await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+
+class CompressionMiddleware:
+    """响应压缩中间件"""
+
+    def __init__(self, app, minimum_size: int = MIN_SIZE, exclude_paths: tuple = EXCLUDE_PATHS):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        response = _CompressedResponse(send, encoding, self.minimum_size)
+        await self.app(scope, receive, response.send)
@@ -0,0 +1,58 @@
+"""
+请求指标中间件
+统计每个请求的延迟、状态码和正在处理的请求数。
+直接实现为 ASGI 中间件（不经过 BaseHTTPMiddleware），不额外创建任务，开销可以忽略。
+"""
+import time
+
+from starlette.routing import Match
+
+from app.services.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+
+
+def _route_template(scope) -> str:
+    """
+    请求匹配的路由模板
+    FastAPI 的接口路由在匹配后把路由放入 scope["route"]，较旧的 Starlette 中 /docs 等普通路由不会放入，
+    这时按应用的路由表重新匹配
+    """
+    route = scope.get("route")
+    if route is None and "app" in scope:
+        for candidate in getattr(scope["app"], "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """请求指标中间件"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start_time = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # 按路由模板（如 /api/rooms/sessions/{session_id}）统计，未匹配的路径合并为一项
+            route_path = _route_template(scope)
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start_time, method=method, route=route_path)
+            HTTP_REQUESTS.inc(method=method, route=route_path, status=status_code)
@@ -3,15 +3,21 @@
 用于记录所有API操作
 """
 import json
+import logging
 import time
 from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.db.database import SessionLocal
 from app.models.operation_log import OperationLog
+from app.services.operation_log_retention import should_log_request
+from app.services.metrics import OPERATION_LOG_WRITES_IN_FLIGHT, OPERATION_LOG_WRITE_DURATION
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 class OperationLogMiddleware(BaseHTTPMiddleware):
     """操作日志中间件"""
@@ -24,6 +30,8 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
         "/redoc",
         "/openapi.json",
         "/api/operation-logs",  # 操作日志查询本身不记录
+        "/api/debug/slow-queries",
+        "/metrics",
     ]
     
     # 模块映射：根据路径判断操作模块
@@ -42,6 +50,7 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
         "/api/system-configs": "系统配置",
         "/api/payment-statistics": "支付方式统计",
         "/api/category-statistics": "分类统计",
+        "/api/inventory": "库存管理",
     }
     
     # 操作类型映射：根据HTTP方法和路径判断操作类型
@@ -108,7 +117,7 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
                         username = "未知用户"
                 except Exception as e:
                     # 解码失败，使用默认值而不是原始编码值
-                    print(f"解码用户名失败: {e}, 原始值: {username_header}")
+                    logger.warning("解码用户名失败", extra={"error": str(e), "username_header": username_header})
                     username = "未知用户"
             else:
                 # 检查是否是Base64编码的字符串（可能是历史数据或错误数据）
@@ -144,7 +153,7 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
                                 username = "未知用户"
                         except Exception as e:
                             # 解码失败，使用默认值而不是原始编码值
-                            print(f"自动解码Base64用户名失败: {e}, 原始值: {username_header}")
+                            logger.warning("自动解码Base64用户名失败", extra={"error": str(e), "username_header": username_header})
                             username = "未知用户"
                     else:
                         # 不是Base64编码，直接使用
@@ -176,6 +185,10 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
         # 获取响应状态码
         status_code = response.status_code
         
+        # 按配置的策略跳过或抽样记录查询请求
+        if not should_log_request(method, status_code):
+            return response
+        
         # 获取响应数据（仅记录关键信息，仅记录错误响应）
         response_data = None
         error_message = None
@@ -217,34 +230,41 @@ class OperationLogMiddleware(BaseHTTPMiddleware):
             elif "/table-fee" in path:
                 action = "设置台子费"
         
-        # 记录操作日志
+        # 记录操作日志（数据库写入在线程池中执行，不阻塞事件循环）
+        with OPERATION_LOG_WRITES_IN_FLIGHT.track_in_progress(), OPERATION_LOG_WRITE_DURATION.time():
+            await run_in_threadpool(
+                self._write_log,
+                user_id=user_id,
+                username=username,
+                action=action,
+                module=module,
+                method=method,
+                path=path,
+                ip_address=ip_address,
+                user_agent=user_agent[:500] if user_agent else None,
+                request_data=request_data,
+                response_data=response_data,
+                status_code=status_code,
+                error_message=error_message,
+                execution_time=execution_time
+            )
+        
+        return response
+    
+    @staticmethod
+    def _write_log(**fields):
+        """写入一条操作日志"""
         try:
             db: Session = SessionLocal()
             try:
-                log = OperationLog(
-                    user_id=user_id,
-                    username=username,
-                    action=action,
-                    module=module,
-                    method=method,
-                    path=path,
-                    ip_address=ip_address,
-                    user_agent=user_agent[:500] if user_agent else None,
-                    request_data=request_data,
-                    response_data=response_data,
-                    status_code=status_code,
-                    error_message=error_message,
-                    execution_time=execution_time
-                )
+                log = OperationLog(**fields)
                 db.add(log)
                 db.commit()
             except Exception as e:
                 db.rollback()
-                print(f"记录操作日志失败: {e}")
+                logger.exception("记录操作日志失败")
             finally:
                 db.close()
         except Exception as e:
-            print(f"创建数据库会话失败: {e}")
-        
-        return response
+            logger.exception("创建数据库会话失败")
 
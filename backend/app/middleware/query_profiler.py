@@ -0,0 +1,31 @@
+"""
+SQL查询统计中间件
+统计每个请求执行的SQL条数和数据库耗时，写入响应头：
+- X-Query-Count：SQL条数
+- Server-Timing：db（数据库耗时）和 app（接口总耗时），浏览器开发者工具的 Timing 面板可直接显示
+流式响应（如CSV导出）的响应头在开始输出时发送，只包含此前执行的SQL。
+"""
+import time
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.services import query_profiler
+
+
+class QueryProfilerMiddleware(BaseHTTPMiddleware):
+    """SQL查询统计中间件"""
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.perf_counter()
+        queries = query_profiler.start_request()
+
+        response = await call_next(request)
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        response.headers["X-Query-Count"] = str(queries.count)
+        response.headers["Server-Timing"] = (
+            f'db;dur={queries.total_ms:.1f};desc="{queries.count} queries", app;dur={duration_ms:.1f}'
+        )
+        query_profiler.finish_request(queries, request.method, request.url.path, response.status_code, duration_ms)
+        return response
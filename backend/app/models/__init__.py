@@ -17,10 +17,14 @@ from app.models.supplier import Supplier
 from app.models.purchase import Purchase, PurchaseItem
 from app.models.other_expense import OtherExpense
 from app.models.other_income import OtherIncome
-from app.models.system_config import SystemConfig
+from app.models.system_config import SystemConfig, SystemConfigVersion
 from app.models.operation_log import OperationLog
 from app.models.cash_transfer import CashTransfer
 from app.models.session_result import SessionResult
+from app.models.inventory_movement import InventoryMovement
+from app.models.session_snapshot import SessionSnapshot
+from app.models.session_total import SessionTotal
+from app.models.business_date_setting import BusinessDateSetting
 
 __all__ = [
     "Customer",
@@ -41,9 +45,14 @@ __all__ = [
     "OtherExpense",
     "OtherIncome",
     "SystemConfig",
+    "SystemConfigVersion",
     "OperationLog",
     "CashTransfer",
     "SessionResult",
+    "InventoryMovement",
+    "SessionSnapshot",
+    "SessionTotal",
+    "BusinessDateSetting",
 ]
 
 
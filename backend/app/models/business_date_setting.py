@@ -0,0 +1,16 @@
+"""
+营业日计算规则模型
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class BusinessDateSetting(Base):
+    """营业日计算规则表（单行），记录已保存的 business_date 是按哪个时区和交班时间计算的"""
+    __tablename__ = "business_date_settings"
+
+    id = Column(Integer, primary_key=True)
+    timezone = Column(String(64), nullable=False, comment="营业时区")
+    cutoff = Column(String(5), nullable=False, comment="交班时间（HH:MM）")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, comment="更新时间")
@@ -1,7 +1,7 @@
 """
 现金转账模型（从银行取现/存入银行）
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, Text
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Text
 from sqlalchemy.sql import func
 from app.db.database import Base
 
@@ -15,6 +15,7 @@ class CashTransfer(Base):
     amount = Column(Numeric(10, 2), nullable=False, comment="转账金额")
     description = Column(Text, comment="备注说明")
     transfer_date = Column(DateTime(timezone=True), nullable=False, comment="转账日期")
+    business_date = Column(Date, index=True, comment="营业日（按转账日期、营业时区和交班时间计算）")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, comment="更新时间")
 
@@ -1,7 +1,7 @@
 """
 客户借款记录模型
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -24,6 +24,7 @@ class CustomerLoan(Base):
     description = Column(String(500), comment="说明（可编辑）")
     session_id = Column(Integer, ForeignKey("room_sessions.id"), comment="房间使用记录ID")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+    business_date = Column(Date, index=True, comment="营业日（按创建时间、营业时区和交班时间计算）")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, comment="更新时间")
 
     # 关系
@@ -33,5 +34,10 @@ class CustomerLoan(Base):
     __table_args__ = (
         Index("idx_customer_loans_customer_id", "customer_id"),
         Index("idx_customer_loans_status", "status"),
+        # 按使用记录查询借款（使用记录汇总在每次写入后按 session_id 重新汇总）
+        Index("idx_customer_loans_session_id", "session_id"),
+        # 欠款账龄统计：按状态筛选未还清的借款、按客户分组、按创建时间分段汇总剩余金额，
+        # 所需的列都在索引中，不需要再回表读取
+        Index("idx_customer_loans_status_customer_created", "status", "customer_id", "created_at", "remaining_amount"),
     )
 
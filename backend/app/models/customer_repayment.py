@@ -1,7 +1,7 @@
 """
 客户还款记录模型
 """
-from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, Numeric, Date, DateTime, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -19,12 +19,20 @@ class CustomerRepayment(Base):
     description = Column(String(500), comment="说明（可编辑）")
     session_id = Column(Integer, ForeignKey("room_sessions.id"), comment="房间使用记录ID")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+    business_date = Column(Date, index=True, comment="营业日（按创建时间、营业时区和交班时间计算）")
 
     # 关系
     customer = relationship("Customer", back_populates="repayments")
     loan = relationship("CustomerLoan")
     session = relationship("RoomSession", back_populates="repayments")
 
+    __table_args__ = (
+        # 按客户查询还款记录（客户详情、对账单）
+        Index("idx_customer_repayments_customer_created", "customer_id", "created_at"),
+        # 按使用记录查询还款（使用记录汇总在每次写入后按 session_id 重新汇总）
+        Index("idx_customer_repayments_session_id", "session_id"),
+    )
+
 
 
 
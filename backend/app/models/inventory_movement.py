@@ -0,0 +1,31 @@
+"""
+库存流水模型
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class InventoryMovement(Base):
+    """库存流水表（只追加，不修改、不删除）"""
+    __tablename__ = "inventory_movements"
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, comment="商品ID")
+    movement_type = Column(String(30), nullable=False, comment="流水类型：initial=初始库存, purchase=进货入库, purchase_delete=删除进货单, consumption=消费出库, consumption_update=修改消费数量, consumption_delete=删除消费记录, session_delete=删除房间使用记录, session_restore=恢复房间使用记录, adjustment=手工调整, snapshot=库存快照")
+    quantity = Column(Integer, nullable=False, comment="库存变动数量（正数入库，负数出库；快照为与流水结余的差异）")
+    stock_after = Column(Integer, nullable=False, comment="变动后库存")
+    reference_type = Column(String(30), comment="关联单据类型：purchase、consumption、session")
+    reference_id = Column(Integer, comment="关联单据ID")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
+
+    # 关系
+    product = relationship("Product")
+
+    __table_args__ = (
+        # 查询某商品某时刻的库存：取该商品在该时刻之前的最后一条流水
+        Index("idx_inventory_movements_product_created", "product_id", "created_at"),
+        # 按时间范围汇总（周转、损耗报表）
+        Index("idx_inventory_movements_created_at", "created_at"),
+    )
@@ -1,7 +1,7 @@
 """
 餐费记录模型
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -26,6 +26,13 @@ class MealRecord(Base):
     customer = relationship("Customer")
     product = relationship("Product", back_populates="meal_records")
 
+    __table_args__ = (
+        # 按使用记录查询餐费（使用记录汇总在每次写入后按 session_id 重新汇总）
+        Index("idx_meal_records_session_id", "session_id"),
+        # 商品销售分析按时间范围汇总餐费
+        Index("idx_meal_records_created_at", "created_at"),
+    )
+
 
 
 
@@ -1,7 +1,7 @@
 """
 其它支出模型
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, Text
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Text
 from sqlalchemy.sql import func
 from app.db.database import Base
 
@@ -16,6 +16,7 @@ class OtherExpense(Base):
     payment_method = Column(String(100), default="现金", comment="支付方式：现金、微信、支付宝、转账")
     description = Column(Text, comment="备注说明")
     expense_date = Column(DateTime(timezone=True), nullable=False, comment="支出日期")
+    business_date = Column(Date, index=True, comment="营业日（按支出日期、营业时区和交班时间计算）")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="创建时间")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, comment="更新时间")
 
@@ -31,6 +31,9 @@ class ProductConsumption(Base):
     __table_args__ = (
         Index("idx_product_consumptions_session_id", "session_id"),
         Index("idx_product_consumptions_product_id", "product_id"),
+        # 商品销售分析：按时间范围汇总所有商品，以及查看单个商品的销售趋势
+        Index("idx_product_consumptions_created_at", "created_at"),
+        Index("idx_product_consumptions_product_created", "product_id", "created_at"),
     )
 
 
@@ -1,7 +1,7 @@
 """
 房间使用记录模型
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -14,6 +14,7 @@ class RoomSession(Base):
     id = Column(Integer, primary_key=True, index=True)
     room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False, index=True, comment="房间ID")
     start_time = Column(DateTime(timezone=True), nullable=False, comment="开始时间")
+    business_date = Column(Date, index=True, comment="营业日（按开始时间、营业时区和交班时间计算）")
     end_time = Column(DateTime(timezone=True), comment="结束时间")
     status = Column(String(100), default="in_progress", index=True, comment="状态：in_progress=进行中, settled=已结算")
     table_fee = Column(Numeric(10, 2), default=0, comment="台子费")
@@ -0,0 +1,16 @@
+"""
+已结算房间使用记录详情快照模型
+"""
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class SessionSnapshot(Base):
+    """房间使用记录详情快照表（已结算记录的详情JSON，可随时删除，读取时按需重建）"""
+    __tablename__ = "session_snapshots"
+
+    session_id = Column(Integer, ForeignKey("room_sessions.id"), primary_key=True, comment="房间使用记录ID")
+    version = Column(Integer, nullable=False, comment="快照格式版本，与当前版本不一致的快照不再使用")
+    payload = Column(Text, nullable=False, comment="详情JSON（与详情接口的响应相同）")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="生成时间")
@@ -0,0 +1,19 @@
+"""
+房间使用记录汇总模型
+"""
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey
+from app.db.database import Base
+
+
+class SessionTotal(Base):
+    """房间使用记录汇总表（每个使用记录按支付方式一行），随明细表的写入在同一事务中更新"""
+    __tablename__ = "session_totals"
+
+    session_id = Column(Integer, ForeignKey("room_sessions.id"), primary_key=True, comment="房间使用记录ID")
+    payment_method = Column(String(100), primary_key=True, comment="支付方式（明细未填写时按现金汇总）")
+    product_revenue = Column(Numeric(12, 2), nullable=False, default=0, comment="商品收入")
+    product_cost = Column(Numeric(12, 2), nullable=False, default=0, comment="商品成本")
+    meal_revenue = Column(Numeric(12, 2), nullable=False, default=0, comment="餐费收入")
+    meal_cost = Column(Numeric(12, 2), nullable=False, default=0, comment="餐费成本")
+    loan_amount = Column(Numeric(12, 2), nullable=False, default=0, comment="借款金额")
+    repayment_amount = Column(Numeric(12, 2), nullable=False, default=0, comment="还款金额")
@@ -18,12 +18,9 @@ class SystemConfig(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, comment="更新时间")
 
 
+class SystemConfigVersion(Base):
+    """系统配置版本表（单行），每次修改系统配置时版本号加1，用于多个进程间的配置缓存失效"""
+    __tablename__ = "system_config_version"
 
-
-
-
-
-
-
-
-
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0, comment="配置版本号")
@@ -0,0 +1,24 @@
+"""
+各模块Pydantic模型共用的序列化函数
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+# 中国时区 UTC+8
+CHINA_TZ = timezone(timedelta(hours=8))
+
+_CHINA_OFFSET = CHINA_TZ.utcoffset(None)
+
+
+def format_datetime_local(dt: Optional[datetime]) -> Optional[str]:
+    """
+    将UTC时间转换为本地时间字符串（YYYY-MM-DD HH:MM:SS）
+    列表接口每条记录要转换多个时间字段，这里直接加上固定的时区偏移再用 isoformat 输出，
+    比 astimezone + strftime 快数倍，结果相同
+    """
+    if dt is None:
+        return None
+    # 带时区的时间先换算为UTC；没有时区信息的时间假设它是 UTC
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt + _CHINA_OFFSET).isoformat(" ", "seconds")
@@ -3,23 +3,9 @@
 """
 from pydantic import BaseModel, Field, field_serializer
 from typing import Optional, List
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from decimal import Decimal
-
-# 中国时区 UTC+8
-CHINA_TZ = timezone(timedelta(hours=8))
-
-
-def format_datetime_local(dt: datetime) -> str:
-    """将UTC时间转换为本地时间字符串"""
-    if dt is None:
-        return None
-    # 如果时间没有时区信息，假设它是 UTC
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    # 转换为中国时区
-    local_dt = dt.astimezone(CHINA_TZ)
-    return local_dt.strftime("%Y-%m-%d %H:%M:%S")
+from app.schemas.common import format_datetime_local
 
 
 class CustomerBase(BaseModel):
@@ -68,6 +54,34 @@ class CustomerTransfer(BaseModel):
     amount: Decimal = Field(..., gt=0, description="转移金额")
 
 
+class CustomerStatementItem(BaseModel):
+    """客户对账单明细项"""
+    type: str = Field(..., description="类型：loan=借款, transfer_in=转入的欠款, repayment=还款, transfer_out=转出的欠款, session_result=输赢记录")
+    id: int = Field(..., description="记录ID（所在记录表中的ID）")
+    created_at: datetime = Field(..., description="时间")
+    amount: Decimal = Field(..., description="记录金额（输赢记录为净输赢，正赢负输）")
+    balance_change: Decimal = Field(..., description="对客户余额的影响（借款为负，还款为正，输赢记录不影响余额）")
+    balance: Decimal = Field(..., description="该笔记录后的客户余额（负数=欠款，正数=预存）")
+    session_id: Optional[int] = Field(None, description="房间使用记录ID")
+    counterparty_name: Optional[str] = Field(None, description="转移欠款的对方客户名称")
+    payment_method: Optional[str] = Field(None, description="支付方式")
+    description: Optional[str] = Field(None, description="说明")
+
+    @field_serializer('created_at')
+    def serialize_datetime(self, dt: datetime) -> str:
+        return format_datetime_local(dt)
+
+
+class CustomerStatementResponse(BaseModel):
+    """客户对账单响应模型"""
+    customer_id: int
+    customer_name: str
+    initial_balance: Decimal = Field(..., description="初期帐单（对账单余额的起点）")
+    items: List[CustomerStatementItem] = Field(default_factory=list, description="明细（最新的在前）")
+    total: int = Field(..., description="日期范围内的记录数")
+    next_cursor: Optional[str] = Field(None, description="下一页游标（仅游标分页时返回，没有下一页时为空）")
+
+
 class CustomerBatchDelete(BaseModel):
     """批量删除客户模型"""
     ids: List[int] = Field(..., description="要删除的客户ID列表")
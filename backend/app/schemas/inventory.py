@@ -0,0 +1,77 @@
+"""
+库存流水相关的Pydantic模型
+"""
+from pydantic import BaseModel, Field, field_serializer
+from typing import Optional, List
+from datetime import datetime, date
+from decimal import Decimal
+from app.schemas.common import format_datetime_local
+
+
+class InventoryMovementResponse(BaseModel):
+    """库存流水响应模型"""
+    id: int
+    product_id: int
+    product_name: Optional[str] = None
+    movement_type: str = Field(..., description="流水类型")
+    quantity: int = Field(..., description="库存变动数量（正数入库，负数出库）")
+    stock_after: int = Field(..., description="变动后库存")
+    reference_type: Optional[str] = None
+    reference_id: Optional[int] = None
+    created_at: datetime
+
+    @field_serializer('created_at')
+    def serialize_datetime(self, dt: datetime) -> Optional[str]:
+        if dt is None:
+            return None
+        return format_datetime_local(dt)
+
+
+class StockAtItem(BaseModel):
+    """某时刻的商品库存"""
+    product_id: int
+    product_name: str
+    stock: Optional[int] = Field(None, description="库存（该时刻之前没有库存记录时为空）")
+
+
+class StockAtResponse(BaseModel):
+    """某日结束时的库存响应模型"""
+    date: date
+    items: List[StockAtItem] = Field(default_factory=list)
+
+
+class InventoryTurnoverItem(BaseModel):
+    """商品库存周转"""
+    product_id: int
+    product_name: str
+    opening_stock: int = Field(..., description="期初库存")
+    purchased: int = Field(..., description="进货数量")
+    sold: int = Field(..., description="销售数量")
+    adjusted: int = Field(..., description="调整数量（手工调整、初始库存、快照差异）")
+    shrinkage: int = Field(..., description="损耗数量")
+    closing_stock: int = Field(..., description="期末库存")
+    turnover_rate: Optional[Decimal] = Field(None, description="周转率（销售数量 / 平均库存）")
+
+
+class InventoryTurnoverResponse(BaseModel):
+    """库存周转报表响应模型"""
+    start_date: date
+    end_date: date
+    items: List[InventoryTurnoverItem] = Field(default_factory=list)
+
+
+class InventoryShrinkageItem(BaseModel):
+    """商品库存损耗"""
+    product_id: int
+    product_name: str
+    shrinkage: int = Field(..., description="损耗数量（库存减少的手工调整与快照差异）")
+    cost_price: Decimal = Field(..., description="当前成本价")
+    shrinkage_cost: Decimal = Field(..., description="损耗成本")
+
+
+class InventoryShrinkageResponse(BaseModel):
+    """库存损耗报表响应模型"""
+    start_date: date
+    end_date: date
+    total_shrinkage_cost: Decimal = Field(default=Decimal("0"), description="损耗总成本")
+    items: List[InventoryShrinkageItem] = Field(default_factory=list)
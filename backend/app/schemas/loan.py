@@ -3,23 +3,9 @@
 """
 from pydantic import BaseModel, Field, field_serializer
 from typing import Optional
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from decimal import Decimal
-
-# 中国时区 UTC+8
-CHINA_TZ = timezone(timedelta(hours=8))
-
-
-def format_datetime_local(dt: datetime) -> str:
-    """将UTC时间转换为本地时间字符串"""
-    if dt is None:
-        return None
-    # 如果时间没有时区信息，假设它是 UTC
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    # 转换为中国时区
-    local_dt = dt.astimezone(CHINA_TZ)
-    return local_dt.strftime("%Y-%m-%d %H:%M:%S")
+from app.schemas.common import format_datetime_local
 
 
 class LoanResponse(BaseModel):
@@ -3,28 +3,16 @@
 """
 from pydantic import BaseModel, Field, field_serializer
 from typing import Optional
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from decimal import Decimal
-
-# 中国时区 UTC+8
-CHINA_TZ = timezone(timedelta(hours=8))
-
-
-def format_datetime_local(dt: datetime) -> str:
-    """将UTC时间转换为本地时间字符串"""
-    if dt is None:
-        return None
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    local_dt = dt.astimezone(CHINA_TZ)
-    return local_dt.strftime("%Y-%m-%d %H:%M:%S")
+from app.schemas.common import format_datetime_local
 
 
 class OtherIncomeCreate(BaseModel):
     """创建其它收入模型"""
     name: str = Field(..., description="收入名称", max_length=200)
     amount: Decimal = Field(..., gt=0, description="收入金额")
-    payment_method: Optional[str] = Field("现金", description="支付方式：现金、微信、支付宝、转账，默认为现金")
+    payment_method: Optional[str] = Field(None, description="支付方式：现金、微信、支付宝、转账，未指定时使用系统配置的默认支付方式（默认为现金）")
     description: Optional[str] = Field(None, description="备注说明")
     income_date: datetime = Field(..., description="收入日期")
 
@@ -3,21 +3,9 @@
 """
 from pydantic import BaseModel, Field, field_serializer
 from typing import Optional, List
-from datetime import datetime, date, timezone, timedelta
+from datetime import datetime, date
 from decimal import Decimal
-
-# 中国时区 UTC+8
-CHINA_TZ = timezone(timedelta(hours=8))
-
-
-def format_datetime_local(dt: datetime) -> str:
-    """将UTC时间转换为本地时间字符串"""
-    if dt is None:
-        return None
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    local_dt = dt.astimezone(CHINA_TZ)
-    return local_dt.strftime("%Y-%m-%d %H:%M:%S")
+from app.schemas.common import format_datetime_local
 
 
 class PurchaseItemBase(BaseModel):
@@ -87,3 +75,18 @@ class PurchaseResponse(PurchaseBase):
         return format_datetime_local(dt)
 
 
+class PurchaseSupplierSummary(BaseModel):
+    """按供货商汇总的进货数据"""
+    supplier_id: int
+    supplier_name: Optional[str] = None
+    purchase_count: int = Field(..., description="进货单数")
+    total_amount: Decimal = Field(..., description="进货总金额")
+
+
+class PurchaseSummaryResponse(BaseModel):
+    """进货汇总响应模型"""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    purchase_count: int = Field(..., description="进货单数")
+    total_amount: Decimal = Field(..., description="进货总金额")
+    suppliers: List[PurchaseSupplierSummary] = Field(default_factory=list, description="按供货商汇总")
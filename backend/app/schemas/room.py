@@ -3,23 +3,9 @@
 """
 from pydantic import BaseModel, Field, field_serializer
 from typing import Optional, List
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from decimal import Decimal
-
-# 中国时区 UTC+8
-CHINA_TZ = timezone(timedelta(hours=8))
-
-
-def format_datetime_local(dt: datetime) -> str:
-    """将UTC时间转换为本地时间字符串"""
-    if dt is None:
-        return None
-    # 如果时间没有时区信息，假设它是 UTC
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    # 转换为中国时区
-    local_dt = dt.astimezone(CHINA_TZ)
-    return local_dt.strftime("%Y-%m-%d %H:%M:%S")
+from app.schemas.common import format_datetime_local
 
 
 class RoomBase(BaseModel):
@@ -90,7 +76,7 @@ class RecordLoanRequest(BaseModel):
     """记录借款请求"""
     customer_id: int = Field(..., description="客户ID")
     amount: Decimal = Field(..., gt=0, description="借款金额")
-    payment_method: Optional[str] = Field("现金", description="支付方式：现金、微信、支付宝、转账，默认为现金")
+    payment_method: Optional[str] = Field(None, description="支付方式：现金、微信、支付宝、转账，未指定时使用系统配置的默认支付方式（默认为现金）")
 
 
 class RecordRepaymentRequest(BaseModel):
@@ -98,7 +84,7 @@ class RecordRepaymentRequest(BaseModel):
     loan_id: Optional[int] = Field(None, description="借款记录ID（可选，如果有则还此笔借款，否则直接冲抵总欠款）")
     customer_id: int = Field(..., description="客户ID")
     amount: Decimal = Field(..., ne=0, description="还款金额（正数为还款，负数为退款/支付，可超过借款金额，超出部分冲抵总欠款）")
-    payment_method: Optional[str] = Field("现金", description="还款方式：现金、微信、支付宝、转账，默认为现金")
+    payment_method: Optional[str] = Field(None, description="还款方式：现金、微信、支付宝、转账，未指定时使用系统配置的默认支付方式（默认为现金）")
 
 
 class RecordProductRequest(BaseModel):
@@ -106,7 +92,7 @@ class RecordProductRequest(BaseModel):
     product_id: int = Field(..., description="商品ID")
     customer_id: Optional[int] = Field(None, description="客户ID（可选）")
     quantity: int = Field(..., gt=0, description="数量")
-    payment_method: Optional[str] = Field("现金", description="支付方式：现金、微信、支付宝、转账，默认为现金")
+    payment_method: Optional[str] = Field(None, description="支付方式：现金、微信、支付宝、转账，未指定时使用系统配置的默认支付方式（默认为现金）")
 
 
 class RecordMealRequest(BaseModel):
@@ -114,7 +100,7 @@ class RecordMealRequest(BaseModel):
     product_id: int = Field(..., description="餐费商品ID")
     customer_id: Optional[int] = Field(None, description="客户ID（可选）")
     amount: Decimal = Field(..., gt=0, description="餐费金额")
-    payment_method: Optional[str] = Field("现金", description="支付方式：现金、微信、支付宝、转账，默认为现金")
+    payment_method: Optional[str] = Field(None, description="支付方式：现金、微信、支付宝、转账，未指定时使用系统配置的默认支付方式（默认为现金）")
     description: Optional[str] = Field(None, description="餐费说明")
 
 
@@ -126,7 +112,7 @@ class TransferRoomRequest(BaseModel):
 class SetTableFeeRequest(BaseModel):
     """设置台子费请求"""
     table_fee: Decimal = Field(..., ge=0, description="台子费")
-    payment_method: Optional[str] = Field("现金", description="支付方式：现金、微信、支付宝、转账，默认为现金")
+    payment_method: Optional[str] = Field(None, description="支付方式：现金、微信、支付宝、转账，未指定时使用系统配置的默认支付方式（默认为现金）")
 
 
 class UpdateProductConsumptionRequest(BaseModel):
@@ -111,6 +111,30 @@ class MonthlyStatisticsResponse(BaseModel):
     other_expense_details: List[OtherExpenseDetailItem] = Field(default_factory=list, description="其它支出明细清单（全月）")
 
 
+class PeriodStatisticsResponse(BaseModel):
+    """时间段统计响应（周、月、季度、年或任意日期范围）"""
+    period: str = Field(..., description="统计周期：week, month, quarter, year, custom")
+    start_date: date
+    end_date: date
+    total_revenue: Decimal = Field(..., description="总收入")
+    total_cost: Decimal = Field(..., description="总成本")
+    total_profit: Decimal = Field(..., description="总利润")
+    other_income: Decimal = Field(default=0, description="其它收入")
+    other_expense: Decimal = Field(default=0, description="其它支出")
+    table_fee_total: Decimal = Field(..., description="台子费总额")
+    table_fee_profit: Decimal = Field(..., description="台子费利润（台子费-商品成本-餐费成本）")
+    product_revenue: Decimal = Field(..., description="商品收入")
+    product_cost: Decimal = Field(..., description="商品成本")
+    meal_revenue: Decimal = Field(..., description="餐费收入")
+    meal_cost: Decimal = Field(..., description="餐费成本")
+    session_count: int = Field(..., description="房间使用次数")
+    room_count: int = Field(..., description="使用房间数")
+    daily_statistics: List[DailyStatisticsResponse] = Field(default_factory=list, description="每日明细")
+    table_fee_details: List[TableFeeDetailItem] = Field(default_factory=list, description="台子费明细清单（全时间段）")
+    other_income_details: List[OtherIncomeDetailItem] = Field(default_factory=list, description="其它收入明细清单（全时间段）")
+    other_expense_details: List[OtherExpenseDetailItem] = Field(default_factory=list, description="其它支出明细清单（全时间段）")
+
+
 class CustomerRankingItem(BaseModel):
     """客户排行项"""
     customer_id: int
@@ -131,6 +155,24 @@ class RoomUsageItem(BaseModel):
     total_profit: Decimal = Field(..., description="总利润")
 
 
+class RoomOccupancyItem(BaseModel):
+    """房间占用热力图项（房间 × 星期 × 小时）"""
+    room_id: int
+    room_name: str
+    total_hours: Decimal = Field(..., description="时间范围内总占用时长（小时）")
+    heatmap: List[List[Decimal]] = Field(..., description="7×24矩阵，行=星期（0=周一…6=周日），列=小时（0-23），值=占用小时数")
+
+
+class RoomOccupancyResponse(BaseModel):
+    """房间占用热力图响应"""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    rooms: List[RoomOccupancyItem] = Field(default_factory=list, description="各房间占用热力图")
+    totals: List[List[Decimal]] = Field(..., description="所有房间合计的7×24矩阵")
+    peak_weekday: Optional[int] = Field(None, description="高峰星期（0=周一…6=周日）")
+    peak_hour: Optional[int] = Field(None, description="高峰小时（0-23）")
+
+
 class ProductSalesItem(BaseModel):
     """商品销售统计项"""
     product_id: int
@@ -141,6 +183,66 @@ class ProductSalesItem(BaseModel):
     total_profit: Decimal = Field(..., description="总利润")
 
 
+class DebtAgingBuckets(BaseModel):
+    """欠款账龄分段金额（按借款的营业日距统计日的天数）"""
+    days_0_30: Decimal = Field(..., description="0-30天")
+    days_31_60: Decimal = Field(..., description="31-60天")
+    days_61_90: Decimal = Field(..., description="61-90天")
+    days_over_90: Decimal = Field(..., description="90天以上")
+    total: Decimal = Field(..., description="未还金额合计")
+    loan_count: int = Field(..., description="未还清的借款笔数")
+
+
+class DebtAgingItem(DebtAgingBuckets):
+    """客户欠款账龄项"""
+    customer_id: int
+    customer_name: str
+    oldest_loan_date: Optional[date] = Field(None, description="最早一笔未还清借款的营业日")
+
+
+class DebtAgingResponse(BaseModel):
+    """欠款账龄响应"""
+    as_of: date = Field(..., description="统计日（当前营业日）")
+    totals: DebtAgingBuckets = Field(..., description="所有客户合计")
+    customers: List[DebtAgingItem] = Field(default_factory=list, description="各客户账龄（按未还金额从高到低）")
+
+
+class ProductSalesTotals(BaseModel):
+    """商品销售汇总"""
+    quantity: int = Field(..., description="销售数量（餐费每条记录计1）")
+    revenue: Decimal = Field(..., description="销售额")
+    cost: Decimal = Field(..., description="成本")
+    profit: Decimal = Field(..., description="利润")
+
+
+class ProductRoomSalesItem(ProductSalesTotals):
+    """商品按房间的销售汇总"""
+    room_id: int
+    room_name: str
+
+
+class ProductAnalyticsItem(ProductSalesTotals):
+    """商品销售分析项"""
+    product_id: int
+    product_name: str
+    product_type: str = Field(..., description="商品类型：normal=普通商品, meal=餐费类型")
+    quantities: List[int] = Field(..., description="各统计周期的销售数量（与 periods 一一对应）")
+    revenues: List[Decimal] = Field(..., description="各统计周期的销售额（与 periods 一一对应）")
+    rooms: List[ProductRoomSalesItem] = Field(default_factory=list, description="按房间的销售汇总（按销售额从高到低）")
+
+
+class ProductAnalyticsResponse(BaseModel):
+    """商品销售分析响应（商品 × 统计周期矩阵）"""
+    start_date: date
+    end_date: date
+    bucket: str = Field(..., description="统计周期：day, week, month")
+    periods: List[date] = Field(..., description="各统计周期的开始营业日（周从周一开始）")
+    totals: ProductSalesTotals = Field(..., description="时间范围内所有商品合计")
+    revenues: List[Decimal] = Field(..., description="所有商品各统计周期的销售额合计")
+    products: List[ProductAnalyticsItem] = Field(default_factory=list, description="排名前N的商品")
+    rooms: List[ProductRoomSalesItem] = Field(default_factory=list, description="所有商品按房间的销售汇总")
+
+
 class WinLossItem(BaseModel):
     """输赢榜单项"""
     customer_id: int
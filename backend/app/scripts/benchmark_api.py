@@ -0,0 +1,232 @@
+"""
+接口性能测试
+对常用的查询接口逐个重复请求，统计每个接口的延迟（p50 / p99 / 平均）和每次请求执行的SQL条数。
+配合 generate_benchmark_data 生成的不同规模数据库使用，比较接口耗时随数据量的变化。
+
+默认在进程内通过 TestClient 调用接口（可统计SQL条数）；
+指定 --base-url 时改为向运行中的服务发送HTTP请求（可并发，不统计SQL条数）。
+请求头 Accept-Encoding 由 --accept-encoding 指定（默认 gzip, br），“传输(KB)”为实际传输的（压缩后的）响应体大小；
+指定 --accept-encoding identity 可对比不压缩时的大小和耗时。
+
+用法：
+    python -m app.scripts.generate_benchmark_data --scale year --database /tmp/bench_year.db
+    python -m app.scripts.benchmark_api --database /tmp/bench_year.db
+    python -m app.scripts.benchmark_api --database /tmp/bench_year.db --only statistics --requests 50
+    python -m app.scripts.benchmark_api --database /tmp/bench_year.db --accept-encoding identity
+    python -m app.scripts.benchmark_api --database /tmp/bench_year.db --base-url http://127.0.0.1:8000 --concurrency 8
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import unicodedata
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def percentile(values, percent):
+    """最近秩法百分位数"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(len(ordered) * percent / 100) - 1)
+    return ordered[index]
+
+
+def build_endpoints(db):
+    """根据数据库中的数据确定各接口的参数，返回 [(名称, URL)]"""
+    from sqlalchemy import func
+    from app.models import Customer, CustomerLoan, Product, RoomSession
+
+    last_start = db.query(func.max(RoomSession.start_time)).scalar()
+    if last_start is None:
+        raise RuntimeError("数据库中没有房间使用记录，请先运行 generate_benchmark_data")
+    last_day = last_start.date()
+    month_start = last_day.replace(day=1)
+    year_start = last_day.replace(month=1, day=1)
+    week_start = last_day - timedelta(days=6)
+
+    session_id = db.query(func.max(RoomSession.id)).filter(RoomSession.status == "settled").scalar()
+    # 借款记录最多的客户
+    customer_id = db.query(CustomerLoan.customer_id).group_by(
+        CustomerLoan.customer_id
+    ).order_by(func.count(CustomerLoan.id).desc()).limit(1).scalar() or db.query(func.min(Customer.id)).scalar()
+    product_id = db.query(func.min(Product.id)).filter(Product.product_type == "normal").scalar()
+
+    return [
+        ("房间列表", "/api/rooms"),
+        ("使用记录列表", "/api/rooms/sessions?limit=100"),
+        ("使用记录列表(深分页)", "/api/rooms/sessions?skip=5000&limit=100"),
+        ("使用记录详情", f"/api/rooms/sessions/{session_id}"),
+        ("客户列表", "/api/customers"),
+        ("客户详情", f"/api/customers/{customer_id}"),
+        ("客户借款", f"/api/customers/{customer_id}/loans"),
+        ("客户还款", f"/api/customers/{customer_id}/repayments"),
+        ("每日统计", f"/api/statistics/daily?date={last_day}"),
+        ("每月统计", f"/api/statistics/monthly?year={last_day.year}&month={last_day.month}"),
+        ("年度统计", f"/api/statistics/period?period=year&date={last_day}"),
+        ("消费排行", "/api/statistics/customer-ranking"),
+        ("欠款排行", "/api/statistics/customer-ranking?rank_type=balance"),
+        ("房间使用率", f"/api/statistics/room-usage?start_date={month_start}&end_date={last_day}"),
+        ("房间占用热力图", f"/api/statistics/room-occupancy?start_date={year_start}&end_date={last_day}"),
+        ("商品销售", "/api/statistics/product-sales"),
+        ("输赢榜(周)", f"/api/statistics/win-loss-ranking?start_date={week_start}&end_date={last_day}"),
+        ("分类统计(月)", f"/api/category-statistics?start_date={month_start}&end_date={last_day}"),
+        ("分类统计(全部)", "/api/category-statistics"),
+        ("支付方式统计(月)", f"/api/payment-statistics?start_date={month_start}&end_date={last_day}"),
+        ("支付方式统计(全部)", "/api/payment-statistics"),
+        ("资金流水", "/api/payment-statistics/cash-flow?limit=100"),
+        ("进货列表", "/api/purchases"),
+        ("进货汇总", "/api/purchases/summary"),
+        ("商品进货历史", f"/api/purchases/product/{product_id}/history"),
+        ("库存流水", f"/api/inventory/movements?product_id={product_id}"),
+        ("库存周转(年)", f"/api/inventory/turnover?start_date={year_start}&end_date={last_day}"),
+        ("操作日志", "/api/operation-logs"),
+    ]
+
+
+class QueryCounter:
+    """统计引擎执行的SQL条数"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def run_in_process(endpoints, requests_per_endpoint, warmup, engine, accept_encoding):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    counter = QueryCounter(engine)
+    results = []
+    with TestClient(app, headers={"Accept-Encoding": accept_encoding}) as client:
+        for name, url in endpoints:
+            for _ in range(warmup):
+                client.get(url)
+
+            timings = []
+            counter.count = 0
+            status_code = None
+            wire_bytes = 0
+            for _ in range(requests_per_endpoint):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+                status_code = response.status_code
+                # 读取到的原始字节数（解压之前）
+                wire_bytes = response.num_bytes_downloaded
+            results.append(summarize(name, url, timings, status_code, counter.count / requests_per_endpoint, wire_bytes))
+            print_row(results[-1])
+    return results
+
+
+def run_over_http(endpoints, requests_per_endpoint, warmup, base_url, concurrency, accept_encoding):
+    def fetch(url):
+        request = urllib.request.Request(base_url.rstrip("/") + url, headers={"Accept-Encoding": accept_encoding})
+        started = time.perf_counter()
+        wire_bytes = 0
+        try:
+            # urllib 不会自动解压，读取到的就是传输的字节数
+            with urllib.request.urlopen(request, timeout=60) as response:
+                wire_bytes = len(response.read())
+                status_code = response.status
+        except urllib.error.HTTPError as e:
+            status_code = e.code
+        return (time.perf_counter() - started) * 1000, status_code, wire_bytes
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for name, url in endpoints:
+            for _ in range(warmup):
+                fetch(url)
+            responses = list(executor.map(fetch, [url] * requests_per_endpoint))
+            timings = [elapsed for elapsed, _, _ in responses]
+            status_code = max(code for _, code, _ in responses)
+            results.append(summarize(name, url, timings, status_code, None, responses[-1][2]))
+            print_row(results[-1])
+    return results
+
+
+def pad(text, width):
+    """按显示宽度左对齐（中文占两列）"""
+    display_width = sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+    return text + " " * max(0, width - display_width)
+
+
+def summarize(name, url, timings, status_code, queries, wire_bytes):
+    return {
+        "name": name,
+        "url": url,
+        "status_code": status_code,
+        "requests": len(timings),
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p99_ms": round(percentile(timings, 99), 2),
+        "mean_ms": round(sum(timings) / len(timings), 2),
+        "queries": round(queries, 1) if queries is not None else None,
+        "wire_kb": round(wire_bytes / 1024, 1),
+    }
+
+
+def print_row(result):
+    queries = "-" if result["queries"] is None else f"{result['queries']:g}"
+    status = "" if result["status_code"] == 200 else f"  [HTTP {result['status_code']}]"
+    print(
+        f"{pad(result['name'], 24)}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+        f"{result['mean_ms']:>10.1f}{queries:>8}{result['wire_kb']:>10.1f}{status}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="接口性能测试")
+    parser.add_argument("--database", required=True, help="测试用的SQLite数据库文件（由 generate_benchmark_data 生成）")
+    parser.add_argument("--requests", type=int, default=20, help="每个接口的请求次数")
+    parser.add_argument("--warmup", type=int, default=2, help="每个接口正式计时前的预热请求次数")
+    parser.add_argument("--only", help="只测试URL中包含该字符串的接口")
+    parser.add_argument("--base-url", help="向运行中的服务发送HTTP请求，例如 http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=1, help="HTTP模式下的并发请求数")
+    parser.add_argument("--accept-encoding", default="gzip, br", help="请求头 Accept-Encoding，identity 表示不压缩")
+    parser.add_argument("--json", dest="json_path", help="把结果另存为JSON文件，便于前后对比")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"数据库文件不存在: {args.database}")
+        sys.exit(1)
+
+    # 数据库连接在导入时创建，必须先设置数据库路径
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+    from app.db.database import SessionLocal, engine
+
+    db = SessionLocal()
+    try:
+        endpoints = build_endpoints(db)
+    finally:
+        db.close()
+    if args.only:
+        endpoints = [(name, url) for name, url in endpoints if args.only in url]
+
+    print(f"数据库: {args.database}，每个接口 {args.requests} 次请求，Accept-Encoding: {args.accept_encoding}")
+    print(f"{pad('接口', 24)}{'p50(ms)':>10}{'p99(ms)':>10}{'平均(ms)':>10}{'SQL数':>8}{'传输(KB)':>10}")
+    if args.base_url:
+        results = run_over_http(endpoints, args.requests, args.warmup, args.base_url, args.concurrency, args.accept_encoding)
+    else:
+        results = run_in_process(endpoints, args.requests, args.warmup, engine, args.accept_encoding)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"database": args.database, "accept_encoding": args.accept_encoding, "results": results},
+                f, ensure_ascii=False, indent=2
+            )
+        print(f"结果已保存: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+响应序列化性能测试
+只测接口返回值转换为JSON的耗时（与 FastAPI 处理 response_model 的步骤相同：校验返回值，再由 Pydantic 直接输出JSON），
+不包含SQL查询，用于比较响应模型、时间格式化等改动前后列表接口的序列化开销。
+
+用法：
+    python -m app.scripts.generate_benchmark_data --scale year --database /tmp/bench_year.db
+    python -m app.scripts.benchmark_serialization --database /tmp/bench_year.db
+    python -m app.scripts.benchmark_serialization --database /tmp/bench_year.db --rows 1000 --repeat 50
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def build_cases(db, rows):
+    """返回 [(名称, 响应类型, 生成返回值的函数)]，返回值与对应接口返回给 FastAPI 的内容相同"""
+    from app.models import Customer, CustomerLoan, OperationLog, RoomSession
+    from app.schemas.customer import CustomerResponse
+    from app.schemas.loan import LoanResponse
+    from app.schemas.room import RoomSessionResponse
+    from app.api.operation_logs import OperationLogResponse
+    from app.api.payment_statistics import CashFlowListResponse, get_cash_flow
+
+    sessions = db.query(RoomSession).order_by(RoomSession.id.desc()).limit(rows).all()
+    customers = db.query(Customer).order_by(Customer.id).limit(rows).all()
+    loans = db.query(CustomerLoan).order_by(CustomerLoan.id.desc()).limit(rows).all()
+    logs = db.query(OperationLog).order_by(OperationLog.id.desc()).limit(rows).all()
+
+    def cash_flow():
+        # 接口内先生成流水项再返回，生成流水项的耗时也计入（另含每次的SQL查询）
+        return get_cash_flow(start_date=None, end_date=None, skip=0, limit=min(rows, 1000), cursor=None, db=db)
+
+    return [
+        ("使用记录列表", List[RoomSessionResponse], lambda: sessions),
+        ("客户列表", List[CustomerResponse], lambda: customers),
+        ("借款列表", List[LoanResponse], lambda: loans),
+        ("操作日志", List[OperationLogResponse], lambda: logs),
+        ("现金流水(含查询)", CashFlowListResponse, cash_flow),
+    ]
+
+
+def measure(response_type, produce, repeat):
+    """重复生成返回值并序列化，返回 (每次平均耗时ms, 记录数, JSON字节数)"""
+    from fastapi.utils import create_model_field
+
+    field = create_model_field(name="response", type_=response_type, mode="serialization")
+
+    def serialize():
+        content = produce()
+        value, errors = field.validate(content, {}, loc=("response",))
+        if errors:
+            raise RuntimeError(f"响应校验失败: {errors[:1]}")
+        return content, field.serialize_json(value, by_alias=True)
+
+    content, body = serialize()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        serialize()
+    elapsed = (time.perf_counter() - started) * 1000 / repeat
+    count = len(content.items) if hasattr(content, "items") else len(content)
+    return elapsed, count, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化性能测试")
+    parser.add_argument("--database", required=True, help="测试用的SQLite数据库文件（由 generate_benchmark_data 生成）")
+    parser.add_argument("--rows", type=int, default=1000, help="每个列表的记录数")
+    parser.add_argument("--repeat", type=int, default=30, help="每项的重复次数")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"数据库文件不存在: {args.database}")
+        sys.exit(1)
+
+    # 数据库连接在导入时创建，必须先设置数据库路径
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+    from app.db.database import SessionLocal
+    from app.scripts.benchmark_api import pad
+
+    db = SessionLocal()
+    try:
+        print(f"数据库: {args.database}，每项重复 {args.repeat} 次")
+        print(f"{pad('响应', 20)}{'记录数':>8}{'平均(ms)':>10}{'每条(us)':>10}{'大小(KB)':>10}")
+        for name, response_type, produce in build_cases(db, args.rows):
+            elapsed, count, size = measure(response_type, produce, args.repeat)
+            per_row = elapsed * 1000 / count if count else 0
+            print(f"{pad(name, 20)}{count:>8}{elapsed:>10.2f}{per_row:>10.1f}{size / 1024:>10.1f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
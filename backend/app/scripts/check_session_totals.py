@@ -0,0 +1,55 @@
+"""
+核对房间使用记录汇总表
+将 session_totals 表与借款、还款、商品消费、餐费明细表重新汇总的结果逐项比较，
+加 --fix 参数时从明细表重新生成全部汇总
+
+用法：
+    python -m app.scripts.check_session_totals
+    python -m app.scripts.check_session_totals --fix
+"""
+import sys
+import os
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.db.database import SessionLocal, engine, Base
+from app.models import SessionTotal  # noqa: F401  确保汇总表已注册
+from app.services.session_totals import find_mismatches, refresh_session_totals
+
+
+def check_session_totals(fix: bool = False) -> int:
+    """核对汇总表，返回不一致的项数"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+
+    try:
+        mismatches = find_mismatches(db)
+        if not mismatches:
+            print("汇总表与明细表一致")
+            return 0
+
+        print(f"发现 {len(mismatches)} 项不一致：")
+        for item in mismatches:
+            print(
+                f"  使用记录 ID={item['session_id']} 支付方式={item['payment_method']} "
+                f"{item['field']}: 汇总表 {item['stored']}，明细 {item['actual']}"
+            )
+
+        if fix:
+            refresh_session_totals(db.connection())
+            db.commit()
+            print("已从明细表重新生成全部汇总")
+        return len(mismatches)
+    except Exception as e:
+        db.rollback()
+        print(f"核对失败: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    fix = "--fix" in sys.argv[1:]
+    count = check_session_totals(fix)
+    sys.exit(1 if count and not fix else 0)
@@ -0,0 +1,362 @@
+"""
+生成性能测试数据
+按指定规模（1个月、1年、5年）生成一个完整的模拟数据库：房间、客户、商品、供应商、进货单，
+以及每天若干房间使用记录（含客户、借款、还款、商品消费、餐费、输赢结果）、其它收入/支出、现金转账。
+数据使用固定随机种子生成，同样的参数总是得到同样的数据，便于前后对比。
+
+用法：
+    python -m app.scripts.generate_benchmark_data --scale month --database /tmp/bench_month.db
+    python -m app.scripts.generate_benchmark_data --scale 5years --database /tmp/bench_5y.db --force
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# 规模：天数、房间数、客户数、每个房间每天的平均使用次数
+SCALES = {
+    "month": {"days": 30, "rooms": 8, "customers": 80, "sessions_per_room": 1.5},
+    "year": {"days": 365, "rooms": 10, "customers": 300, "sessions_per_room": 1.5},
+    "5years": {"days": 365 * 5, "rooms": 12, "customers": 800, "sessions_per_room": 1.5},
+}
+
+PAYMENT_METHODS = ["现金", "现金", "现金", "微信", "微信", "支付宝", "转账"]
+
+PRODUCTS = [
+    # 名称, 单位, 售价, 成本价
+    ("矿泉水", "瓶", "3", "1.2"),
+    ("可乐", "瓶", "5", "2.5"),
+    ("红牛", "罐", "8", "4.5"),
+    ("绿茶", "瓶", "5", "2.4"),
+    ("香烟(中华)", "包", "50", "42"),
+    ("香烟(玉溪)", "包", "25", "21"),
+    ("槟榔", "包", "30", "18"),
+    ("瓜子", "袋", "10", "4"),
+    ("方便面", "桶", "8", "3.5"),
+    ("茶水", "壶", "20", "3"),
+]
+
+MEALS = [
+    ("盒饭", "25"),
+    ("炒粉", "20"),
+    ("夜宵套餐", "45"),
+]
+
+OTHER_INCOMES = ["场地租金", "会员费", "广告费"]
+OTHER_EXPENSES = ["水电费", "房租", "员工工资", "清洁用品", "设备维修"]
+
+BATCH_SIZE = 5000
+
+# 每月进货后每个房间对应的库存量（高于单个商品每个房间的月用量）
+RESTOCK_PER_ROOM = 100
+
+
+def money(value) -> Decimal:
+    return Decimal(value).quantize(Decimal("0.01"))
+
+
+class Generator:
+    """按天顺序生成数据，所有记录的ID在内存中分配"""
+
+    def __init__(self, scale: dict, end_date: date, seed: int):
+        self.scale = scale
+        self.end_date = end_date
+        self.start_date = end_date - timedelta(days=scale["days"] - 1)
+        self.random = random.Random(seed)
+        self.rows = {}
+        self.next_ids = {}
+        self.stock = {}
+        self.products = []
+        self.meals = []
+        self.customer_balances = {}
+        self.active_loans = {}
+
+    def add(self, table: str, row: dict) -> int:
+        """追加一行，返回分配的ID"""
+        row_id = self.next_ids.get(table, 1)
+        self.next_ids[table] = row_id + 1
+        row.setdefault("id", row_id)
+        self.rows.setdefault(table, []).append(row)
+        return row_id
+
+    def at(self, day: date, hour: float) -> datetime:
+        """某天某时刻（UTC，与业务写入一致）"""
+        return datetime.combine(day, datetime.min.time()) + timedelta(hours=hour)
+
+    def generate(self):
+        self._master_data()
+        day = self.start_date
+        while day <= self.end_date:
+            if day.day == 1 or day == self.start_date:
+                self._monthly(day)
+            self._daily(day)
+            day += timedelta(days=1)
+        self._finish()
+
+    def _master_data(self):
+        created = self.at(self.start_date - timedelta(days=1), 2)
+        for index in range(self.scale["rooms"]):
+            self.add("rooms", {"name": f"{index + 1}号房", "status": "idle", "created_at": created, "updated_at": created})
+
+        for index in range(self.scale["customers"]):
+            customer_id = self.add("customers", {
+                "name": f"客户{index + 1:04d}",
+                "phone": f"139{index:08d}",
+                "initial_balance": Decimal("0"),
+                "balance": Decimal("0"),
+                "deposit": Decimal("0"),
+                "is_deleted": 0,
+                "created_at": created,
+                "updated_at": created,
+            })
+            self.customer_balances[customer_id] = Decimal("0")
+            self.active_loans[customer_id] = []
+
+        for name, unit, price, cost in PRODUCTS:
+            product_id = self.add("products", {
+                "name": name, "unit": unit, "price": money(price), "cost_price": money(cost),
+                "stock": 0, "is_active": True, "product_type": "normal",
+                "created_at": created, "updated_at": created,
+            })
+            self.products.append((product_id, money(price), money(cost)))
+            self.stock[product_id] = 0
+
+        for name, price in MEALS:
+            product_id = self.add("products", {
+                "name": name, "unit": "份", "price": money(price), "cost_price": money(price),
+                "stock": 0, "is_active": True, "product_type": "meal",
+                "created_at": created, "updated_at": created,
+            })
+            self.meals.append((product_id, money(price)))
+
+        for name in ("副食批发部", "烟酒商行", "饮料配送中心"):
+            self.add("suppliers", {"name": name, "is_active": True, "created_at": created, "updated_at": created})
+
+    def _monthly(self, day: date):
+        """每月：进货、房租水电等支出、其它收入、现金存取"""
+        rnd = self.random
+        # 每个商品固定从一个供应商进货，补到一个月的用量以上
+        supplier_count = self.next_ids["suppliers"] - 1
+        for supplier_id in range(1, supplier_count + 1):
+            purchase_at = self.at(day, 3)
+            purchase_id = self.add("purchases", {
+                "supplier_id": supplier_id, "purchase_date": day, "total_amount": Decimal("0"),
+                "notes": None, "created_at": purchase_at, "updated_at": purchase_at,
+            })
+            total = Decimal("0")
+            for product_id, _, cost in self.products[supplier_id - 1::supplier_count]:
+                quantity = RESTOCK_PER_ROOM * self.scale["rooms"] + rnd.randint(0, 10) * 10 - self.stock[product_id]
+                line_total = cost * quantity
+                total += line_total
+                self.add("purchase_items", {
+                    "purchase_id": purchase_id, "product_id": product_id, "quantity": quantity,
+                    "unit_price": cost, "total_price": line_total, "created_at": purchase_at,
+                })
+                self._stock_change(product_id, quantity, "purchase", "purchase", purchase_id, purchase_at)
+            self.rows["purchases"][-1]["total_amount"] = total
+
+        for name in OTHER_EXPENSES:
+            expense_at = self.at(day, rnd.uniform(2, 10))
+            self.add("other_expenses", {
+                "name": name, "amount": money(rnd.randint(300, 8000)), "payment_method": rnd.choice(PAYMENT_METHODS),
+                "expense_date": expense_at, "created_at": expense_at, "updated_at": expense_at,
+            })
+        for name in rnd.sample(OTHER_INCOMES, 2):
+            income_at = self.at(day, rnd.uniform(2, 10))
+            self.add("other_incomes", {
+                "name": name, "amount": money(rnd.randint(100, 3000)), "payment_method": rnd.choice(PAYMENT_METHODS),
+                "income_date": income_at, "created_at": income_at, "updated_at": income_at,
+            })
+        for transfer_type in ("cash_to_bank", "bank_to_cash"):
+            transfer_at = self.at(day, rnd.uniform(2, 10))
+            self.add("cash_transfers", {
+                "transfer_type": transfer_type, "amount": money(rnd.randint(10, 50) * 100), "description": None,
+                "transfer_date": transfer_at, "created_at": transfer_at, "updated_at": transfer_at,
+            })
+
+    def _daily(self, day: date):
+        rnd = self.random
+        for room_id in range(1, self.next_ids["rooms"]):
+            # 下午和晚上各一场的概率
+            count = sum(1 for _ in range(2) if rnd.random() < self.scale["sessions_per_room"] / 2)
+            for slot in range(count):
+                # 业务时间为本地 12:00-次日 04:00（UTC 04:00-20:00）
+                start_hour = 4 + slot * 8 + rnd.uniform(0, 3)
+                self._session(room_id, day, start_hour, rnd.uniform(2, 5))
+
+    def _session(self, room_id: int, day: date, start_hour: float, hours: float):
+        rnd = self.random
+        start_time = self.at(day, start_hour)
+        end_time = start_time + timedelta(hours=hours)
+        session_id = self.add("room_sessions", {
+            "room_id": room_id, "start_time": start_time, "end_time": end_time, "status": "settled",
+            "table_fee": Decimal("0"), "table_fee_payment_method": rnd.choice(PAYMENT_METHODS),
+            "total_revenue": Decimal("0"), "total_cost": Decimal("0"), "total_profit": Decimal("0"),
+            "created_at": start_time, "updated_at": end_time,
+        })
+
+        def during():
+            return start_time + timedelta(minutes=rnd.uniform(1, hours * 60 - 1))
+
+        customers = rnd.sample(range(1, self.next_ids["customers"]), 4)
+        total_cost = Decimal("0")
+        for customer_id in customers:
+            self.add("room_customers", {
+                "session_id": session_id, "customer_id": customer_id,
+                "joined_at": start_time, "left_at": end_time, "created_at": start_time,
+            })
+
+            if rnd.random() < 0.3:
+                self._loan(customer_id, session_id, during())
+            if rnd.random() < 0.25:
+                self._repayment(customer_id, session_id, during())
+
+            for _ in range(rnd.randint(0, 3)):
+                product_id, price, cost = rnd.choice(self.products)
+                quantity = rnd.randint(1, 3)
+                consumed_at = during()
+                consumption_id = self.add("product_consumptions", {
+                    "session_id": session_id, "customer_id": customer_id, "product_id": product_id,
+                    "quantity": quantity, "unit_price": price, "total_price": price * quantity,
+                    "cost_price": cost, "total_cost": cost * quantity,
+                    "payment_method": rnd.choice(PAYMENT_METHODS), "created_at": consumed_at,
+                })
+                total_cost += cost * quantity
+                self._stock_change(product_id, -quantity, "consumption", "consumption", consumption_id, consumed_at)
+
+        for _ in range(rnd.randint(0, 2)):
+            product_id, price = rnd.choice(self.meals)
+            self.add("meal_records", {
+                "session_id": session_id, "customer_id": rnd.choice(customers), "product_id": product_id,
+                "amount": price, "cost_price": price, "payment_method": rnd.choice(PAYMENT_METHODS),
+                "description": None, "created_at": during(),
+            })
+            total_cost += price
+
+        # 输赢结果：前三人随机，最后一人补齐使合计为0
+        results = [money(rnd.randint(-30, 30) * 10) for _ in customers[:-1]]
+        results.append(-sum(results))
+        for customer_id, net_win_loss in zip(customers, results):
+            self.add("session_results", {
+                "session_id": session_id, "customer_id": customer_id, "net_win_loss": net_win_loss,
+                "created_at": end_time, "updated_at": end_time,
+            })
+
+        # 台子费已包含商品消费和餐费
+        table_fee = money(rnd.randint(20, 60) * 10) + total_cost
+        row = self.rows["room_sessions"][-1]
+        row.update(table_fee=table_fee, total_revenue=table_fee, total_cost=total_cost, total_profit=table_fee - total_cost)
+
+    def _loan(self, customer_id: int, session_id: int, created_at: datetime):
+        amount = money(self.random.randint(1, 50) * 100)
+        loan_id = self.add("customer_loans", {
+            "customer_id": customer_id, "amount": amount, "loan_type": "from_shop", "status": "active",
+            "remaining_amount": amount, "payment_method": self.random.choice(PAYMENT_METHODS),
+            "description": f"向麻将馆借款 - 剩余未还: ¥{amount:.2f} - 正常", "session_id": session_id,
+            "created_at": created_at, "updated_at": created_at,
+        })
+        self.active_loans[customer_id].append(self.rows["customer_loans"][-1])
+        self.customer_balances[customer_id] -= amount
+        return loan_id
+
+    def _repayment(self, customer_id: int, session_id: int, created_at: datetime):
+        """还款优先冲抵最早的未还借款（与接口逻辑一致）"""
+        active = self.active_loans[customer_id]
+        if not active:
+            return
+        loan = active[0]
+        amount = min(loan["remaining_amount"], money(self.random.randint(1, 30) * 100))
+        payment_method = self.random.choice(PAYMENT_METHODS)
+        self.add("customer_repayments", {
+            "customer_id": customer_id, "loan_id": loan["id"], "amount": amount, "payment_method": payment_method,
+            "description": f"还款 - 关联借款ID: {loan['id']} ({payment_method})", "session_id": session_id,
+            "created_at": created_at,
+        })
+        loan["remaining_amount"] -= amount
+        loan["updated_at"] = created_at
+        if loan["remaining_amount"] <= 0:
+            loan["status"] = "repaid"
+            active.pop(0)
+        self.customer_balances[customer_id] += amount
+
+    def _stock_change(self, product_id, quantity, movement_type, reference_type, reference_id, created_at):
+        self.stock[product_id] += quantity
+        self.add("inventory_movements", {
+            "product_id": product_id, "movement_type": movement_type, "quantity": quantity,
+            "stock_after": self.stock[product_id], "reference_type": reference_type,
+            "reference_id": reference_id, "created_at": created_at,
+        })
+
+    def _finish(self):
+        """回写商品库存和客户余额"""
+        for row in self.rows["products"]:
+            if row["id"] in self.stock:
+                row["stock"] = self.stock[row["id"]]
+        for row in self.rows["customers"]:
+            balance = self.customer_balances[row["id"]]
+            row["balance"] = balance
+            row["deposit"] = balance if balance > 0 else Decimal("0")
+
+
+# 按外键依赖顺序写入
+TABLE_ORDER = [
+    "rooms", "customers", "products", "suppliers", "purchases", "purchase_items",
+    "room_sessions", "room_customers", "customer_loans", "customer_repayments",
+    "product_consumptions", "meal_records", "session_results",
+    "other_incomes", "other_expenses", "cash_transfers", "inventory_movements",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成性能测试数据")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="month", help="数据规模")
+    parser.add_argument("--database", required=True, help="生成的SQLite数据库文件路径")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(), help="数据的最后一天，默认今天")
+    parser.add_argument("--seed", type=int, default=20240101, help="随机种子")
+    parser.add_argument("--force", action="store_true", help="数据库文件已存在时覆盖")
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        if not args.force:
+            print(f"数据库文件已存在: {args.database}（使用 --force 覆盖）")
+            sys.exit(1)
+        os.remove(args.database)
+
+    # 数据库连接在导入时创建，必须先设置数据库路径
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+    from sqlalchemy import text
+    from app.db.database import engine, Base
+    import app.models  # noqa: F401  注册所有表
+    from app.services.session_totals import refresh_session_totals
+    from app.services.business_date import recompute_business_dates
+
+    Base.metadata.create_all(bind=engine)
+
+    started = time.perf_counter()
+    generator = Generator(SCALES[args.scale], args.end_date, args.seed)
+    generator.generate()
+    print(f"生成数据 {generator.start_date} 至 {generator.end_date}，用时 {time.perf_counter() - started:.1f} 秒")
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        connection.execute(text("PRAGMA synchronous = OFF"))
+        for table_name in TABLE_ORDER:
+            rows = generator.rows.get(table_name, [])
+            table = Base.metadata.tables[table_name]
+            for offset in range(0, len(rows), BATCH_SIZE):
+                connection.execute(table.insert(), rows[offset:offset + BATCH_SIZE])
+            print(f"  {table_name}: {len(rows)} 条")
+        # 派生数据：房间使用记录汇总、营业日
+        refresh_session_totals(connection)
+        recompute_business_dates(connection)
+    print(f"写入数据库用时 {time.perf_counter() - started:.1f} 秒: {args.database}")
+
+
+if __name__ == "__main__":
+    main()
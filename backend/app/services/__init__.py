@@ -0,0 +1,3 @@
+"""
+后台服务模块
+"""
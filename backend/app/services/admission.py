@@ -0,0 +1,222 @@
+"""
+请求准入控制（按优先级分通道限流）
+SQLite 同一时间只允许一个写事务，长时间的报表查询会占用线程和读锁，收银的写操作只能等待。
+请求按路由所属的通道限流，通道按优先级从高到低：
+- cashier：收银写操作（开台、借还款、消费、结算等）
+- detail：明细查询（房间、客户等）
+- report：统计报表
+- export：导出和备份
+
+每个通道有自己的并发上限和排队上限，所有通道同时处理的请求数另有总上限。
+有空位时优先放行高优先级通道排队的请求；低优先级的新请求在高优先级通道有人排队时不能插队。
+排队已满或排队超时的请求返回 503，并在 Retry-After 中给出按近期处理耗时估算的重试等待秒数。
+通过 admission_route() 生成的路由类按路由器配置（APIRouter(route_class=...)），未配置的路由不限流。
+流式响应（StreamingResponse，如导出）在内容发送完毕后才归还名额。
+
+配置（环境变量）：
+- ADMISSION_MAX_CONCURRENCY：所有通道同时处理的请求总数上限，默认 24
+- ADMISSION_QUEUE_TIMEOUT：排队等待的最长时间（秒），默认 10
+- ADMISSION_<通道>_CONCURRENCY / ADMISSION_<通道>_QUEUE：通道的并发上限和排队上限（通道名大写，如 ADMISSION_REPORT_CONCURRENCY），
+  默认 cashier 16/100、detail 8/50、report 3/10、export 1/3
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, Optional, Type
+
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+from starlette.responses import StreamingResponse
+
+from app.services.metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+)
+
+MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "24"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+# 通道默认配置（按优先级从高到低）：通道名 -> (并发上限, 排队上限)
+DEFAULT_LANES = {
+    "cashier": (16, 100),
+    "detail": (8, 50),
+    "report": (3, 10),
+    "export": (1, 3),
+}
+
+# 估算处理耗时的平滑系数（指数移动平均）
+_DURATION_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """排队已满或排队超时，请求未被放行"""
+
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(f"{lane} 通道繁忙（{reason}）")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Lane:
+    name: str
+    priority: int
+    concurrency: int
+    queue_size: int
+    active: int = 0
+    average_seconds: float = 0.5
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+
+
+class AdmissionController:
+    """按优先级分通道的并发控制（只在事件循环线程中调用，不需要加锁）"""
+
+    def __init__(self, lanes: Dict[str, tuple], max_concurrency: int, queue_timeout: float):
+        self.lanes: Dict[str, _Lane] = {
+            name: _Lane(name, priority, concurrency, queue_size)
+            for priority, (name, (concurrency, queue_size)) in enumerate(lanes.items())
+        }
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.active = 0
+
+    def _has_capacity(self, lane: _Lane) -> bool:
+        return lane.active < lane.concurrency and self.active < self.max_concurrency
+
+    def _can_admit(self, lane: _Lane) -> bool:
+        """新请求能否直接放行：有空位，且本通道和更高优先级的通道没有排队的请求"""
+        if not self._has_capacity(lane):
+            return False
+        return not any(other.waiters for other in self.lanes.values() if other.priority <= lane.priority)
+
+    def _admit(self, lane: _Lane):
+        lane.active += 1
+        self.active += 1
+        ADMISSION_IN_FLIGHT.inc(lane=lane.name)
+
+    def _dispatch(self):
+        """有空位时按优先级放行排队的请求"""
+        for lane in sorted(self.lanes.values(), key=lambda item: item.priority):
+            while lane.waiters and self._has_capacity(lane):
+                waiter = lane.waiters.popleft()
+                ADMISSION_QUEUE_DEPTH.dec(lane=lane.name)
+                if waiter.done():
+                    continue
+                self._admit(lane)
+                waiter.set_result(None)
+            if self.active >= self.max_concurrency:
+                return
+
+    def retry_after(self, lane: _Lane) -> int:
+        """按排队人数和近期平均处理耗时估算的重试等待秒数"""
+        pending = len(lane.waiters) + lane.active + 1
+        return max(1, math.ceil(pending * lane.average_seconds / max(lane.concurrency, 1)))
+
+    async def acquire(self, lane_name: str):
+        """取得通道的处理名额，排队已满或超时时抛出 AdmissionRejected"""
+        lane = self.lanes[lane_name]
+        if self._can_admit(lane):
+            self._admit(lane)
+            return
+        if len(lane.waiters) >= lane.queue_size:
+            ADMISSION_REJECTED.inc(lane=lane.name, reason="queue_full")
+            raise AdmissionRejected(lane.name, "queue_full", self.retry_after(lane))
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.inc(lane=lane.name)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时（或客户端断开）的同时已被放行，归还名额
+                self.release(lane_name)
+            elif waiter in lane.waiters:
+                lane.waiters.remove(waiter)
+                ADMISSION_QUEUE_DEPTH.dec(lane=lane.name)
+            if isinstance(e, asyncio.TimeoutError):
+                ADMISSION_REJECTED.inc(lane=lane.name, reason="timeout")
+                raise AdmissionRejected(lane.name, "timeout", self.retry_after(lane)) from None
+            raise
+        finally:
+            ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - started, lane=lane.name)
+
+    def release(self, lane_name: str, duration: Optional[float] = None):
+        """归还处理名额（duration 为本次处理耗时，用于估算 Retry-After）"""
+        lane = self.lanes[lane_name]
+        lane.active -= 1
+        self.active -= 1
+        ADMISSION_IN_FLIGHT.dec(lane=lane.name)
+        if duration is not None:
+            lane.average_seconds += (duration - lane.average_seconds) * _DURATION_SMOOTHING
+        self._dispatch()
+
+
+async def _release_after_body(body_iterator: AsyncIterator, lane_name: str, started: float) -> AsyncIterator:
+    """逐块转发流式响应的内容，发送完毕（或客户端断开）后归还处理名额"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        controller.release(lane_name, time.perf_counter() - started)
+
+
+def _lane_settings() -> Dict[str, tuple]:
+    lanes = {}
+    for name, (concurrency, queue_size) in DEFAULT_LANES.items():
+        prefix = f"ADMISSION_{name.upper()}"
+        lanes[name] = (
+            int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+            int(os.getenv(f"{prefix}_QUEUE", str(queue_size))),
+        )
+    return lanes
+
+
+controller = AdmissionController(_lane_settings(), MAX_CONCURRENCY, QUEUE_TIMEOUT_SECONDS)
+
+
+def admission_route(read_lane: str, write_lane: Optional[str] = None, base: Type[APIRoute] = APIRoute) -> Type[APIRoute]:
+    """
+    生成按通道限流的路由类，用作 APIRouter 的 route_class
+    GET 接口进入 read_lane，其它方法进入 write_lane（不指定时与 read_lane 相同）；base 为要继承的路由类
+    """
+    write_lane = write_lane or read_lane
+    for lane in (read_lane, write_lane):
+        if lane not in controller.lanes:
+            raise ValueError(f"未知的限流通道: {lane}")
+
+    class AdmissionRoute(base):
+        def get_route_handler(self):
+            handler = super().get_route_handler()
+            lane = read_lane if self.methods and "GET" in self.methods else write_lane
+
+            async def admitted_handler(request: Request):
+                try:
+                    await controller.acquire(lane)
+                except AdmissionRejected as e:
+                    raise HTTPException(
+                        status_code=503,
+                        detail="服务器繁忙，请稍后重试",
+                        headers={"Retry-After": str(e.retry_after)}
+                    )
+                started = time.perf_counter()
+                try:
+                    response = await handler(request)
+                except BaseException:
+                    controller.release(lane, time.perf_counter() - started)
+                    raise
+                if isinstance(response, StreamingResponse):
+                    # 流式响应（导出）在返回后才生成内容，发送完毕后再归还名额
+                    response.body_iterator = _release_after_body(response.body_iterator, lane, started)
+                else:
+                    controller.release(lane, time.perf_counter() - started)
+                return response
+
+            return admitted_handler
+
+    AdmissionRoute.__name__ = f"{base.__name__}[{read_lane}/{write_lane}]"
+    return AdmissionRoute
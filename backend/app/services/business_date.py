@@ -0,0 +1,235 @@
+"""
+营业日
+麻将馆营业到凌晨，报表按营业日而不是自然日统计：
+记录时间换算到营业时区后，交班时间之前的记录计入前一天。例如交班时间为 06:00 时，凌晨 03:00 的记录计入前一天。
+
+房间使用记录、借款、还款、其它收入、其它支出、现金转账在写入时（flush 前）计算 business_date 并保存（有索引），
+报表按 business_date 的相等或范围条件查询；没有 business_date 的明细（商品消费、餐费）用 business_day_bounds()
+换算出营业日对应的时间范围，需要按营业日分组时用 business_date_sql() 在SQL中计算，按本地钟点分组时用 local_time_sql() 换算。
+
+配置（环境变量）：
+- BUSINESS_TIMEZONE：营业时区，默认 Asia/Shanghai（也可以写成 +08:00）
+- BUSINESS_DAY_CUTOFF：交班时间（HH:MM），默认 06:00；设为 08:00 时与按UTC日期统计的旧报表结果相同
+
+旧数据库在启动时自动添加 business_date 列和索引并补算；修改配置后重启服务，启动时按新配置重新计算全部记录。
+"""
+import logging
+import os
+import re
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Date, bindparam, event, func, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.models.business_date_setting import BusinessDateSetting
+from app.models.cash_transfer import CashTransfer
+from app.models.customer_loan import CustomerLoan
+from app.models.customer_repayment import CustomerRepayment
+from app.models.other_expense import OtherExpense
+from app.models.other_income import OtherIncome
+from app.models.room_session import RoomSession
+
+logger = logging.getLogger(__name__)
+
+BUSINESS_TIMEZONE = os.getenv("BUSINESS_TIMEZONE", "Asia/Shanghai")
+BUSINESS_DAY_CUTOFF = os.getenv("BUSINESS_DAY_CUTOFF", "06:00")
+
+# 保存 business_date 的表及计算营业日所依据的时间列
+BUSINESS_DATE_SOURCES = {
+    RoomSession: "start_time",
+    CustomerLoan: "created_at",
+    CustomerRepayment: "created_at",
+    OtherIncome: "income_date",
+    OtherExpense: "expense_date",
+    CashTransfer: "transfer_date",
+}
+
+# 补算时每批更新的记录数
+BACKFILL_BATCH_SIZE = 2000
+
+
+def _parse_timezone(name: str) -> tzinfo:
+    """解析时区名称（如 Asia/Shanghai）或固定偏移（如 +08:00、UTC+8）"""
+    match = re.fullmatch(r"(?:UTC)?([+-])(\d{1,2})(?::?(\d{2}))?", name.strip())
+    if match:
+        sign = 1 if match.group(1) == "+" else -1
+        offset = timedelta(hours=int(match.group(2)), minutes=int(match.group(3) or 0))
+        return timezone(sign * offset)
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception as e:
+        logger.warning("无法识别营业时区 %s（%s），使用 UTC+8", name, e)
+        return timezone(timedelta(hours=8))
+
+
+def _parse_cutoff(value: str) -> timedelta:
+    """解析交班时间 HH:MM"""
+    try:
+        parsed = datetime.strptime(value.strip(), "%H:%M")
+    except ValueError:
+        logger.warning("无法识别交班时间 %s，使用 06:00", value)
+        parsed = datetime.strptime("06:00", "%H:%M")
+    return timedelta(hours=parsed.hour, minutes=parsed.minute)
+
+
+_TIMEZONE = _parse_timezone(BUSINESS_TIMEZONE)
+_CUTOFF = _parse_cutoff(BUSINESS_DAY_CUTOFF)
+
+
+def business_date_of(value: Optional[datetime]) -> date:
+    """
+    某个时间所属的营业日
+    不带时区的时间按UTC处理（数据库中的时间以UTC保存）；为空时使用当前时间（服务器默认值的创建时间）
+    """
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value.astimezone(_TIMEZONE) - _CUTOFF).date()
+
+
+def current_business_date() -> date:
+    """当前营业日"""
+    return business_date_of(None)
+
+
+def business_day_start(business_date: date) -> datetime:
+    """营业日开始的时间（UTC，不带时区，与数据库中保存的时间可直接比较）"""
+    local_start = (datetime.combine(business_date, time()) + _CUTOFF).replace(tzinfo=_TIMEZONE)
+    return local_start.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def business_day_bounds(
+    start_date: Optional[date], end_date: Optional[date]
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    营业日范围对应的时间范围 [开始, 结束)（UTC，不带时区），用于没有 business_date 列的表
+    start_date / end_date 为空时对应的边界也为空
+    """
+    start_datetime = business_day_start(start_date) if start_date else None
+    end_datetime = business_day_start(end_date + timedelta(days=1)) if end_date else None
+    return start_datetime, end_datetime
+
+
+def business_date_sql(column, reference_date: Optional[date] = None):
+    """
+    SQL表达式：时间列所属的营业日（SQLite date()，YYYY-MM-DD 文本），用于没有 business_date 列的表按营业日分组
+    按营业时区在 reference_date（默认当前营业日）的UTC偏移换算；有夏令时的营业时区在切换前后的记录可能相差一天
+    """
+    reference = datetime.combine(reference_date or current_business_date(), time()) + _CUTOFF
+    offset = _TIMEZONE.utcoffset(reference) - _CUTOFF
+    return func.date(column, _minutes_modifier(offset))
+
+
+def local_time_sql(column, reference_date: Optional[date] = None):
+    """
+    SQL表达式：UTC时间列换算为营业时区的本地时间（SQLite datetime()，YYYY-MM-DD HH:MM:SS 文本），用于按本地钟点分组
+    与 business_date_sql() 一样按 reference_date（默认当前营业日）的UTC偏移换算
+    """
+    reference = datetime.combine(reference_date or current_business_date(), time()) + _CUTOFF
+    return func.datetime(column, _minutes_modifier(_TIMEZONE.utcoffset(reference)))
+
+
+def _minutes_modifier(offset: timedelta) -> str:
+    """UTC偏移转换为SQLite日期函数的修饰符，如 +480 minutes"""
+    return f"{int(offset.total_seconds() // 60):+d} minutes"
+
+
+def business_date_filter(column, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List:
+    """按营业日过滤的条件列表：同一天时用相等条件，否则用范围条件"""
+    if start_date and end_date and start_date == end_date:
+        return [column == start_date]
+    conditions = []
+    if start_date:
+        conditions.append(column >= start_date)
+    if end_date:
+        conditions.append(column <= end_date)
+    return conditions
+
+
+def _stored_business_date(value: Optional[datetime]) -> date:
+    """
+    按写入数据库后的值计算营业日
+    SQLite 保存带时区的时间时直接丢弃时区，读出的值按UTC处理；写入时也按同样的方式计算，与补算结果一致
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return business_date_of(value)
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_business_dates(db: Session, flush_context, instances):
+    """新增记录、或修改了时间的记录，在写入前计算营业日"""
+    for obj in db.new:
+        source = BUSINESS_DATE_SOURCES.get(type(obj))
+        if source:
+            obj.business_date = _stored_business_date(getattr(obj, source))
+    for obj in db.dirty:
+        source = BUSINESS_DATE_SOURCES.get(type(obj))
+        if source and inspect(obj).attrs[source].history.has_changes():
+            obj.business_date = _stored_business_date(getattr(obj, source))
+
+
+def recompute_business_dates(connection: Connection, only_missing: bool = True) -> int:
+    """
+    计算已有记录的营业日（only_missing 为 True 时只补算 business_date 为空的记录）
+    使用传入的连接执行，与调用方在同一事务中；返回更新的记录数
+    """
+    updated = 0
+    for model, source in BUSINESS_DATE_SOURCES.items():
+        table = model.__table__
+        query = select(table.c.id, table.c[source])
+        if only_missing:
+            query = query.where(table.c.business_date.is_(None))
+        rows = connection.execute(query).all()
+        statement = update(table).where(
+            table.c.id == bindparam("record_id")
+        ).values(business_date=bindparam("value", type_=Date))
+        for offset in range(0, len(rows), BACKFILL_BATCH_SIZE):
+            batch = rows[offset:offset + BACKFILL_BATCH_SIZE]
+            connection.execute(statement, [
+                {"record_id": row[0], "value": business_date_of(row[1])} for row in batch
+            ])
+        updated += len(rows)
+    return updated
+
+
+def ensure_business_dates(engine: Engine):
+    """
+    启动时（以及还原备份后）调用：
+    为旧数据库添加 business_date 列和索引，补算缺少营业日的记录；营业时区或交班时间改变时重新计算全部记录
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for model in BUSINESS_DATE_SOURCES:
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            if "business_date" not in columns:
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN business_date DATE'))
+            for index in table.indexes:
+                if "business_date" in index.columns:
+                    index.create(connection, checkfirst=True)
+
+        BusinessDateSetting.__table__.create(connection, checkfirst=True)
+        setting = connection.execute(select(BusinessDateSetting.__table__)).first()
+        changed = setting is not None and (setting.timezone, setting.cutoff) != (BUSINESS_TIMEZONE, BUSINESS_DAY_CUTOFF)
+
+        updated = recompute_business_dates(connection, only_missing=not changed)
+
+        values = {"timezone": BUSINESS_TIMEZONE, "cutoff": BUSINESS_DAY_CUTOFF}
+        if setting is None:
+            connection.execute(BusinessDateSetting.__table__.insert().values(id=1, **values))
+        elif changed:
+            connection.execute(update(BusinessDateSetting.__table__).values(**values))
+
+    if changed:
+        logger.info(
+            "营业日规则已改为 %s %s，已重新计算 %d 条记录的营业日", BUSINESS_TIMEZONE, BUSINESS_DAY_CUTOFF, updated
+        )
+    elif updated:
+        logger.info("已补算 %d 条记录的营业日", updated)
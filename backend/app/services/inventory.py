@@ -0,0 +1,199 @@
+"""
+库存流水
+所有库存变动都追加一条流水，记录变动数量和变动后的库存，
+某个时刻的库存只需取该时刻之前的最后一条流水，不需要回放全部历史。
+
+后台任务定期为每个商品写入一条快照：没有流水的商品以快照作为期初库存；
+若商品库存被流水以外的方式修改（如直接改库），快照会记录实际库存与流水结余的差异，计入损耗报表。
+
+配置（环境变量）：
+- INVENTORY_SNAPSHOT_INTERVAL：快照间隔（秒），默认 86400，设为 0 表示不自动生成快照
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.models.inventory_movement import InventoryMovement
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("INVENTORY_SNAPSHOT_INTERVAL", "86400"))
+
+# 与销售相关的流水类型（用于周转报表的出库数量）
+SALES_MOVEMENT_TYPES = (
+    "consumption",
+    "consumption_update",
+    "consumption_delete",
+    "session_delete",
+    "session_restore",
+)
+
+# 与进货相关的流水类型
+PURCHASE_MOVEMENT_TYPES = ("purchase", "purchase_delete")
+
+
+def record_movement(
+    db: Session,
+    product: Product,
+    quantity: int,
+    movement_type: str,
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None
+):
+    """
+    记录一条库存流水（在修改 product.stock 之后调用，与业务修改在同一事务中提交）
+    数量为0或餐费类商品不记录
+    """
+    if not quantity or product.product_type == "meal":
+        return
+    db.add(InventoryMovement(
+        product_id=product.id,
+        movement_type=movement_type,
+        quantity=quantity,
+        stock_after=product.stock,
+        reference_type=reference_type,
+        reference_id=reference_id
+    ))
+
+
+def record_movements_for_products(
+    db: Session,
+    quantities: Dict[int, int],
+    movement_type: str,
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None
+):
+    """
+    为批量更新过库存的商品记录流水（库存已在数据库中更新，变动后库存从数据库读取）
+    quantities: 商品ID -> 变动数量
+    """
+    if not quantities:
+        return
+    rows = db.query(Product.id, Product.stock, Product.product_type).filter(
+        Product.id.in_(list(quantities))
+    ).all()
+    db.add_all([
+        InventoryMovement(
+            product_id=row.id,
+            movement_type=movement_type,
+            quantity=quantities[row.id],
+            stock_after=row.stock,
+            reference_type=reference_type,
+            reference_id=reference_id
+        )
+        for row in rows
+        if quantities[row.id] and row.product_type != "meal"
+    ])
+
+
+def latest_movement_ids(db: Session, at: Optional[datetime] = None, inclusive: bool = True):
+    """
+    每个商品在某时刻之前的最后一条流水ID（子查询）
+    at 为空时取当前最后一条；inclusive=False 时不包含恰好在该时刻的流水
+    """
+    query = db.query(
+        InventoryMovement.product_id.label("product_id"),
+        func.max(InventoryMovement.id).label("movement_id")
+    )
+    if at is not None:
+        if inclusive:
+            query = query.filter(InventoryMovement.created_at <= at)
+        else:
+            query = query.filter(InventoryMovement.created_at < at)
+    return query.group_by(InventoryMovement.product_id).subquery()
+
+
+def stock_at(db: Session, at: datetime, product_ids: Optional[Iterable[int]] = None, inclusive: bool = True) -> Dict[int, int]:
+    """查询各商品在某时刻的库存（该时刻之前没有流水的商品不包含在结果中）"""
+    latest = latest_movement_ids(db, at, inclusive)
+    query = db.query(InventoryMovement.product_id, InventoryMovement.stock_after).join(
+        latest, InventoryMovement.id == latest.c.movement_id
+    )
+    if product_ids is not None:
+        query = query.filter(InventoryMovement.product_id.in_(list(product_ids)))
+    return {row.product_id: row.stock_after for row in query.all()}
+
+
+def take_snapshot(db: Session) -> int:
+    """
+    为所有普通商品写入库存快照（不提交事务）
+    快照的数量为实际库存与最后一条流水结余的差异；商品还没有流水时差异记为0（作为期初库存）
+
+    返回写入的快照数
+    """
+    latest = latest_movement_ids(db)
+    rows = db.query(Product.id, Product.stock, InventoryMovement.stock_after).outerjoin(
+        latest, latest.c.product_id == Product.id
+    ).outerjoin(
+        InventoryMovement, InventoryMovement.id == latest.c.movement_id
+    ).filter(
+        (Product.product_type != "meal") | (Product.product_type.is_(None))
+    ).all()
+
+    snapshots = [
+        InventoryMovement(
+            product_id=product_id,
+            movement_type="snapshot",
+            quantity=(stock or 0) - expected if expected is not None else 0,
+            stock_after=stock or 0
+        )
+        for product_id, stock, expected in rows
+    ]
+    db.add_all(snapshots)
+    return len(snapshots)
+
+
+def _snapshot_due(db: Session) -> bool:
+    """距离上次快照是否已超过快照间隔"""
+    last_snapshot = db.query(func.max(InventoryMovement.created_at)).filter(
+        InventoryMovement.movement_type == "snapshot"
+    ).scalar()
+    if last_snapshot is None:
+        return True
+    # created_at 由数据库以 UTC 时间写入
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now - last_snapshot.replace(tzinfo=None) >= timedelta(seconds=SNAPSHOT_INTERVAL_SECONDS)
+
+
+def _run_snapshot() -> int:
+    """使用独立的数据库会话，在到期时生成一次快照"""
+    db = SessionLocal()
+    try:
+        if not _snapshot_due(db):
+            return 0
+        count = take_snapshot(db)
+        db.commit()
+        return count
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_snapshotter() -> None:
+    """后台任务：定期生成库存快照"""
+    # 每小时检查一次，快照间隔更短时按快照间隔检查
+    check_interval = min(SNAPSHOT_INTERVAL_SECONDS, 3600)
+    while True:
+        try:
+            count = await asyncio.to_thread(_run_snapshot)
+            if count:
+                logger.info("已生成 %d 条库存快照", count)
+        except Exception:
+            logger.exception("生成库存快照失败")
+        await asyncio.sleep(check_interval)
+
+
+def start_snapshotter() -> Optional[asyncio.Task]:
+    """启动库存快照后台任务（快照间隔为0时不启动）"""
+    if SNAPSHOT_INTERVAL_SECONDS <= 0:
+        return None
+    return asyncio.create_task(run_snapshotter())
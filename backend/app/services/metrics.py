@@ -0,0 +1,271 @@
+"""
+运行指标（Prometheus 文本格式）
+进程内的指标注册表，通过 /metrics 输出，供 Prometheus 抓取。
+不依赖第三方库：计数、直方图的更新只是在锁内加几个数，对每个请求的开销可以忽略。
+
+指标：
+- http_requests_total / http_request_duration_seconds：按接口（路由模板）统计的请求数和延迟
+- http_requests_in_flight：正在处理的请求数
+- db_pool_checkout_wait_seconds：从连接池获取数据库连接的等待时间
+- db_pool_connections_checked_out：当前借出的数据库连接数
+- sqlite_lock_errors_total：SQLite 超过等待时间仍无法取得锁（database is locked）的次数
+- operation_log_writes_in_flight / operation_log_write_duration_seconds：正在写入和写入操作日志的耗时
+- backup_duration_seconds：备份、还原、清理（含清理前的自动备份）的耗时
+- admission_*：各限流通道正在处理和排队的请求数、排队时间、被拒绝（返回503）的请求数
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 默认的延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    """指标基类：按标签值保存数据"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """只增不减的计数"""
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Metric):
+    """可增可减的当前值；也可以指定函数在输出时取值"""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function = function
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    """按分桶累计的耗时分布"""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 标签值 -> [各分桶计数（非累计）, 总和, 次数]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = 0
+        while value > self.buckets[index]:
+            index += 1
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(data[0]), data[1], data[2])) for key, data in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status code", ("method", "route", "status")
+))
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed"
+))
+DB_POOL_CHECKOUT_WAIT = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a database connection from the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+))
+DB_POOL_CHECKED_OUT = registry.register(Gauge(
+    "db_pool_connections_checked_out", "Database connections currently checked out of the pool"
+))
+SQLITE_LOCK_ERRORS = registry.register(Counter(
+    "sqlite_lock_errors_total", "Statements that failed because the SQLite database stayed locked past the busy timeout"
+))
+OPERATION_LOG_WRITES_IN_FLIGHT = registry.register(Gauge(
+    "operation_log_writes_in_flight", "Operation log (audit) records currently being written"
+))
+OPERATION_LOG_WRITE_DURATION = registry.register(Histogram(
+    "operation_log_write_duration_seconds", "Time spent writing one operation log (audit) record"
+))
+BACKUP_DURATION = registry.register(Histogram(
+    "backup_duration_seconds", "Duration of backup jobs by operation", ("operation",),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+))
+
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "admission_in_flight", "Requests currently admitted by lane", ("lane",)
+))
+ADMISSION_QUEUE_DEPTH = registry.register(Gauge(
+    "admission_queue_depth", "Requests waiting for admission by lane", ("lane",)
+))
+ADMISSION_QUEUE_WAIT = registry.register(Histogram(
+    "admission_queue_wait_seconds", "Time requests spent queued before admission by lane", ("lane",)
+))
+ADMISSION_REJECTED = registry.register(Counter(
+    "admission_rejected_total", "Requests rejected with 503 by lane and reason (queue_full, timeout)", ("lane", "reason")
+))
+
+
+def _is_lock_error(exception: BaseException) -> bool:
+    message = str(exception).lower()
+    return "database is locked" in message or "database table is locked" in message
+
+
+# 已注册统计的数据库引擎（同步和异步引擎各有一个连接池）
+_engines: List[Engine] = []
+
+
+def _checked_out_connections() -> int:
+    return sum(engine.pool.checkedout() for engine in _engines if hasattr(engine.pool, "checkedout"))
+
+
+def install(engine: Engine):
+    """在数据库引擎上注册连接池和锁错误的统计（可以注册多个引擎，连接数合计输出）"""
+    _engines.append(engine)
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+    # Engine 通过 pool.connect() 取得连接，在实例上包装以统计等待时间
+    pool.connect = timed_connect
+    DB_POOL_CHECKED_OUT.set_function(_checked_out_connections)
+
+    @event.listens_for(engine, "handle_error")
+    def _count_lock_errors(exception_context):
+        if _is_lock_error(exception_context.original_exception):
+            SQLITE_LOCK_ERRORS.inc()
@@ -0,0 +1,158 @@
+"""
+操作日志保留与归档
+超过保留天数的操作日志按月份写入压缩归档文件（JSON Lines + gzip），然后从 operation_logs 表中删除，
+保证热表只保留最近的数据。后台清理任务定时执行归档。
+
+配置（环境变量）：
+- OPERATION_LOG_RETENTION_DAYS：保留天数，默认 90，设为 0 表示不自动归档
+- OPERATION_LOG_PRUNE_INTERVAL：后台清理间隔（秒），默认 3600
+- OPERATION_LOG_GET_POLICY：GET 请求的记录策略，all=全部记录（默认），sample=抽样记录，skip=不记录
+- OPERATION_LOG_GET_SAMPLE_RATE：抽样比例（0~1），默认 0.1，仅 sample 策略生效
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.models.operation_log import OperationLog
+
+logger = logging.getLogger(__name__)
+
+# 归档目录
+ARCHIVE_DIR = Path(__file__).parent.parent.parent / "archives" / "operation_logs"
+
+RETENTION_DAYS = int(os.getenv("OPERATION_LOG_RETENTION_DAYS", "90"))
+PRUNE_INTERVAL_SECONDS = int(os.getenv("OPERATION_LOG_PRUNE_INTERVAL", "3600"))
+GET_POLICY = os.getenv("OPERATION_LOG_GET_POLICY", "all").lower()
+GET_SAMPLE_RATE = float(os.getenv("OPERATION_LOG_GET_SAMPLE_RATE", "0.1"))
+
+# 每批归档的记录数，避免长时间占用数据库写锁
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def should_log_request(method: str, status_code: int) -> bool:
+    """
+    判断请求是否需要记录操作日志
+    写操作和失败的请求总是记录，成功的 GET 请求按配置的策略记录
+    """
+    if method != "GET" or status_code >= 400:
+        return True
+    if GET_POLICY == "skip":
+        return False
+    if GET_POLICY == "sample":
+        return random.random() < GET_SAMPLE_RATE
+    return True
+
+
+def archive_file_path(month: str) -> Path:
+    """某个月份（YYYY-MM）的归档文件路径"""
+    return ARCHIVE_DIR / f"operation_logs_{month}.jsonl.gz"
+
+
+def _log_to_dict(log: OperationLog) -> dict:
+    """将操作日志转换为可写入归档文件的字典"""
+    data = {column.name: getattr(log, column.name) for column in OperationLog.__table__.columns}
+    if data["created_at"]:
+        data["created_at"] = data["created_at"].isoformat()
+    return data
+
+
+def archive_operation_logs(db: Session, retention_days: int = RETENTION_DAYS) -> int:
+    """
+    归档并删除超过保留天数的操作日志
+
+    按批次处理：先追加写入对应月份的归档文件，再删除这一批记录。
+    若在写入文件后、删除前中断，下次会重复归档同一批记录（归档中可能出现重复，但不会丢失）。
+
+    返回归档的记录数
+    """
+    # created_at 由数据库以 UTC 时间写入
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=retention_days)
+    archived_count = 0
+
+    while True:
+        logs = db.query(OperationLog).filter(
+            OperationLog.created_at < cutoff
+        ).order_by(OperationLog.id).limit(ARCHIVE_BATCH_SIZE).all()
+        if not logs:
+            break
+
+        # 按月份分组写入归档文件
+        by_month: Dict[str, List[dict]] = {}
+        for log in logs:
+            by_month.setdefault(log.created_at.strftime("%Y-%m"), []).append(_log_to_dict(log))
+
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        for month, rows in by_month.items():
+            # gzip 支持追加多个成员，读取时会自动连在一起
+            with gzip.open(archive_file_path(month), "at", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+        ids = [log.id for log in logs]
+        db.query(OperationLog).filter(OperationLog.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        archived_count += len(ids)
+
+    return archived_count
+
+
+def drop_redundant_indexes(engine: Engine) -> None:
+    """
+    删除 operation_logs 上模型中已不再定义的索引
+    模型调整索引后 create_all 不会删除旧库中已存在的索引，这里在启动时清理
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(OperationLog.__tablename__):
+        return
+
+    wanted = {index.name for index in OperationLog.__table__.indexes}
+    existing = [index["name"] for index in inspector.get_indexes(OperationLog.__tablename__)]
+    redundant = [name for name in existing if name and name not in wanted]
+    if not redundant:
+        return
+
+    with engine.begin() as conn:
+        for name in redundant:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+
+
+def _run_archive() -> int:
+    """使用独立的数据库会话执行一次归档"""
+    db = SessionLocal()
+    try:
+        return archive_operation_logs(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_pruner() -> None:
+    """后台清理任务：定时归档过期的操作日志"""
+    while True:
+        try:
+            archived_count = await asyncio.to_thread(_run_archive)
+            if archived_count:
+                logger.info("已归档 %d 条操作日志", archived_count)
+        except Exception:
+            logger.exception("归档操作日志失败")
+        await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+
+
+def start_pruner() -> Optional[asyncio.Task]:
+    """启动后台清理任务（保留天数为0时不启动）"""
+    if RETENTION_DAYS <= 0:
+        return None
+    return asyncio.create_task(run_pruner())
@@ -0,0 +1,63 @@
+"""
+密码哈希与校验
+bcrypt 计算放到有界线程池中执行，限制同时进行的哈希计算数量，避免登录高峰时占满工作线程。
+异步接口使用 hash_password_async / verify_password_async，等待 bcrypt 时不占用任何线程；
+同步接口（已在线程池中执行）使用 get_password_hash。
+
+配置（环境变量）：
+- BCRYPT_ROUNDS：bcrypt 成本因子，默认 12；修改后用户下次登录时自动按新成本重新哈希
+- PASSWORD_HASH_WORKERS：执行 bcrypt 的线程数，默认 2
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _password_bytes(password: str) -> bytes:
+    """bcrypt 只使用前72字节，超出部分截断"""
+    return password.encode("utf-8")[:72]
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def _check(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(_password_bytes(password), hashed_password.encode("utf-8"))
+    except ValueError:
+        # 哈希格式不正确
+        return False
+
+
+def get_password_hash(password: str) -> str:
+    """生成密码哈希（在 bcrypt 线程池中执行，供同步接口调用）"""
+    return _executor.submit(_hash, password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    """生成密码哈希（在 bcrypt 线程池中执行，等待时不阻塞事件循环）"""
+    return await asyncio.wrap_future(_executor.submit(_hash, password))
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """校验密码（在 bcrypt 线程池中执行，等待时不阻塞事件循环）"""
+    if not hashed_password:
+        return False
+    return await asyncio.wrap_future(_executor.submit(_check, plain_password, hashed_password))
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """密码哈希的成本因子与当前配置不一致时需要重新哈希"""
+    # bcrypt 哈希格式：$2b$12$...
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return True
+    return int(parts[2]) != BCRYPT_ROUNDS
@@ -0,0 +1,238 @@
+"""
+按时间段汇总的经营统计（每月统计、周/季度/年度统计共用）
+先用三条查询取出时间段内的数据：已结算的使用记录（已关联房间名称和商品、餐费汇总）、其它收入、其它支出，
+再对结果各遍历一次，把每条记录同时计入时间段合计和所在营业日的分组，生成每日明细和全时间段明细。
+时间段和分组都按记录保存的营业日（business_date）计算。
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.other_expense import OtherExpense
+from app.models.other_income import OtherIncome
+from app.models.room import Room
+from app.models.room_session import RoomSession
+from app.models.session_total import SessionTotal
+from app.services.business_date import business_date_filter
+from app.schemas.statistics import (
+    DailyStatisticsResponse, TableFeeDetailItem, OtherIncomeDetailItem, OtherExpenseDetailItem
+)
+
+# 支持的统计周期
+PERIOD_TYPES = ("week", "month", "quarter", "year")
+
+
+def period_range(period: str, target_date: date) -> Tuple[date, date]:
+    """包含指定日期的统计周期的起止日期（周从周一开始）"""
+    if period == "week":
+        start_date = target_date - timedelta(days=target_date.weekday())
+        return start_date, start_date + timedelta(days=6)
+    if period == "month":
+        start_date = target_date.replace(day=1)
+        next_start = (start_date + timedelta(days=32)).replace(day=1)
+        return start_date, next_start - timedelta(days=1)
+    if period == "quarter":
+        first_month = (target_date.month - 1) // 3 * 3 + 1
+        start_date = target_date.replace(month=first_month, day=1)
+        if first_month == 10:
+            next_start = date(target_date.year + 1, 1, 1)
+        else:
+            next_start = target_date.replace(month=first_month + 3, day=1)
+        return start_date, next_start - timedelta(days=1)
+    if period == "year":
+        return date(target_date.year, 1, 1), date(target_date.year, 12, 31)
+    raise ValueError(f"不支持的统计周期: {period}")
+
+
+def _to_money(value) -> Decimal:
+    """将SQL聚合结果（SQLite下可能是浮点数）转换为两位小数的Decimal，没有汇总（无明细）时为0"""
+    if value is None:
+        return Decimal("0")
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+@dataclass
+class _Bucket:
+    """一个时间段（或一天）的累计值和明细"""
+    table_fee: Decimal = Decimal("0")
+    cost: Decimal = Decimal("0")
+    product_revenue: Decimal = Decimal("0")
+    product_cost: Decimal = Decimal("0")
+    meal_revenue: Decimal = Decimal("0")
+    meal_cost: Decimal = Decimal("0")
+    other_income: Decimal = Decimal("0")
+    other_expense: Decimal = Decimal("0")
+    session_count: int = 0
+    room_ids: set = field(default_factory=set)
+    table_fee_details: List[TableFeeDetailItem] = field(default_factory=list)
+    other_income_details: List[OtherIncomeDetailItem] = field(default_factory=list)
+    other_expense_details: List[OtherExpenseDetailItem] = field(default_factory=list)
+
+    @property
+    def table_fee_profit(self) -> Decimal:
+        # 台子费利润 = 台子费 - 商品成本 - 餐费成本
+        return self.table_fee - self.product_cost - self.meal_cost
+
+    @property
+    def total_profit(self) -> Decimal:
+        # 总利润 = 台子费利润 + 其它收入 - 其它支出
+        return self.table_fee_profit + self.other_income - self.other_expense
+
+    def summary(self) -> dict:
+        """合计字段（每日统计和时间段统计的响应共用）"""
+        # 注意：收入只计算台子费，因为台子费已包含商品消费和餐费
+        return {
+            "total_revenue": self.table_fee,
+            "total_cost": self.cost,
+            "total_profit": self.total_profit,
+            "other_income": self.other_income,
+            "other_expense": self.other_expense,
+            "table_fee_total": self.table_fee,
+            "table_fee_profit": self.table_fee_profit,
+            "product_revenue": self.product_revenue,
+            "product_cost": self.product_cost,
+            "meal_revenue": self.meal_revenue,
+            "meal_cost": self.meal_cost,
+            "session_count": self.session_count,
+            "room_count": len(self.room_ids),
+        }
+
+
+def _session_rows(db: Session, start_date: date, end_date: date):
+    """营业日在时间段内的已结算使用记录，附带房间名称和商品、餐费汇总（合计所有支付方式）"""
+    totals = db.query(
+        SessionTotal.session_id.label("session_id"),
+        func.sum(SessionTotal.product_revenue).label("product_revenue"),
+        func.sum(SessionTotal.product_cost).label("product_cost"),
+        func.sum(SessionTotal.meal_revenue).label("meal_revenue"),
+        func.sum(SessionTotal.meal_cost).label("meal_cost"),
+    ).join(
+        RoomSession, RoomSession.id == SessionTotal.session_id
+    ).filter(
+        *business_date_filter(RoomSession.business_date, start_date, end_date),
+        RoomSession.status == "settled"
+    ).group_by(SessionTotal.session_id).subquery()
+
+    return db.query(
+        RoomSession.id,
+        RoomSession.room_id,
+        RoomSession.start_time,
+        RoomSession.business_date,
+        RoomSession.table_fee,
+        RoomSession.total_cost,
+        Room.name.label("room_name"),
+        totals.c.product_revenue,
+        totals.c.product_cost,
+        totals.c.meal_revenue,
+        totals.c.meal_cost,
+    ).outerjoin(
+        Room, Room.id == RoomSession.room_id
+    ).outerjoin(
+        totals, totals.c.session_id == RoomSession.id
+    ).filter(
+        *business_date_filter(RoomSession.business_date, start_date, end_date),
+        RoomSession.status == "settled"
+    ).order_by(RoomSession.id).all()
+
+
+def build_period_statistics(db: Session, start_date: date, end_date: date) -> dict:
+    """
+    统计营业日 start_date 至 end_date（含）的经营数据
+    返回时间段合计字段、每日明细（daily_statistics）和全时间段的明细清单，可直接用于构造响应
+    """
+    period = _Bucket()
+    days: Dict[date, _Bucket] = {}
+
+    for row in _session_rows(db, start_date, end_date):
+        table_fee = row.table_fee or Decimal("0")
+        cost = row.total_cost or Decimal("0")
+        product_revenue = _to_money(row.product_revenue)
+        product_cost = _to_money(row.product_cost)
+        meal_revenue = _to_money(row.meal_revenue)
+        meal_cost = _to_money(row.meal_cost)
+        detail = TableFeeDetailItem(
+            session_id=row.id,
+            room_id=row.room_id,
+            room_name=row.room_name if row.room_name is not None else f"房间{row.room_id}",
+            table_fee=table_fee,
+            product_cost=product_cost,
+            meal_cost=meal_cost,
+            profit=table_fee - product_cost - meal_cost,
+            start_time=row.start_time
+        )
+
+        day = days.get(row.business_date)
+        if day is None:
+            day = days[row.business_date] = _Bucket()
+        for bucket in (period, day):
+            bucket.table_fee += table_fee
+            bucket.cost += cost
+            bucket.product_revenue += product_revenue
+            bucket.product_cost += product_cost
+            bucket.meal_revenue += meal_revenue
+            bucket.meal_cost += meal_cost
+            bucket.session_count += 1
+            bucket.room_ids.add(row.room_id)
+            bucket.table_fee_details.append(detail)
+
+    other_incomes = db.query(OtherIncome).filter(
+        *business_date_filter(OtherIncome.business_date, start_date, end_date)
+    ).all()
+    for income in other_incomes:
+        detail = OtherIncomeDetailItem(
+            id=income.id,
+            name=income.name,
+            amount=income.amount,
+            payment_method=income.payment_method or "现金",
+            income_date=income.income_date,
+            description=income.description
+        )
+        period.other_income += income.amount
+        period.other_income_details.append(detail)
+        # 只有当天有房间使用记录时才出现在每日明细中
+        day = days.get(income.business_date)
+        if day is not None:
+            day.other_income += income.amount
+            day.other_income_details.append(detail)
+
+    other_expenses = db.query(OtherExpense).filter(
+        *business_date_filter(OtherExpense.business_date, start_date, end_date)
+    ).all()
+    for expense in other_expenses:
+        detail = OtherExpenseDetailItem(
+            id=expense.id,
+            name=expense.name,
+            amount=expense.amount,
+            payment_method=expense.payment_method or "现金",
+            expense_date=expense.expense_date,
+            description=expense.description
+        )
+        period.other_expense += expense.amount
+        period.other_expense_details.append(detail)
+        day = days.get(expense.business_date)
+        if day is not None:
+            day.other_expense += expense.amount
+            day.other_expense_details.append(detail)
+
+    daily_statistics = [
+        DailyStatisticsResponse(
+            date=stat_date,
+            table_fee_details=day.table_fee_details,
+            other_income_details=day.other_income_details,
+            other_expense_details=day.other_expense_details,
+            **day.summary()
+        )
+        for stat_date, day in sorted(days.items())
+    ]
+
+    return {
+        **period.summary(),
+        "daily_statistics": daily_statistics,
+        "table_fee_details": period.table_fee_details,
+        "other_income_details": period.other_income_details,
+        "other_expense_details": period.other_expense_details,
+    }
@@ -0,0 +1,130 @@
+"""
+SQL查询统计与慢查询记录
+在数据库引擎的 before/after_cursor_execute 事件中计时，按请求统计执行的SQL条数、数据库总耗时和最慢的几条语句。
+统计结果通过响应头返回（X-Query-Count、Server-Timing），
+含慢语句或SQL条数过多（通常是循环中逐条查询）的请求保存在内存环形缓冲区中，
+可通过 /api/debug/slow-queries 查看。
+
+配置（环境变量）：
+- SLOW_QUERY_THRESHOLD_MS：单条语句超过该耗时（毫秒）视为慢查询，默认 100
+- SLOW_QUERY_COUNT_THRESHOLD：一次请求的SQL条数达到该值时记录，默认 50
+- SLOW_QUERY_BUFFER_SIZE：环形缓冲区保留的请求数，默认 200
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_COUNT_THRESHOLD = int(os.getenv("SLOW_QUERY_COUNT_THRESHOLD", "50"))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "200"))
+
+# 每个请求保留的最慢语句条数
+SLOWEST_PER_REQUEST = 5
+
+# 记录的SQL语句最大长度
+MAX_STATEMENT_LENGTH = 2000
+
+
+class RequestQueries:
+    """一次请求中执行的SQL统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest = []  # [(耗时毫秒, 语句)]，按耗时从大到小
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration_ms: float):
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            if len(self.slowest) < SLOWEST_PER_REQUEST or duration_ms > self.slowest[-1][0]:
+                self.slowest.append((duration_ms, statement))
+                self.slowest.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest[SLOWEST_PER_REQUEST:]
+
+    @property
+    def has_slow_statement(self) -> bool:
+        return bool(self.slowest) and self.slowest[0][0] >= SLOW_QUERY_THRESHOLD_MS
+
+
+# 当前请求的统计（由中间件设置；同步接口在线程池中执行时会复制上下文，指向同一个对象）
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+# 最近的慢请求记录
+_slow_requests = deque(maxlen=SLOW_QUERY_BUFFER_SIZE)
+_slow_requests_lock = threading.Lock()
+
+
+def start_request() -> RequestQueries:
+    """开始统计当前请求"""
+    queries = RequestQueries()
+    _current.set(queries)
+    return queries
+
+
+def finish_request(queries: RequestQueries, method: str, path: str, status_code: int, duration_ms: float):
+    """请求结束：含慢语句或SQL条数过多时写入环形缓冲区"""
+    _current.set(None)
+    if not queries.has_slow_statement and queries.count < SLOW_QUERY_COUNT_THRESHOLD:
+        return
+    entry = {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "method": method,
+        "path": path,
+        "status_code": status_code,
+        "query_count": queries.count,
+        "db_time_ms": round(queries.total_ms, 2),
+        "total_time_ms": round(duration_ms, 2),
+        "slowest": [
+            {"duration_ms": round(duration, 2), "statement": statement}
+            for duration, statement in queries.slowest
+        ],
+    }
+    with _slow_requests_lock:
+        _slow_requests.append(entry)
+
+
+def recent_slow_requests(limit: Optional[int] = None) -> List[dict]:
+    """最近的慢请求记录（最新的在前）"""
+    with _slow_requests_lock:
+        entries = list(_slow_requests)
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def clear_slow_requests():
+    with _slow_requests_lock:
+        _slow_requests.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    queries = _current.get()
+    if queries is not None:
+        queries.record(statement[:MAX_STATEMENT_LENGTH], (time.perf_counter() - started) * 1000)
+
+
+def _handle_error(exception_context):
+    # 执行失败的语句不会触发 after_cursor_execute，丢弃其开始时间
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def install(engine: Engine):
+    """在数据库引擎上注册计时事件"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
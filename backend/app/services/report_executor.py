@@ -0,0 +1,40 @@
+"""
+报表专用的执行线程
+同步接口默认在 AnyIO 的公共线程池（40个线程）中执行，刷新看板时大量报表请求会占满线程池，收银的写操作只能排队等待。
+报表路由（ReportRoute）的同步 GET 接口改为在单独限流的线程中执行，同时执行的报表数量不超过 REPORT_MAX_WORKERS，
+超出的报表请求排队等待，不再占用公共线程池。
+
+配置（环境变量）：
+- REPORT_MAX_WORKERS：同时执行的报表请求数，默认 4
+"""
+import functools
+import inspect
+import os
+from typing import Callable
+
+import anyio
+from fastapi.routing import APIRoute
+
+REPORT_MAX_WORKERS = int(os.getenv("REPORT_MAX_WORKERS", "4"))
+
+_report_limiter = anyio.CapacityLimiter(REPORT_MAX_WORKERS)
+
+
+def run_in_report_executor(func: Callable) -> Callable:
+    """把同步的接口函数包装为异步函数，在报表线程中执行（保留原函数的参数签名，供 FastAPI 解析依赖）"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await anyio.to_thread.run_sync(
+            functools.partial(func, *args, **kwargs), limiter=_report_limiter
+        )
+    return wrapper
+
+
+class ReportRoute(APIRoute):
+    """报表路由：同步的 GET 接口在报表线程中执行，其它接口不变"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        methods = {method.upper() for method in (kwargs.get("methods") or ["GET"])}
+        if "GET" in methods and not inspect.iscoroutinefunction(endpoint):
+            endpoint = run_in_report_executor(endpoint)
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,39 @@
+"""
+识别一次 flush 中被修改的房间使用记录
+详情快照、汇总表等派生数据据此只处理受影响的使用记录
+"""
+from itertools import chain
+from typing import Set
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app.models.customer_loan import CustomerLoan
+from app.models.customer_repayment import CustomerRepayment
+from app.models.meal_record import MealRecord
+from app.models.product_consumption import ProductConsumption
+from app.models.room_customer import RoomCustomer
+from app.models.room_session import RoomSession
+
+# 关联到使用记录的明细表
+LEDGER_MODELS = (RoomCustomer, CustomerLoan, CustomerRepayment, ProductConsumption, MealRecord)
+
+
+def changed_session_ids(db: Session) -> Set[int]:
+    """
+    本次 flush 中新增、修改、删除的明细所属的使用记录，以及被修改、删除的使用记录本身
+    （在 before_flush / after_flush 中调用，此时 new、dirty、deleted 仍是 flush 前的状态）
+    """
+    session_ids = set()
+    for obj in chain(db.new, db.dirty, db.deleted):
+        if isinstance(obj, RoomSession):
+            if obj.id is not None:
+                session_ids.add(obj.id)
+        elif isinstance(obj, LEDGER_MODELS):
+            if obj.session_id is not None:
+                session_ids.add(obj.session_id)
+            # 明细被移动到其他使用记录时，原记录也受影响
+            session_ids.update(
+                value for value in inspect(obj).attrs.session_id.history.deleted if value is not None
+            )
+    return session_ids
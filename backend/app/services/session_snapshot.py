@@ -0,0 +1,104 @@
+"""
+已结算房间使用记录的详情快照
+结算时把完整的详情响应写入 session_snapshots 表，补充记录的接口在同一事务中重新生成，
+打开已结算记录的详情时只需读取一行，不再查询五张明细表。
+
+快照是可随时删除的派生数据：
+- 每次 flush 时检查本次修改涉及的使用记录（借款、还款、消费、餐费、客户关联及使用记录本身），删除其快照；
+  修改客户、商品、房间名称等会出现在详情中的字段时删除全部快照
+- 没有快照的已结算记录在下次打开详情时重新生成
+"""
+from itertools import chain
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, event, func, inspect
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models.customer import Customer
+from app.models.product import Product
+from app.models.room import Room
+from app.models.room_session import RoomSession
+from app.models.session_snapshot import SessionSnapshot
+from app.schemas.room_detail import RoomSessionDetailResponse
+from app.services.session_changes import changed_session_ids
+
+# 快照格式版本，详情响应的结构变化时加1，旧版本的快照会在读取时重新生成
+SNAPSHOT_VERSION = 1
+
+# 出现在详情中的关联数据字段
+_DISPLAY_FIELDS = {
+    Customer: ("name", "phone"),
+    Product: ("name",),
+    Room: ("name",),
+}
+
+
+def load_session_snapshot(db: Session, session_id: int) -> Optional[str]:
+    """读取已结算（未删除）使用记录的详情快照，没有可用快照时返回 None"""
+    return db.query(SessionSnapshot.payload).join(
+        RoomSession, RoomSession.id == SessionSnapshot.session_id
+    ).filter(
+        SessionSnapshot.session_id == session_id,
+        SessionSnapshot.version == SNAPSHOT_VERSION,
+        RoomSession.status == "settled",
+        RoomSession.deleted_at.is_(None)
+    ).scalar()
+
+
+def save_session_snapshot(db: Session, session_id: int, detail: RoomSessionDetailResponse):
+    """写入（或覆盖）详情快照，不提交事务"""
+    payload = detail.model_dump_json(by_alias=True)
+    statement = insert(SessionSnapshot).values(
+        session_id=session_id,
+        version=SNAPSHOT_VERSION,
+        payload=payload,
+        updated_at=func.now()
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[SessionSnapshot.session_id],
+        set_={
+            "version": statement.excluded.version,
+            "payload": statement.excluded.payload,
+            "updated_at": statement.excluded.updated_at,
+        }
+    ))
+
+
+def begin_snapshot_rebuild(db: Session, session_id: int):
+    """
+    重新生成快照前调用：删除旧快照，同时开始写事务并取得数据库写锁。
+    之后读取的明细在提交前不会被其他请求修改，生成的快照与数据一致。
+    """
+    db.execute(delete(SessionSnapshot).where(SessionSnapshot.session_id == session_id))
+
+
+def invalidate_session_snapshots(db: Session, session_ids: Optional[Iterable[int]] = None):
+    """删除指定使用记录的快照（session_ids 为 None 时删除全部快照）"""
+    statement = delete(SessionSnapshot.__table__)
+    if session_ids is not None:
+        session_ids = list(session_ids)
+        if not session_ids:
+            return
+        statement = statement.where(SessionSnapshot.__table__.c.session_id.in_(session_ids))
+    db.connection().execute(statement)
+
+
+def _display_fields_changed(obj, fields) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Session, "before_flush")
+def _invalidate_changed_snapshots(db: Session, flush_context, instances):
+    """flush 前删除本次修改涉及的使用记录的快照（与修改在同一事务中提交）"""
+    invalidate_all = any(
+        obj in db.deleted or _display_fields_changed(obj, _DISPLAY_FIELDS[type(obj)])
+        for obj in chain(db.dirty, db.deleted)
+        if type(obj) in _DISPLAY_FIELDS
+    )
+
+    if invalidate_all:
+        invalidate_session_snapshots(db)
+    else:
+        invalidate_session_snapshots(db, changed_session_ids(db))
@@ -0,0 +1,172 @@
+"""
+房间使用记录汇总（按支付方式）
+session_totals 表为每个使用记录按支付方式保存商品收入/成本、餐费收入/成本、借款和还款金额，
+报表直接读取汇总表，不再逐个使用记录查询明细表。
+
+每次 flush 后，对本次修改涉及的使用记录用一条 INSERT ... SELECT 从明细表重新汇总，
+与明细的修改在同一事务中提交，所以无论哪个接口写入明细，汇总始终与明细一致。
+可用 python -m app.scripts.check_session_totals 核对汇总表与明细表。
+"""
+import logging
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, event, func, literal, select, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.customer_loan import CustomerLoan
+from app.models.customer_repayment import CustomerRepayment
+from app.models.meal_record import MealRecord
+from app.models.product_consumption import ProductConsumption
+from app.models.session_total import SessionTotal
+from app.services.session_changes import changed_session_ids
+
+logger = logging.getLogger(__name__)
+
+# 汇总的金额字段
+TOTAL_FIELDS = (
+    "product_revenue",
+    "product_cost",
+    "meal_revenue",
+    "meal_cost",
+    "loan_amount",
+    "repayment_amount",
+)
+
+# 明细未填写支付方式时按现金汇总（与报表的处理一致）
+DEFAULT_PAYMENT_METHOD = "现金"
+
+
+def _source(model, amounts: dict, session_ids: Optional[List[int]]):
+    """一张明细表按汇总字段展开的查询（不属于该表的字段为0）"""
+    columns = [
+        model.session_id.label("session_id"),
+        func.coalesce(model.payment_method, DEFAULT_PAYMENT_METHOD).label("payment_method"),
+    ]
+    for field in TOTAL_FIELDS:
+        columns.append((amounts[field] if field in amounts else literal(0)).label(field))
+    query = select(*columns).where(model.session_id.isnot(None))
+    if session_ids is not None:
+        query = query.where(model.session_id.in_(session_ids))
+    return query
+
+
+def aggregate_query(session_ids: Optional[Iterable[int]] = None):
+    """从明细表汇总的查询：每个使用记录、每种支付方式一行"""
+    if session_ids is not None:
+        session_ids = list(session_ids)
+    sources = union_all(
+        _source(ProductConsumption, {
+            "product_revenue": ProductConsumption.total_price,
+            "product_cost": ProductConsumption.total_cost,
+        }, session_ids),
+        _source(MealRecord, {
+            "meal_revenue": MealRecord.amount,
+            "meal_cost": MealRecord.cost_price,
+        }, session_ids),
+        _source(CustomerLoan, {"loan_amount": CustomerLoan.amount}, session_ids),
+        _source(CustomerRepayment, {"repayment_amount": CustomerRepayment.amount}, session_ids),
+    ).subquery("ledger")
+
+    return select(
+        sources.c.session_id,
+        sources.c.payment_method,
+        *[func.sum(sources.c[field]).label(field) for field in TOTAL_FIELDS]
+    ).group_by(sources.c.session_id, sources.c.payment_method)
+
+
+def refresh_session_totals(connection: Connection, session_ids: Optional[Iterable[int]] = None):
+    """
+    从明细表重新汇总指定使用记录（session_ids 为 None 时重新汇总全部）
+    使用传入的连接执行，与调用方在同一事务中
+    """
+    table = SessionTotal.__table__
+    statement = delete(table)
+    if session_ids is not None:
+        session_ids = list(session_ids)
+        if not session_ids:
+            return
+        statement = statement.where(table.c.session_id.in_(session_ids))
+    connection.execute(statement)
+    connection.execute(
+        table.insert().from_select(["session_id", "payment_method", *TOTAL_FIELDS], aggregate_query(session_ids))
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_changed_totals(db: Session, flush_context):
+    """flush 后重新汇总本次修改涉及的使用记录"""
+    session_ids = changed_session_ids(db)
+    if session_ids:
+        refresh_session_totals(db.connection(), session_ids)
+
+
+def session_totals_by_session(db: Session, session_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    读取多个使用记录的汇总（合计所有支付方式）
+    返回 {使用记录ID: {字段: 金额}}，没有明细的使用记录各字段为0
+    """
+    session_ids = list(session_ids)
+    totals = {session_id: {field: Decimal("0") for field in TOTAL_FIELDS} for session_id in session_ids}
+    if not session_ids:
+        return totals
+
+    rows = db.query(
+        SessionTotal.session_id,
+        *[func.sum(getattr(SessionTotal, field)).label(field) for field in TOTAL_FIELDS]
+    ).filter(
+        SessionTotal.session_id.in_(session_ids)
+    ).group_by(SessionTotal.session_id).all()
+
+    for row in rows:
+        totals[row.session_id] = {
+            field: Decimal(str(getattr(row, field) or 0)).quantize(Decimal("0.01"))
+            for field in TOTAL_FIELDS
+        }
+    return totals
+
+
+def find_mismatches(db: Session) -> List[dict]:
+    """核对汇总表与明细表，返回不一致的行（按使用记录、支付方式、字段）"""
+    def keyed(rows):
+        return {
+            (row.session_id, row.payment_method): {
+                field: Decimal(str(getattr(row, field) or 0)).quantize(Decimal("0.01"))
+                for field in TOTAL_FIELDS
+            }
+            for row in rows
+        }
+
+    stored = keyed(db.query(SessionTotal).all())
+    actual = keyed(db.execute(aggregate_query()).all())
+    zero = {field: Decimal("0.00") for field in TOTAL_FIELDS}
+
+    mismatches = []
+    for key in sorted(set(stored) | set(actual)):
+        stored_values = stored.get(key, zero)
+        actual_values = actual.get(key, zero)
+        for field in TOTAL_FIELDS:
+            if stored_values[field] != actual_values[field]:
+                mismatches.append({
+                    "session_id": key[0],
+                    "payment_method": key[1],
+                    "field": field,
+                    "stored": stored_values[field],
+                    "actual": actual_values[field],
+                })
+    return mismatches
+
+
+def backfill_session_totals(engine):
+    """汇总表为空而明细表已有数据时（升级后首次启动）一次性生成全部汇总"""
+    with engine.begin() as connection:
+        if connection.execute(select(SessionTotal.session_id).limit(1)).first() is not None:
+            return
+        has_ledger = any(
+            connection.execute(select(model.id).where(model.session_id.isnot(None)).limit(1)).first() is not None
+            for model in (ProductConsumption, MealRecord, CustomerLoan, CustomerRepayment)
+        )
+        if has_ledger:
+            refresh_session_totals(connection)
+            logger.info("已生成房间使用记录汇总")
@@ -0,0 +1,131 @@
+"""
+结构化日志
+应用代码通过 logging.getLogger(__name__) 记录日志，根日志记录器只挂一个 QueueHandler：
+请求线程中只把日志记录放入内存队列，格式化和写入 stdout（由 systemd 写入 journald）在 QueueListener 的后台线程中进行，
+写日志不会阻塞请求。
+
+每条日志输出为一行JSON：time（UTC）、level、logger、message，以及调用时通过 extra 传入的字段，
+有异常时附带 exception（异常堆栈文本）。例如：
+    logger.info("已归档操作日志", extra={"count": 120})
+    {"time": "2025-01-01T02:00:00.000+00:00", "level": "INFO", "logger": "app.services.operation_log_retention", "message": "已归档操作日志", "count": 120}
+
+DEBUG 级别的日志（每个请求都可能产生的调试信息）按比例抽样输出；单条日志可以通过 extra={"sample_rate": 0.5} 指定抽样比例。
+
+配置（环境变量）：
+- LOG_LEVEL：默认日志级别，默认 INFO
+- LOG_LEVELS：按模块设置的日志级别（逗号分隔），如 app.api.rooms=DEBUG,sqlalchemy.engine=INFO；
+  httpx、httpcore（每个请求都输出 INFO 日志）默认为 WARNING，可以在这里覆盖
+- LOG_FORMAT：json（默认）或 text（便于本地开发时阅读）
+- LOG_DEBUG_SAMPLE_RATE：DEBUG 日志的抽样比例（0-1），默认 0.1
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+
+# 第三方库的默认日志级别（httpx 每个请求输出一条 INFO 日志，会淹没压测脚本等的输出）
+QUIET_LOGGERS = {"httpx": "WARNING", "httpcore": "WARNING"}
+
+# LogRecord 自带的属性，其余属性为调用时通过 extra 传入的字段
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {"message", "sample_rate"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """把日志记录格式化为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                data[key] = value
+        if record.exc_info:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _SamplingFilter(logging.Filter):
+    """DEBUG 日志按比例抽样，其它级别全部保留"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = getattr(record, "sample_rate", self.rate)
+        return rate >= 1 or random.random() < rate
+
+
+class _QueueHandler(QueueHandler):
+    """放入队列前只合并消息参数并把异常转换为文本（异常堆栈引用了调用栈的对象，不能留到后台线程再处理）"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _parse_levels(value: str) -> Dict[str, str]:
+    """解析 LOG_LEVELS：模块名 -> 级别"""
+    levels = {}
+    for item in value.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """配置根日志记录器（应用启动时调用一次，重复调用无效）"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(_SamplingFilter(LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+    # 先设置第三方库的默认级别，LOG_LEVELS 中指定的级别优先
+    levels = {**QUIET_LOGGERS, **_parse_levels(LOG_LEVELS)}
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    # 进程退出前输出队列中剩余的日志
+    atexit.register(_listener.stop)
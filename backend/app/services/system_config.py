@@ -0,0 +1,155 @@
+"""
+系统配置缓存
+system_configs 表一次性加载到内存，读取配置不再查询数据库。
+配置修改接口在同一事务中把 system_config_version 表的版本号加1，
+各进程定期（默认5秒）检查版本号，发现变化后重新加载，实现多进程间的缓存失效。
+异步接口通过 get_default_payment_method_async() 等读取：缓存需要检查或重新加载时在线程池中查询数据库，
+不在事件循环中执行查询或等待加载锁。
+
+配置（环境变量）：
+- SYSTEM_CONFIG_CHECK_INTERVAL：检查配置版本号的间隔（秒），默认 5
+"""
+import os
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal, engine
+from app.models.system_config import SystemConfig, SystemConfigVersion
+
+CHECK_INTERVAL_SECONDS = float(os.getenv("SYSTEM_CONFIG_CHECK_INTERVAL", "5"))
+
+# 配置不存在（或为空）时使用的默认值
+DEFAULT_VALUES = {
+    "initial_cash": "0",
+    "default_payment_method": "现金",
+}
+
+# 版本表只有一行
+VERSION_ROW_ID = 1
+
+
+class SystemConfigCache:
+    """系统配置的进程内缓存"""
+
+    def __init__(self):
+        self._values: Optional[Dict[str, str]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> Dict[str, str]:
+        """检查版本号，有变化（或尚未加载）时重新加载全部配置（调用方持有锁）"""
+        db = SessionLocal()
+        try:
+            version = db.query(SystemConfigVersion.version).filter(
+                SystemConfigVersion.id == VERSION_ROW_ID
+            ).scalar() or 0
+            if self._values is None or version != self._version:
+                self._values = {key: value for key, value in db.query(SystemConfig.key, SystemConfig.value).all()}
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._values
+        finally:
+            db.close()
+
+    def _fresh_values(self) -> Optional[Dict[str, str]]:
+        """缓存未过期时返回配置字典，否则返回 None（只读一次 _values，不受 invalidate() 并发影响）"""
+        values = self._values
+        if values is not None and time.monotonic() - self._checked_at < CHECK_INTERVAL_SECONDS:
+            return values
+        return None
+
+    def _ensure_fresh(self) -> Dict[str, str]:
+        """返回有效的配置字典，必要时在锁内检查版本号、重新加载"""
+        values = self._fresh_values()
+        if values is not None:
+            return values
+        with self._lock:
+            values = self._fresh_values()
+            if values is not None:
+                return values
+            return self._refresh()
+
+    @staticmethod
+    def _lookup(values: Dict[str, str], key: str, default: Optional[str]) -> Optional[str]:
+        value = values.get(key)
+        if value is None or value == "":
+            return default if default is not None else DEFAULT_VALUES.get(key)
+        return value
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """读取配置值，不存在或为空时返回默认值"""
+        return self._lookup(self._ensure_fresh(), key, default)
+
+    async def get_async(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """异步接口中读取配置值：缓存已过期时在线程池中检查版本号和重新加载"""
+        values = self._fresh_values()
+        if values is None:
+            values = await run_in_threadpool(self._ensure_fresh)
+        return self._lookup(values, key, default)
+
+    def get_decimal(self, key: str, default: str = "0") -> Decimal:
+        """读取金额类配置"""
+        value = self.get(key, default)
+        try:
+            return Decimal(value)
+        except (InvalidOperation, TypeError):
+            return Decimal(default)
+
+    def invalidate(self):
+        """清除本进程的缓存，下次读取时重新加载"""
+        with self._lock:
+            self._values = None
+            self._version = None
+
+
+config_cache = SystemConfigCache()
+
+
+def bump_config_version(db: Session):
+    """
+    配置版本号加1（在修改配置的事务中调用，提交后各进程会重新加载配置）
+    版本行不存在时插入，用 INSERT ... ON CONFLICT DO UPDATE 一条语句完成，
+    并发修改配置时不会因同时插入而主键冲突
+    """
+    stmt = sqlite_insert(SystemConfigVersion).values(id=VERSION_ROW_ID, version=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[SystemConfigVersion.id],
+        set_={"version": SystemConfigVersion.version + 1},
+    ))
+
+
+def reload_after_restore():
+    """
+    数据库文件被整体替换（还原备份）后调用：版本号加1，使所有进程重新加载配置
+    旧备份中可能还没有版本表，先按需建表
+    """
+    SystemConfigVersion.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        bump_config_version(db)
+        db.commit()
+    finally:
+        db.close()
+    config_cache.invalidate()
+
+
+def get_initial_cash() -> Decimal:
+    """初期现金"""
+    return config_cache.get_decimal("initial_cash")
+
+
+def get_default_payment_method() -> str:
+    """默认支付方式"""
+    return config_cache.get("default_payment_method")
+
+
+async def get_default_payment_method_async() -> str:
+    """默认支付方式（供异步接口调用）"""
+    return await config_cache.get_async("default_payment_method")
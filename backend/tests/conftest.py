@@ -0,0 +1,35 @@
+"""
+测试配置
+应用在导入时按 DATABASE_URL 连接数据库并建表，必须在导入 app 之前指向临时数据库
+"""
+import os
+import sys
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix="mjg-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# 测试中使用最低的 bcrypt 成本因子
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture()
+def db():
+    from app.db.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,31 @@
+"""准入控制：流式响应在内容发送完毕后才归还处理名额"""
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.services.admission import admission_route, controller
+
+
+def test_streaming_response_holds_slot_until_body_sent():
+    lane = controller.lanes["export"]
+    active_while_streaming = []
+
+    async def body():
+        for chunk in (b"a", b"b"):
+            active_while_streaming.append(lane.active)
+            yield chunk
+
+    router = APIRouter(route_class=admission_route("export"))
+
+    @router.get("/stream")
+    async def stream():
+        return StreamingResponse(body())
+
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        response = client.get("/stream")
+
+    assert response.content == b"ab"
+    assert active_while_streaming == [1, 1]
+    assert lane.active == 0
@@ -0,0 +1,42 @@
+"""登录：任意用户名和密码都可以登录，bcrypt 成本因子调整后用正确密码登录时重新哈希"""
+import bcrypt
+
+from app.models.user import User
+from app.services import passwords
+
+
+def _create_user(db, username: str, password: str, rounds: int) -> User:
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        password_hash=bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8"),
+        role="admin",
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _hash_rounds(password_hash: str) -> int:
+    return int(password_hash.split("$")[2])
+
+
+def test_login_accepts_any_credentials(client, db):
+    _create_user(db, "login-any", "secret", passwords.BCRYPT_ROUNDS)
+    assert client.post("/login", json={"username": "nobody", "password": "x"}).status_code == 200
+    assert client.post("/login", json={"username": "login-any", "password": "wrong"}).status_code == 200
+
+
+def test_login_rehashes_with_current_cost(client, db):
+    old_rounds = 4 if passwords.BCRYPT_ROUNDS != 4 else 5
+    user = _create_user(db, "login-rehash", "secret", old_rounds)
+
+    # 密码错误时不修改哈希
+    assert client.post("/login", json={"username": "login-rehash", "password": "wrong"}).status_code == 200
+    db.refresh(user)
+    assert _hash_rounds(user.password_hash) == old_rounds
+
+    assert client.post("/login", json={"username": "login-rehash", "password": "secret"}).status_code == 200
+    db.refresh(user)
+    assert _hash_rounds(user.password_hash) == passwords.BCRYPT_ROUNDS
+    assert bcrypt.checkpw(b"secret", user.password_hash.encode("utf-8"))
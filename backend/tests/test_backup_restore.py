@@ -0,0 +1,61 @@
+"""还原旧版本的备份：补建新增的表和汇总后，接口正常使用"""
+import sqlite3
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.api import backup
+from app.models.product import Product
+from app.models.product_consumption import ProductConsumption
+from app.models.room import Room
+from app.models.room_session import RoomSession
+from app.models.session_total import SessionTotal
+
+# 新版本新增的表，旧备份中没有
+NEW_TABLES = ("session_totals", "session_snapshots", "inventory_movements", "business_date_settings", "system_config_version")
+
+
+def _create_settled_session(db) -> int:
+    room = Room(name="还原测试")
+    product = Product(name="还原测试商品", price=Decimal("10"), cost_price=Decimal("4"), stock=10)
+    db.add_all([room, product])
+    db.flush()
+    started = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    session = RoomSession(room_id=room.id, start_time=started, end_time=started, status="settled")
+    db.add(session)
+    db.flush()
+    db.add(ProductConsumption(
+        session_id=session.id, product_id=product.id, quantity=2,
+        unit_price=Decimal("10"), total_price=Decimal("20"), cost_price=Decimal("4"), total_cost=Decimal("8"),
+    ))
+    db.commit()
+    return session.id
+
+
+def _write_old_backup(path):
+    """复制当前数据库并删除新增的表，模拟旧版本的备份"""
+    source = sqlite3.connect(backup.get_database_path())
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+        for table in NEW_TABLES:
+            target.execute(f"DROP TABLE IF EXISTS {table}")
+        target.commit()
+    finally:
+        source.close()
+        target.close()
+
+
+def test_restore_backup_without_new_tables(client, db, tmp_path, monkeypatch):
+    session_id = _create_settled_session(db)
+    monkeypatch.setattr(backup, "BACKUP_DIR", tmp_path)
+    _write_old_backup(tmp_path / "old.db")
+
+    response = client.post("/api/backup/restore", json={"filename": "old.db"})
+    assert response.status_code == 200, response.text
+
+    db.expire_all()
+    total = db.query(SessionTotal).filter(SessionTotal.session_id == session_id).one()
+    assert total.product_revenue == Decimal("20")
+    detail = client.get(f"/api/rooms/sessions/{session_id}")
+    assert detail.status_code == 200, detail.text
+    assert client.get("/api/inventory/movements").status_code == 200
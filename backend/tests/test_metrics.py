@@ -0,0 +1,26 @@
+"""请求指标：按路由模板统计"""
+from fastapi import FastAPI
+
+from app.middleware.metrics import _route_template
+
+
+def _scope(app, path: str, method: str = "GET") -> dict:
+    return {"type": "http", "method": method, "path": path, "root_path": "", "app": app}
+
+
+def test_route_template_falls_back_to_route_table():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        return {}
+
+    assert _route_template(_scope(app, "/items/1")) == "/items/{item_id}"
+    assert _route_template(_scope(app, "/docs")) == "/docs"
+    assert _route_template(_scope(app, "/no/such/path")) == "unmatched"
+
+
+def test_metrics_labels_requests_by_template(client):
+    client.get("/api/rooms/sessions/999999")
+    body = client.get("/metrics").text
+    assert 'route="/api/rooms/sessions/{session_id}"' in body
@@ -0,0 +1,13 @@
+"""操作日志中间件：写操作在响应返回前记录操作日志"""
+from app.models.operation_log import OperationLog
+
+
+def test_write_request_is_logged(client, db):
+    path = "/api/system-configs/operation_log_test"
+    response = client.put(path, json={"value": "1"}, headers={"x-username": "tester"})
+    assert response.status_code == 200
+
+    log = db.query(OperationLog).filter(OperationLog.path == path).one()
+    assert log.username == "tester"
+    assert log.module == "系统配置"
+    assert log.status_code == 200
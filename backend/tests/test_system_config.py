@@ -0,0 +1,29 @@
+"""系统配置缓存：版本号递增与修改后的缓存失效"""
+import asyncio
+
+from app.models.system_config import SystemConfigVersion
+from app.services.system_config import VERSION_ROW_ID, bump_config_version, config_cache
+
+
+def _version(db) -> int:
+    return db.query(SystemConfigVersion.version).filter(SystemConfigVersion.id == VERSION_ROW_ID).scalar()
+
+
+def test_bump_config_version_inserts_then_increments(db):
+    db.query(SystemConfigVersion).delete()
+    db.commit()
+    bump_config_version(db)
+    db.commit()
+    assert _version(db) == 1
+    bump_config_version(db)
+    db.commit()
+    assert _version(db) == 2
+
+
+def test_config_update_visible_to_sync_and_async_reads(client):
+    response = client.put("/api/system-configs/default_payment_method", json={"value": "微信"})
+    assert response.status_code == 200
+    assert config_cache.get("default_payment_method") == "微信"
+    config_cache.invalidate()
+    assert asyncio.run(config_cache.get_async("default_payment_method")) == "微信"
+    client.put("/api/system-configs/default_payment_method", json={"value": "现金"})